@@ -530,7 +530,7 @@ class NetworkMonitorGUI:
         # 在新线程中执行测试
         def test():
             try:
-                result = is_network_available()
+                result = is_network_available(config=self.monitor_core.config)
                 if result:
                     self.log_message("网络测试结果: 连接正常")
                 else:
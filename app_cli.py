@@ -11,6 +11,7 @@ import logging
 import os
 import signal
 import sys
+import threading
 import time
 from pathlib import Path
 import argparse
@@ -21,8 +22,11 @@ from typing import Dict, Any, Optional, Callable
 src_path = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_path))
 
-from campus_login import EnhancedCampusNetworkAuth
-from network_test import is_network_available
+from browser_pool import get_browser_pool, shutdown_browser_pool
+from network_test import is_network_available, detect_captive_portal, PORTAL_INTERCEPT, PORTAL_OPEN
+from local_network import LinkChangeWatcher
+from probe_engine import RTT_SAVE_INTERVAL, get_resolver, get_rtt_estimator, configure_rtt_estimator
+from singleflight import PROBE_FLIGHT
 from utils import TimeUtils, LoginAttemptHandler, LoggerSetup, get_runtime_stats, ConfigLoader, ConfigValidator, ConfigAdapter
 
 
@@ -50,6 +54,14 @@ class NetworkMonitorCore:
         self.start_time = None
         self.last_check_time: Optional[datetime.datetime] = None
         
+        # 网络变化监听：链路/地址/路由变化时唤醒监控循环立即检测
+        self._wake_event = threading.Event()
+        self._link_watcher: Optional[LinkChangeWatcher] = None
+        
+        # 上次保存的RTT估计及保存时间（估计变化不大时不重复写文件）
+        self._rtt_saved: Dict[str, Dict[str, Any]] = {}
+        self._rtt_saved_at = 0.0
+        
         # 日志回调函数
         self.log_callback = log_callback
         
@@ -108,6 +120,7 @@ class NetworkMonitorCore:
             return
         
         self.monitoring = False
+        self._wake_event.set()
         if self.start_time:
             runtime_str, stats_str = get_runtime_stats(self.start_time, self.network_check_count)
             self.log_message(f"监控已停止，总运行时间: {runtime_str}")
@@ -116,11 +129,104 @@ class NetworkMonitorCore:
             self.log_message("监控已停止")
     
     def monitor_network(self) -> None:
+        """
+        网络监控主循环（运行期间同时监听网络变化）
+        """
+        self._load_rtt_state()
+        self._start_link_watcher()
+        try:
+            self._monitor_loop()
+        finally:
+            self._stop_link_watcher()
+            self._save_rtt_state(force=True)
+            shutdown_browser_pool()
+    
+    def _load_rtt_state(self) -> None:
+        """按配置设置自适应超时上下限，并恢复上次保存的RTT估计"""
+        probe_config = self.config.get('probe', {})
+        estimator = configure_rtt_estimator(
+            probe_config.get('timeout_min', 0.3),
+            probe_config.get('timeout_max', 3.0)
+        )
+        state_file = probe_config.get('rtt_state_file')
+        if state_file and estimator.load_from_file(state_file):
+            self.logger.info(f"已恢复RTT估计状态: {state_file}")
+        self._rtt_saved = estimator.snapshot()
+        self._rtt_saved_at = time.monotonic()
+    
+    def _save_rtt_state(self, force: bool = False) -> None:
+        """
+        记录并持久化当前的RTT估计
+        
+        参数:
+            force: 为False时只在估计明显变化或距上次保存超过 RTT_SAVE_INTERVAL 秒时保存（监控退出时强制保存）
+        """
+        estimator = get_rtt_estimator()
+        if not force and not estimator.drifted_from(self._rtt_saved) \
+                and time.monotonic() - self._rtt_saved_at < RTT_SAVE_INTERVAL:
+            return
+        snapshot = estimator.snapshot()
+        self._rtt_saved = snapshot
+        self._rtt_saved_at = time.monotonic()
+        if snapshot:
+            summary = ", ".join(
+                f"{key} srtt={state['srtt'] * 1000:.0f}ms timeout={state['timeout'] * 1000:.0f}ms"
+                if state['srtt'] is not None else f"{key} timeout={state['timeout'] * 1000:.0f}ms"
+                for key, state in snapshot.items()
+            )
+            self.logger.info(f"RTT估计: {summary}")
+        
+        state_file = self.config.get('probe', {}).get('rtt_state_file')
+        if state_file:
+            try:
+                estimator.save_to_file(state_file)
+            except OSError as e:
+                self.logger.warning(f"保存RTT估计状态失败: {e}")
+    
+    def _start_link_watcher(self) -> None:
+        """启动网络变化监听器"""
+        monitor_config = self.config.get('monitor', {})
+        if not monitor_config.get('link_watch', True) or self._link_watcher:
+            return
+        try:
+            self._link_watcher = LinkChangeWatcher(
+                self._on_link_change,
+                debounce=monitor_config.get('link_watch_debounce', 2),
+                logger=self.logger
+            ).start()
+            self.log_message(f"👂 网络变化监听已启动（{self._link_watcher.mode}模式）")
+        except Exception as e:
+            self._link_watcher = None
+            self.log_message(f"⚠️ 网络变化监听启动失败: {str(e)}")
+    
+    def _stop_link_watcher(self) -> None:
+        """停止网络变化监听器"""
+        if self._link_watcher:
+            self._link_watcher.stop()
+            self._link_watcher = None
+    
+    def _on_link_change(self, events: list) -> None:
+        """
+        网络变化回调（在监听线程中执行）
+        
+        参数:
+            events: 合并后的事件名列表
+        """
+        self.log_message(f"🔌 检测到网络变化: {', '.join(events)}")
+        # 网络切换后旧的DNS结果和检测结果可能已失效
+        get_resolver().clear()
+        PROBE_FLIGHT.clear()
+        self._wake_event.set()
+    
+    def _monitor_loop(self) -> None:
         """
         网络监控主循环
         """
         consecutive_failures = 0
+        # 连续未检测到门户拦截（no_route / unknown）而跳过登录的次数
+        skipped_logins = 0
         monitor_interval = self.config.get('monitor', {}).get('interval', 240)
+        force_login_after = self.config.get('monitor', {}).get('portal_force_login_after', 3)
         
         while self.monitoring:
             try:
@@ -140,6 +246,9 @@ class NetworkMonitorCore:
                         time.sleep(pause_sleep_time)
                     continue
                 
+                # 本次检测会反映此前的所有网络变化
+                self._wake_event.clear()
+                
                 # 更新检测次数
                 self.network_check_count += 1
                 self.last_check_time = datetime.datetime.now()
@@ -148,45 +257,68 @@ class NetworkMonitorCore:
                 
                 # 检测网络状态
                 try:
-                    network_ok = is_network_available()
+                    network_ok = is_network_available(config=self.config)
                 except Exception as e:
                     self.log_message(f"网络检测失败: {str(e)}")
                     network_ok = False
+                self._save_rtt_state()
                 
                 if network_ok:
                     self.log_message("✅ 网络连接正常")
                     consecutive_failures = 0
+                    skipped_logins = 0
                     self.login_attempt_count = 0
                 else:
                     consecutive_failures += 1
                     self.log_message(f"❌ 网络连接异常 (连续失败{consecutive_failures}次)")
                     
-                    # 检测到网络异常立即尝试登录
-                    self.log_message("🔄 检测到网络异常，立即尝试重新登录")
-                    
-                    # 尝试登录
-                    login_success = self.attempt_login()
-                    
-                    if login_success:
+                    # 被认证门户拦截或认证服务器可达时才登录，认证服务器也不可达时多半是上游断网
+                    portal = self._detect_portal_state()
+                    should_login = False
+                    if portal["state"] == PORTAL_OPEN:
+                        self.log_message("✅ 门户探测显示互联网可达，视为网络正常")
                         consecutive_failures = 0
+                        skipped_logins = 0
                         self.login_attempt_count = 0
-                        self.log_message("✅ 登录成功，重置失败计数")
+                    elif portal["state"] == PORTAL_INTERCEPT:
+                        self.log_message("🔄 检测到认证门户拦截，立即尝试重新登录")
+                        should_login = True
+                    elif portal["auth_reachable"]:
+                        # 未认证时DNS或外网HTTP常被屏蔽，门户探测无法得到拦截页面
+                        self.log_message("🔄 未检测到门户拦截，但认证服务器可达，尝试登录")
+                        should_login = True
+                    elif force_login_after and skipped_logins + 1 >= force_login_after:
+                        self.log_message(f"🔄 已连续{skipped_logins + 1}次未检测到门户拦截，仍尝试登录一次")
+                        should_login = True
                     else:
-                        self.login_attempt_count += 1
-                        self.log_message(f"❌ 登录失败 (第{self.login_attempt_count}次)")
+                        skipped_logins += 1
+                        self.log_message("⚠️ 未检测到认证门户拦截且认证服务器不可达，可能是上游网络故障，跳过登录")
+                    
+                    if should_login:
+                        skipped_logins = 0
+                        # 尝试登录
+                        login_success = self.attempt_login()
                         
-                        # 连续登录失败3次后等待2分钟
-                        if self.login_attempt_count >= 3:
-                            cooldown_time = 120  # 2分钟
-                            self.log_message(f"⏳ 登录连续3次失败，等待{cooldown_time//60}分钟后重试")
-                            # 优化：等待冷却时间，使用更大的睡眠间隔
-                            cooldown_sleep_interval = 10  # 每10秒检查一次
-                            for i in range(0, cooldown_time, cooldown_sleep_interval):
-                                if not self.monitoring:
-                                    return
-                                time.sleep(cooldown_sleep_interval)
+                        if login_success:
+                            consecutive_failures = 0
                             self.login_attempt_count = 0
-                            continue
+                            self.log_message("✅ 登录成功，重置失败计数")
+                        else:
+                            self.login_attempt_count += 1
+                            self.log_message(f"❌ 登录失败 (第{self.login_attempt_count}次)")
+                        
+                            # 连续登录失败3次后等待2分钟
+                            if self.login_attempt_count >= 3:
+                                cooldown_time = 120  # 2分钟
+                                self.log_message(f"⏳ 登录连续3次失败，等待{cooldown_time//60}分钟后重试")
+                                # 优化：等待冷却时间，使用更大的睡眠间隔
+                                cooldown_sleep_interval = 10  # 每10秒检查一次
+                                for i in range(0, cooldown_time, cooldown_sleep_interval):
+                                    if not self.monitoring:
+                                        return
+                                    time.sleep(cooldown_sleep_interval)
+                                self.login_attempt_count = 0
+                                continue
                 
                 # 等待下次检测 - 优化：使用更大的睡眠间隔减少CPU占用
                 next_check = datetime.datetime.now() + datetime.timedelta(seconds=monitor_interval)
@@ -199,7 +331,11 @@ class NetworkMonitorCore:
                 for i in range(0, monitor_interval, sleep_interval):
                     if not self.monitoring:
                         return
-                    time.sleep(sleep_interval)
+                    # 网络变化时提前唤醒，立即进行下一次检测
+                    if self._wake_event.wait(sleep_interval):
+                        if self.monitoring:
+                            self.log_message("🔔 网络状态发生变化，立即重新检测")
+                        break
                     
             except Exception as e:
                 self.log_message(f"❌ 监控过程中发生错误: {str(e)}")
@@ -210,6 +346,44 @@ class NetworkMonitorCore:
                         return
                     time.sleep(error_sleep_interval)
     
+    def _detect_portal_state(self) -> Dict[str, Any]:
+        """
+        探测是否被认证门户拦截；结果为 no_route / unknown 时同时检查认证服务器是否可达
+        
+        返回:
+            Dict[str, Any]: {"state", "auth_reachable"}，state为门户探测结果（open / portal / no_route / unknown），
+                 未启用门户探测或探测失败时返回 portal 以保持原有的"断网即登录"行为
+        """
+        monitor_config = self.config.get('monitor', {})
+        if not monitor_config.get('portal_detection', True):
+            return {"state": PORTAL_INTERCEPT, "auth_reachable": None}
+        
+        try:
+            result = detect_captive_portal(
+                self.config.get('auth_url'),
+                monitor_config.get('portal_probe_url'),
+                verbose=False,
+                check_auth_host=True
+            )
+        except Exception as e:
+            self.log_message(f"门户探测失败: {str(e)}")
+            return {"state": PORTAL_INTERCEPT, "auth_reachable": None}
+        
+        detail = f" ({result['detail']})" if result['detail'] else ""
+        if result['auth_reachable'] is not None:
+            detail += f", 认证服务器{'可达' if result['auth_reachable'] else '不可达'}"
+        self.log_message(f"🔍 门户探测结果: {result['state']}{detail}")
+        return result
+    
+    @staticmethod
+    def _run_login_coroutine(config: Dict[str, Any], coro):
+        """
+        执行登录相关的协程：启用常驻浏览器池时在池的事件循环中执行（复用预热的浏览器），
+        否则用 asyncio.run 在新的事件循环中执行
+        """
+        pool = get_browser_pool(config)
+        return pool.run(coro) if pool else asyncio.run(coro)
+    
     def attempt_login(self) -> bool:
         """
         尝试登录校园网（使用工具类简化）
@@ -221,8 +395,7 @@ class NetworkMonitorCore:
         try:
             # 直接使用 LoginAttemptHandler 进行登录，跳过暂停时间检查
             login_handler = LoginAttemptHandler(self.config)
-            success = asyncio.run(login_handler.attempt_login(skip_pause_check=True))
-            return success
+            return self._run_login_coroutine(self.config, login_handler.attempt_login(skip_pause_check=True))
                 
         except Exception as e:
             self.log_message(f"❌ 登录过程中发生错误: {str(e)}")
@@ -247,8 +420,7 @@ class NetworkMonitorCore:
             login_handler = LoginAttemptHandler(auth_config)
             
             # 执行登录（异步调用），跳过暂停时间检查
-            success = asyncio.run(login_handler.attempt_login(skip_pause_check=True))
-            return success
+            return self._run_login_coroutine(auth_config, login_handler.attempt_login(skip_pause_check=True))
                 
         except Exception as e:
             self.log_message(f"❌ 登录过程中发生错误: {str(e)}")
@@ -269,7 +441,8 @@ class NetworkMonitorCore:
             base_config = ConfigLoader.load_config_from_env()
             auth_config = ConfigAdapter.create_auth_config(gui_config, base_config)
             
-            # 创建认证器实例
+            # 创建认证器实例（延迟导入：监控进程平时不加载Playwright）
+            from campus_login import EnhancedCampusNetworkAuth
             auth = EnhancedCampusNetworkAuth(auth_config)
             
             # 执行手动认证
@@ -296,11 +469,12 @@ class NetworkMonitorCore:
             base_config = ConfigLoader.load_config_from_env()
             auth_config = ConfigAdapter.create_auth_config(gui_config, base_config)
             
-            # 创建认证器实例
+            # 创建认证器实例（延迟导入：监控进程平时不加载Playwright）
+            from campus_login import EnhancedCampusNetworkAuth
             auth = EnhancedCampusNetworkAuth(auth_config)
             
             # 执行连接测试
-            success, message = asyncio.run(auth.test_connection())
+            success, message = self._run_login_coroutine(auth_config, auth.test_connection())
             return success, message
                 
         except Exception as e:
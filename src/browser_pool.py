@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻浏览器池 - 在监控进程中保持一个预热的Chromium，登录时只租用新的上下文
+
+Playwright对象绑定在创建它的事件循环上，而监控线程每次登录都用 asyncio.run 新建事件循环，
+因此浏览器池自带一个后台事件循环线程：登录协程通过 BrowserPool.run 提交到该线程执行，
+BrowserContextManager 在该线程中通过 current_pool() 拿到池并租用上下文。
+
+- 浏览器在第一次租用时启动，之后常驻；空闲超过 pool_idle_timeout 秒后关闭以归还内存
+- 每次租用都新建上下文（Cookie等状态互相隔离），归还时关闭上下文
+- 可选预热：归还后预先打开一个已加载认证页面的上下文，供下一次租用
+- 浏览器崩溃或断开后，下一次租用时重新启动
+- 配置了 BROWSER_CDP_URL 时附加到已运行的浏览器，关闭时只断开连接
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from process_monitor import child_pids, spawned_children
+from utils import LOGIN_COUNTERS, BrowserContextManager, LoggerSetup, PhaseTimer, should_block_request
+
+# 空闲检查的最长间隔（秒）
+MAX_EVICT_CHECK_INTERVAL = 30
+
+
+class BrowserPool:
+    """在后台事件循环线程中维护一个常驻浏览器"""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        参数:
+            config: 配置字典（使用 browser_settings 中的 pool_* 配置和 auth_url）
+        """
+        self.config = config
+        settings = config.get("browser_settings", {})
+        self.idle_timeout = settings.get("pool_idle_timeout", 300)
+        self.prewarm = settings.get("pool_prewarm", False)
+        self.logger = LoggerSetup.setup_logger(f"{__name__}_pool", config.get("logging", {}))
+
+        self.playwright = None
+        self.browser = None
+        self._attached = False
+        # 常驻浏览器的Playwright驱动进程（租用方据此统计进程树资源）
+        self.process_roots: List[int] = []
+        self._launch_key: Optional[Tuple] = None
+        self._browser_settings: Dict[str, Any] = settings
+        self._warm: Optional[Tuple[Any, Any]] = None
+        self._prewarm_task: Optional[asyncio.Task] = None
+        self._leases = 0
+        self._last_used = time.monotonic()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._evict_task: Optional[asyncio.Task] = None
+        self._thread_lock = threading.Lock()
+
+    # ---- 事件循环线程 ----
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动后台事件循环线程（只启动一次）"""
+        with self._thread_lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+
+                def _run_loop():
+                    asyncio.set_event_loop(self._loop)
+                    self._lock = asyncio.Lock()
+                    self._evict_task = self._loop.create_task(self._evict_idle())
+                    ready.set()
+                    self._loop.run_forever()
+
+                self._thread = threading.Thread(target=_run_loop, name="browser-pool", daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def run(self, coro, timeout: Optional[float] = None) -> Any:
+        """
+        在浏览器池的事件循环中执行协程并等待结果（供同步代码调用，代替 asyncio.run）
+
+        参数:
+            coro: 要执行的协程
+            timeout: 等待结果的超时（秒），None表示一直等待
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def in_pool_loop(self) -> bool:
+        """当前是否运行在浏览器池的事件循环中"""
+        try:
+            return self._loop is not None and asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    # ---- 租用与归还 ----
+
+    @staticmethod
+    def _key_of(browser_settings: Dict[str, Any]) -> Tuple:
+        """影响浏览器启动的配置，变化时需要重新启动"""
+        return (bool(browser_settings.get("headless", False)), browser_settings.get("cdp_url") or "")
+
+    def _browser_alive(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    @property
+    def attached(self) -> bool:
+        """当前浏览器是否为附加的外部浏览器（而不是池自己启动的）"""
+        return self._attached
+
+    async def acquire(self, browser_settings: Dict[str, Any], timer: Optional[PhaseTimer] = None) -> Tuple[Any, Any, bool]:
+        """
+        租用一个新的上下文和页面（必须在池的事件循环中调用，用完后调用 release）
+
+        参数:
+            browser_settings: 调用方的浏览器配置
+            timer: 分阶段计时器（记录启动浏览器或租用的耗时）
+
+        返回:
+            Tuple: (上下文, 页面, 本次是否启动了浏览器)
+        """
+        timer = timer or PhaseTimer()
+        async with self._lock:
+            key = self._key_of(browser_settings)
+            if self._browser_alive() and key != self._launch_key and self._leases == 0:
+                self.logger.info("🔄 浏览器配置已变化，重新启动常驻浏览器")
+                await self._close_browser()
+            launched = not self._browser_alive()
+            if launched:
+                await self._close_browser()
+                await self._launch(browser_settings, timer)
+            else:
+                LOGIN_COUNTERS.increment("browser_reuse")
+
+            self._leases += 1
+            self._last_used = time.monotonic()
+            try:
+                with timer.span("pool_lease"):
+                    warm = await self._take_warm()
+                    if warm is not None:
+                        return (*warm, launched)
+                    context = await self.browser.new_context(**BrowserContextManager.context_options(browser_settings))
+                    return context, await context.new_page(), launched
+            except BaseException:
+                self._leases -= 1
+                raise
+
+    def release(self) -> None:
+        """归还上下文（调用方已关闭上下文）"""
+        self._leases = max(0, self._leases - 1)
+        self._last_used = time.monotonic()
+        if self.prewarm and self._leases == 0 and self._warm is None and self._browser_alive():
+            self._prewarm_task = asyncio.ensure_future(self._prepare_warm())
+
+    # ---- 浏览器生命周期 ----
+
+    async def _launch(self, browser_settings: Dict[str, Any], timer: PhaseTimer) -> None:
+        """启动常驻浏览器（或附加到 cdp_url 指定的现有浏览器）"""
+        from playwright.async_api import async_playwright
+
+        children_before = child_pids()
+        with timer.span("playwright_start"):
+            self.playwright = await async_playwright().start()
+        self.browser, self._attached = await BrowserContextManager.open_browser(
+            self.playwright, browser_settings, timer, self.logger)
+        self.process_roots = spawned_children(children_before)
+        self._launch_key = self._key_of(browser_settings)
+        self._browser_settings = browser_settings
+        self.browser.on("disconnected", self._on_disconnected)
+        if self._attached:
+            self.logger.info(f"🌐 常驻浏览器已附加到 {browser_settings.get('cdp_url')}")
+        else:
+            self.logger.info(f"🌐 常驻浏览器已启动，无头模式: {browser_settings.get('headless', False)}")
+
+    def _on_disconnected(self, browser) -> None:
+        """浏览器意外断开（崩溃或被杀死）；主动关闭时 self.browser 已置空，不提示"""
+        if browser is self.browser:
+            self.logger.warning("⚠️ 常驻浏览器已断开，下次登录时重新启动")
+
+    async def _close_browser(self) -> None:
+        """关闭预热的上下文、浏览器和playwright（附加的外部浏览器只断开连接）"""
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+            await asyncio.gather(self._prewarm_task, return_exceptions=True)
+            self._prewarm_task = None
+        warm, self._warm = self._warm, None
+        browser, self.browser = self.browser, None
+        if self._attached:
+            browser, self._attached = None, False
+        playwright, self.playwright = self.playwright, None
+        self.process_roots = []
+        for name, closer in (("预热上下文", warm and warm[0].close),
+                             ("浏览器", browser and browser.close),
+                             ("playwright", playwright and playwright.stop)):
+            if closer:
+                try:
+                    await closer()
+                except Exception as e:
+                    self.logger.debug(f"关闭{name}失败: {e}")
+
+    async def _prepare_warm(self) -> None:
+        """预先打开一个上下文并加载认证页面（拦截不需要的资源）"""
+        settings = self._browser_settings
+        block_types = set(settings.get("block_resource_types", ()))
+        block_patterns = list(settings.get("block_url_patterns", ()))
+
+        async def _route(route):
+            request = route.request
+            if should_block_request(request.resource_type, request.url, block_types, block_patterns):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        context = None
+        try:
+            async with self._lock:
+                if not self._browser_alive() or self._warm is not None:
+                    return
+                context = await self.browser.new_context(**BrowserContextManager.context_options(settings))
+            page = await context.new_page()
+            if settings.get("low_resource_mode", True):
+                await context.route("**/*", _route)
+            await page.goto(self.config.get("auth_url"), wait_until="domcontentloaded",
+                            timeout=settings.get("timeout", 10000))
+            if settings.get("low_resource_mode", True):
+                await context.unroute("**/*", _route)
+            self._warm, context = (context, page), None
+            self.logger.debug("常驻浏览器已预热认证页面")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.debug(f"预热认证页面失败: {e}")
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            self._prewarm_task = None
+
+    async def _take_warm(self) -> Optional[Tuple[Any, Any]]:
+        """取出预热的上下文（页面已关闭或浏览器已重启时丢弃）"""
+        if self._prewarm_task is not None:
+            # 预热尚未完成时不等待，直接新建上下文
+            self._prewarm_task.cancel()
+            await asyncio.gather(self._prewarm_task, return_exceptions=True)
+            self._prewarm_task = None
+        warm, self._warm = self._warm, None
+        if warm is not None and not warm[1].is_closed():
+            return warm
+        return None
+
+    async def _evict_idle(self) -> None:
+        """空闲超过 idle_timeout 秒时关闭浏览器"""
+        interval = max(1.0, min(self.idle_timeout / 2, MAX_EVICT_CHECK_INTERVAL))
+        while True:
+            await asyncio.sleep(interval)
+            if self.browser is None or self._leases:
+                continue
+            idle = time.monotonic() - self._last_used
+            if idle >= self.idle_timeout:
+                async with self._lock:
+                    if self._leases == 0 and self.browser is not None:
+                        self.logger.info(f"💤 常驻浏览器空闲{idle:.0f}秒，关闭以释放内存")
+                        await self._close_browser()
+
+    def shutdown(self, timeout: float = 10) -> None:
+        """关闭浏览器并停止后台事件循环"""
+        with self._thread_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), loop).result(timeout)
+        except Exception as e:
+            self.logger.debug(f"关闭常驻浏览器失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+    async def _stop(self) -> None:
+        """停止空闲检查并关闭浏览器"""
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            await asyncio.gather(self._evict_task, return_exceptions=True)
+        await self._close_browser()
+
+
+_POOL: Optional[BrowserPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_browser_pool(config: Dict[str, Any]) -> Optional[BrowserPool]:
+    """
+    获取进程级共享的浏览器池
+
+    返回:
+        Optional[BrowserPool]: 配置未启用浏览器池（BROWSER_POOL_ENABLED）时返回None
+    """
+    global _POOL
+    if not config.get("browser_settings", {}).get("pool_enabled", False):
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = BrowserPool(config)
+        return _POOL
+
+
+def current_pool() -> Optional[BrowserPool]:
+    """当前事件循环所属的浏览器池；不在池的事件循环中运行时返回None（调用方自行启动浏览器）"""
+    pool = _POOL
+    return pool if pool is not None and pool.in_pool_loop() else None
+
+
+def shutdown_browser_pool() -> None:
+    """关闭共享的浏览器池（监控停止时调用）"""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown()
@@ -5,7 +5,9 @@ import logging
 import os
 import random
 import sys
-from typing import Optional
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
 
 from dotenv import load_dotenv
 from playwright.async_api import (
@@ -14,7 +16,17 @@ from playwright.async_api import (
     Page,
     TimeoutError as PlaywrightTimeoutError,
 )
-from utils import ConfigLoader, LoggerSetup, BrowserContextManager, ExceptionHandler, SimpleRetryHandler
+from browser_pool import current_pool
+from form_discovery import (DISCOVERY_SCRIPT, FILL_AND_SUBMIT_SCRIPT, FORM_ACTION_SCRIPT, FORM_ROLES, ISP_SELECTORS,
+                            PASSWORD_SELECTORS, SUBMIT_SELECTORS, USERNAME_SELECTORS, cached_plan, cached_roles,
+                            discovery_arguments, plan_from_discovery, to_script_selector)
+from http_login import LoginFormParseError, check_login_status, http_login
+from login_state import (ALREADY_LOGGED_IN_MESSAGE, FAILURE_KEYWORDS, LOGGED_IN, LOGIN_FAILED, LOGOUT_TEXT,
+                         PAGE_STATE_SCRIPT, PAGE_TIPS_KEYWORDS, RESULT_TEXT_WAIT_SCRIPT, classify_failure,
+                         match_login_state)
+from selector_cache import get_selector_cache, page_digest
+from utils import (ConfigLoader, LoggerSetup, BrowserContextManager, ExceptionHandler, SimpleRetryHandler,
+                   LOGIN_COUNTERS, PhaseTimer, format_login_counters)
 
 # 加载环境变量
 load_dotenv()
@@ -22,6 +34,29 @@ load_dotenv()
 
 # 配置工具函数 - 已移至utils.py统一管理
 
+# 等待提交完成信号的默认总时长（秒，三种信号共用一个截止时间）
+DEFAULT_COMPLETION_TIMEOUT = 2
+
+COMPLETION_SIGNAL_NAMES = {"response": "表单请求响应", "navigation": "页面跳转", "dom": "PageTips提示变化"}
+
+
+def _submit_response_matcher(action_url: Optional[str]):
+    """
+    构造判断认证请求响应的条件：POST请求，或地址（不含查询参数）与表单 action 一致的请求
+
+    页面上其他脚本发起的 xhr/fetch（统计、轮询等）不算提交完成。
+
+    参数:
+        action_url: 表单提交的目标地址，未知时只匹配POST请求
+    """
+    action = urlsplit(action_url)[:3] if action_url else None
+
+    def _is_submit_response(response) -> bool:
+        request = response.request
+        return request.method == "POST" or (action is not None and urlsplit(request.url)[:3] == action)
+
+    return _is_submit_response
+
 
 class EnhancedCampusNetworkAuth:
     """增强版校园网自动认证类"""
@@ -40,6 +75,20 @@ class EnhancedCampusNetworkAuth:
         self.isp = config.get("isp", "@cmcc")  # 默认使用移动
         self.browser_settings = config.get("browser_settings", {})
         self.retry_settings = config.get("retry_settings", {})
+        self.login_settings = config.get("login", {})
+        self.selector_cache = get_selector_cache(self.login_settings.get("selector_cache_file"))
+        self._page_digest: Optional[str] = None
+        self._winning_selectors: Dict[str, Optional[str]] = {}
+        self._form_plan: Optional[Dict[str, Optional[str]]] = None
+        self._form_discovered = False
+        self._browser_calls = 0
+        self._form_start: Optional[float] = None
+        self._completion_signal: Optional[str] = None
+        self._timer = PhaseTimer()
+        # authenticate 的多次重试共用的浏览器（None表示每次尝试单独启动）
+        self._browser_session: Optional[BrowserContextManager] = None
+        self._browser_launches = 0
+        self._browser_attaches = 0
 
         # 设置日志
         self._setup_logging()
@@ -61,46 +110,97 @@ class EnhancedCampusNetworkAuth:
             self.logger.error(f"访问认证页面时发生错误: {e}")
             return False
 
+    async def read_login_state(self, browser_manager: BrowserContextManager) -> Dict[str, Any]:
+        """
+        一次读取页面的PageTips、注销按钮和正文文本，用预编译的匹配器判定登录状态
+
+        返回:
+            Dict[str, Any]: 判定结果 {"state", "source", "keyword", "span", "reason"}（见 login_state.LoginStateMatcher）
+        """
+        page = browser_manager.page
+        if not page:
+            return match_login_state()
+        snapshot = await page.evaluate(PAGE_STATE_SCRIPT, LOGOUT_TEXT)
+        return match_login_state(snapshot["tips"], snapshot["hasLogout"], snapshot["body"])
+
     async def check_already_logged_in(self, browser_manager: BrowserContextManager) -> bool:
         """✅ 重点增强：精准检测已登录状态（支持你提供的页面结构）"""
         try:
-            page = browser_manager.page
-            if not page:
-                return False
-                
-            # 检测已登录状态的标识符
-            login_indicators = [
-                ('div[name="PageTips"]', ['成功登录', 'already logged in']),
-                ('input[name="logout"], button:has-text("注销"), button:has-text("注  销")', None),
-                ('body', ['您已登录', '在线用户', '当前在线', 'logout', '登出', '注销',
-                          'already logged in', 'online user', 'logged in', 'success'])
-            ]
-            
-            for selector, keywords in login_indicators:
-                try:
-                    element = page.locator(selector)
-                    if await element.count() > 0:
-                        if keywords is None:  # 按钮存在即为登录
-                            if await element.is_visible(timeout=2000):
-                                self.logger.info("✅ 检测到'注销'按钮，说明已登录")
-                                return True
-                        else:  # 检查文本内容
-                            text_content = await element.text_content(timeout=2000)
-                            if text_content:
-                                for keyword in keywords:
-                                    if keyword.lower() in text_content.lower():
-                                        self.logger.info(f"✅ 检测到已登录状态: {keyword}")
-                                        return True
-                except Exception:
-                    continue
-            
+            verdict = await self.read_login_state(browser_manager)
+            if verdict["state"] == LOGGED_IN:
+                self.logger.info(f"✅ 检测到已登录状态: {verdict['keyword']}")
+                return True
             return False
             
         except Exception as e:
             self.logger.warning(f"检测已登录状态时发生异常: {e}")
             return False
     
-    async def _find_and_fill_element(self, browser_manager: BrowserContextManager, selectors: list, value: str, element_type: str) -> bool:
+    async def _discover_form(self, page: Page) -> Optional[Dict[str, Optional[str]]]:
+        """
+        用一次 page.evaluate 评估全部候选选择器，选出账号/密码/运营商/提交按钮可用的选择器
+
+        选择器缓存中有该认证页面的方案时只评估缓存的选择器；页面结构签名不一致或
+        缓存的选择器不再可用时删除该缓存，再评估全部候选。
+
+        返回:
+            Optional[Dict[str, Optional[str]]]: 角色 -> 选择器（未找到为None），脚本执行失败返回None
+        """
+        if self._form_discovered:
+            return self._form_plan
+        self._form_discovered = True
+
+        try:
+            cached = self.selector_cache.get(self.auth_url)
+            plan = None
+            if cached is not None:
+                # 只评估缓存的选择器（每个角色至多一个，而不是全部候选）
+                roles = cached_roles(cached["selectors"])
+                self._browser_calls += 1
+                discovery = await page.evaluate(DISCOVERY_SCRIPT, discovery_arguments(roles))
+                plan = plan_from_discovery(roles, discovery)
+                if page_digest(discovery["signature"]) != cached["digest"] or plan != cached_plan(cached["selectors"]):
+                    self.logger.info("🗑️ 缓存的表单选择器已失效，重新评估全部候选")
+                    self.selector_cache.invalidate(self.auth_url)
+                    plan = None
+            if plan is None:
+                self._browser_calls += 1
+                discovery = await page.evaluate(DISCOVERY_SCRIPT, discovery_arguments(FORM_ROLES))
+                plan = plan_from_discovery(FORM_ROLES, discovery)
+                source = "表单发现"
+            else:
+                source = "表单发现（选择器缓存）"
+        except Exception as e:
+            self.logger.warning(f"⚠️ 表单发现脚本执行失败，回退到逐个选择器查找: {e}")
+            return None
+
+        self._page_digest = page_digest(discovery["signature"])
+        self.logger.info(f"🔍 {source}: " + ", ".join(f"{role}={selector or '未找到'}" for role, selector in plan.items()))
+        self._form_plan = plan
+        return plan
+
+    def _record_selector(self, role: str, selector: str) -> None:
+        """记录生效的选择器，表单提交后写入选择器缓存"""
+        self._winning_selectors[role] = selector
+
+    def _save_selectors(self) -> None:
+        """表单提交成功后保存本次生效的表单方案，供下次登录只评估这些选择器"""
+        if not self._page_digest or not self._form_plan:
+            return
+        selectors = {**self._form_plan, **self._winning_selectors}
+        if selectors.get("username") and selectors.get("password"):
+            self.selector_cache.record(self.auth_url, self._page_digest, selectors)
+
+    def _log_form_stats(self) -> None:
+        """记录表单处理阶段的浏览器调用次数和耗时"""
+        if self._form_start is not None:
+            elapsed = time.perf_counter() - self._form_start
+            self._timer.record("form", elapsed)
+            self.logger.info(f"📊 表单处理: {self._browser_calls}次浏览器调用, 耗时{elapsed * 1000:.0f}ms")
+            self._form_start = None
+
+    async def _find_and_fill_element(self, browser_manager: BrowserContextManager, selectors: list, value: str,
+                                     element_type: str, role: Optional[str] = None) -> bool:
         """
         通用的元素查找和填写方法
         
@@ -109,6 +209,7 @@ class EnhancedCampusNetworkAuth:
             selectors: 选择器列表
             value: 要填入的值
             element_type: 元素类型描述（用于日志）
+            role: 元素角色，提供时使用表单发现的结果并记录生效的选择器
             
         返回:
             bool: 是否成功填写
@@ -116,20 +217,39 @@ class EnhancedCampusNetworkAuth:
         page = browser_manager.page
         if not page:
             return False
+
+        plan = await self._discover_form(page) if role else None
+        if plan is not None:
+            selector = plan.get(role)
+            if not selector:
+                return False
+            try:
+                self._browser_calls += 1
+                await page.locator(selector).first.fill(value)
+                self.logger.info(f"✅ {element_type}填写成功，使用选择器: {selector}")
+                self._record_selector(role, selector)
+                return True
+            except Exception as e:
+                self.logger.warning(f"{element_type}选择器 {selector} 填写失败，回退到逐个选择器查找: {e}")
             
         for selector in selectors:
             try:
                 element = page.locator(selector)
+                self._browser_calls += 1
                 if await element.count() > 0:
                     # 检查元素是否可用
                     is_visible = await element.is_visible()
                     is_enabled = await element.is_enabled()
                     element_input_type = await element.get_attribute('type')
+                    self._browser_calls += 3
                     
                     if is_visible and is_enabled and element_input_type != 'hidden':
                         await element.clear()
                         await element.fill(value)
+                        self._browser_calls += 2
                         self.logger.info(f"✅ {element_type}填写成功，使用选择器: {selector}")
+                        if role:
+                            self._record_selector(role, selector)
                         return True
                     else:
                         self.logger.debug(f"选择器 {selector} 不满足条件: visible={is_visible}, enabled={is_enabled}, type={element_input_type}")
@@ -141,7 +261,7 @@ class EnhancedCampusNetworkAuth:
     async def test_connection(self) -> tuple[bool, str]:
         """测试连接到认证页面（使用上下文管理器修复内存泄漏）"""
         try:
-            async with BrowserContextManager(self.config) as browser_manager:
+            async with BrowserContextManager(self.config, pool=current_pool()) as browser_manager:
                 if not await self.navigate_to_auth_page(browser_manager):
                     return False, "无法访问认证页面"
                 
@@ -156,68 +276,202 @@ class EnhancedCampusNetworkAuth:
             self.logger.error(error_msg)
             return False, error_msg
 
+    async def _wait_for_form(self, page: Page) -> None:
+        """等待表单关键元素出现"""
+        try:
+            self._browser_calls += 1
+            await page.wait_for_selector(
+                'input[name="DDDDD"][type="text"]:visible, input[name="upass"][type="password"]:visible',
+                state="visible", 
+                timeout=3000
+            )
+            self.logger.info("📝 表单元素已加载")
+        except Exception as e:
+            self.logger.warning(f"等待表单元素超时: {e}")
+
+    def _reset_form_state(self) -> None:
+        """每次登录尝试前重置表单发现结果和统计"""
+        self._form_plan = None
+        self._form_discovered = False
+        self._page_digest = None
+        self._winning_selectors = {}
+        self._browser_calls = 0
+        self._form_start = time.perf_counter()
+        self._completion_signal = None
+
+    async def fill_and_submit(self, browser_manager: BrowserContextManager) -> tuple[bool, str]:
+        """
+        填写并提交登录表单
+
+        表单发现找到账号、密码和提交按钮时，用一个脚本原子地完成填写和点击；
+        否则（或原子提交被关闭/失败时）逐项填写后点击提交按钮。
+
+        返回:
+            tuple[bool, str]: (是否成功, 错误信息)
+        """
+        page = browser_manager.page
+        if not page:
+            return False, "页面未初始化"
+        self._reset_form_state()
+
+        if self.login_settings.get("atomic_submit", True):
+            await self._wait_for_form(page)
+            plan = await self._discover_form(page)
+            if plan and plan["username"] and plan["password"] and plan["submit"]:
+                if await self._submit_atomically(page, plan):
+                    self._save_selectors()
+                    return True, ""
+
+        if not await self.fill_login_form(browser_manager):
+            return False, "填写登录表单失败"
+        if not await self.submit_form(browser_manager):
+            return False, "提交登录表单失败"
+        self._save_selectors()
+        return True, ""
+
+    async def _submit_atomically(self, page: Page, plan: Dict[str, Optional[str]]) -> bool:
+        """用一次 page.evaluate 填写账号、密码、运营商并点击提交按钮"""
+        fields = [
+            {"selector": to_script_selector(plan["username"]), "value": self.username, "label": "用户名输入框",
+             "optional": False},
+            {"selector": to_script_selector(plan["password"]), "value": self.password, "label": "密码输入框",
+             "optional": False},
+        ]
+        if self.isp and self.isp.strip() and plan["isp"]:
+            fields.append({"selector": to_script_selector(plan["isp"]), "value": self.isp, "label": "运营商选择框",
+                           "optional": True})
+
+        async def _run_script() -> bool:
+            self._browser_calls += 1
+            error = await page.evaluate(FILL_AND_SUBMIT_SCRIPT,
+                                        {"fields": fields, "submit": to_script_selector(plan["submit"])})
+            if error:
+                self.logger.warning(f"⚠️ 原子提交失败，改为逐项填写: {error}")
+                return False
+            self.logger.info(f"🚀 已通过单次脚本填写并提交认证表单（提交按钮: {plan['submit']}）")
+            return True
+
+        try:
+            if not await self._submit_and_wait(page, _run_script):
+                return False
+        except Exception as e:
+            self.logger.warning(f"⚠️ 原子提交失败，改为逐项填写: {e}")
+            return False
+
+        for role in ("username", "password", "isp", "submit"):
+            if plan[role]:
+                self._record_selector(role, plan[role])
+        return True
+
+    async def _submit_and_wait(self, page: Page, submit_action) -> bool:
+        """
+        执行提交动作，并等待第一个完成信号：表单请求的响应、页面跳转或PageTips提示变化
+
+        三种信号在提交前同时开始监听，共用一个截止时间（默认2秒）；都没有出现时不再额外等待，
+        由 check_auth_result 继续判断。
+
+        参数:
+            page: 页面
+            submit_action: 执行提交的异步函数，返回False表示没有提交
+
+        返回:
+            bool: 是否已提交
+        """
+        try:
+            self._browser_calls += 1
+            action_url = await page.evaluate(FORM_ACTION_SCRIPT)
+        except Exception as e:
+            self.logger.debug(f"读取表单提交地址失败，只按POST请求判断: {e}")
+            action_url = None
+
+        timeout = self.login_settings.get("completion_timeout", DEFAULT_COMPLETION_TIMEOUT)
+        deadline = time.monotonic() + timeout
+        waiters = {
+            asyncio.ensure_future(page.wait_for_event(
+                "response", predicate=_submit_response_matcher(action_url), timeout=timeout * 1000)): "response",
+            asyncio.ensure_future(page.wait_for_event(
+                "framenavigated", predicate=lambda frame: frame == page.main_frame,
+                timeout=timeout * 1000)): "navigation",
+            asyncio.ensure_future(page.evaluate(RESULT_TEXT_WAIT_SCRIPT, {
+                "tips": PAGE_TIPS_KEYWORDS, "failures": FAILURE_KEYWORDS, "timeout": timeout * 1000})): "dom",
+        }
+        # 让监听先注册，再执行提交
+        await asyncio.sleep(0)
+
+        try:
+            start = time.perf_counter()
+            if not await submit_action():
+                return False
+            self._log_form_stats()
+            wait_start = time.perf_counter()
+
+            pending = set(waiters)
+            while pending and self._completion_signal is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None or not task.result():
+                        continue
+                    signal = waiters[task]
+                    result = task.result()
+                    detail = (f"HTTP {result.status}" if signal == "response"
+                              else result.url if signal == "navigation" else result)
+                    self._completion_signal = signal
+                    self.logger.info(f"✅ 表单提交完成（完成信号: {COMPLETION_SIGNAL_NAMES[signal]} {detail}, "
+                                     f"耗时{(time.perf_counter() - start) * 1000:.0f}ms）")
+                    break
+
+            if self._completion_signal is None:
+                self.logger.info("⏱️ 未检测到提交完成信号，继续检查认证结果")
+            elif self._completion_signal != "dom" and deadline > time.monotonic():
+                try:
+                    await page.wait_for_load_state("domcontentloaded",
+                                                   timeout=(deadline - time.monotonic()) * 1000)
+                except Exception as e:
+                    self.logger.debug(f"等待页面加载超时，继续检查登录状态: {e}")
+            self._timer.record("submit_wait", time.perf_counter() - wait_start)
+            return True
+        finally:
+            for task in waiters:
+                task.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+
     async def fill_login_form(self, browser_manager: BrowserContextManager) -> bool:
         """填写登录表单（简化版）"""
         try:
             page = browser_manager.page
             if not page:
                 return False
-                
-            # 等待表单关键元素出现
-            try:
-                await page.wait_for_selector(
-                    'input[name="DDDDD"][type="text"]:visible, input[name="upass"][type="password"]:visible',
-                    state="visible", 
-                    timeout=3000
-                )
-                self.logger.info("📝 表单元素已加载")
-            except Exception as e:
-                self.logger.warning(f"等待表单元素超时: {e}")
-
-            # 用户名选择器（优化优先级）
-            username_selectors = [
-                'input[name="DDDDD"][type="text"]:visible',
-                'input[name="DDDDD"]:not([type="hidden"]):visible',
-                'input[type="text"][placeholder*="学工号"]:visible',
-                'input[type="text"][placeholder*="用户名"]:visible', 
-                'input[name="username"]:visible',
-                'input[type="text"]:visible'
-            ]
-
-            # 密码选择器（优化优先级）
-            password_selectors = [
-                'input[name="upass"][type="password"]:visible',
-                'input[name="upass"]:not([type="hidden"]):visible',
-                'input[type="password"][placeholder*="密码"]:visible',
-                'input[name="password"]:visible',
-                'input[type="password"]:visible'
-            ]
+
+            if not self._form_discovered:
+                await self._wait_for_form(page)
 
             # 填写用户名
-            if not await self._find_and_fill_element(browser_manager, username_selectors, self.username, "用户名"):
+            if not await self._find_and_fill_element(browser_manager, USERNAME_SELECTORS, self.username, "用户名", "username"):
                 self.logger.error("❌ 未找到可见的用户名输入框")
                 return False
 
             # 填写密码
-            if not await self._find_and_fill_element(browser_manager, password_selectors, self.password, "密码"):
+            if not await self._find_and_fill_element(browser_manager, PASSWORD_SELECTORS, self.password, "密码", "password"):
                 self.logger.error("❌ 未找到可见的密码输入框")
                 return False
 
             # 选择运营商（可选）
             if self.isp and self.isp.strip():
-                isp_selectors = [
-                    'select[name="ISP_select"]:visible',
-                    'select[name="isp"]:visible',
-                    '#ISP_select:visible',
-                    '#isp:visible'
-                ]
-                
+                plan = self._form_plan
+                isp_selectors = [plan["isp"]] if plan and plan["isp"] else ([] if plan else ISP_SELECTORS)
+
                 for selector in isp_selectors:
                     try:
                         element = page.locator(selector)
+                        self._browser_calls += 2
                         if await element.count() > 0 and await element.is_visible():
-                            await element.select_option(self.isp)
+                            self._browser_calls += 1
+                            await element.first.select_option(self.isp)
                             self.logger.info(f"🌐 运营商选择成功: {self.isp}")
+                            self._record_selector("isp", selector)
                             break
                     except Exception as e:
                         self.logger.warning(f"运营商选择器 {selector} 失败: {e}")
@@ -237,32 +491,31 @@ class EnhancedCampusNetworkAuth:
             page = browser_manager.page
             if not page:
                 return False
-                
-            # 提交按钮选择器（优化优先级）
-            submit_selectors = [
-                'input[name="0MKKey"][type="button"]:visible',
-                'input[name="0MKKey"]:not([type="hidden"]):visible',
-                'input[onclick*="ee(1)"]:visible',
-                'input[value="登录"][type="button"]:visible',
-                'input[value="登录"]:visible',
-                'input[type="submit"]:visible',
-                'button[type="submit"]:visible',
-                'button:has-text("登录"):visible'
-            ]
+
+            # 表单发现已经选出提交按钮时只尝试该按钮
+            plan = self._form_plan
+            submit_selectors = [plan["submit"]] if plan and plan["submit"] else SUBMIT_SELECTORS
 
             # 尝试点击提交按钮
             for selector in submit_selectors:
                 try:
                     button = page.locator(selector)
+                    self._browser_calls += 1
                     if await button.count() > 0:
                         is_visible = await button.is_visible()
                         is_enabled = await button.is_enabled()
+                        self._browser_calls += 2
                         
                         if is_visible and is_enabled:
                             self.logger.info(f"🚀 正在提交认证表单... 使用选择器: {selector}")
-                            await button.click()
-                            await page.wait_for_timeout(2000)
-                            self.logger.info("✅ 表单提交完成")
+                            self._browser_calls += 1
+
+                            async def _click() -> bool:
+                                await button.click()
+                                return True
+
+                            await self._submit_and_wait(page, _click)
+                            self._record_selector("submit", selector)
                             return True
                         else:
                             self.logger.debug(f"提交按钮 {selector} 不可用: visible={is_visible}, enabled={is_enabled}")
@@ -280,9 +533,12 @@ class EnhancedCampusNetworkAuth:
                 except:
                     self.logger.warning("⚠️ 无法聚焦任何输入框")
             
-            await page.keyboard.press("Enter")
-            await page.wait_for_timeout(1000)
-            self.logger.info("✅ 回车提交完成")
+            async def _press_enter() -> bool:
+                await page.keyboard.press("Enter")
+                self.logger.info("✅ 已回车提交")
+                return True
+
+            await self._submit_and_wait(page, _press_enter)
             return True
 
         except Exception as e:
@@ -300,39 +556,29 @@ class EnhancedCampusNetworkAuth:
             if not page:
                 return False, "页面未初始化"
                 
-            # 等待页面加载完成，但使用更短的超时时间避免长时间等待
-            try:
-                await page.wait_for_load_state("networkidle", timeout=2000)
-            except Exception as e:
-                self.logger.debug(f"等待页面加载超时，继续检查登录状态: {e}")
+            # 没有捕获到提交完成信号时，才等待页面网络空闲（使用较短的超时避免长时间等待）
+            if self._completion_signal is None:
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=2000)
+                except Exception as e:
+                    self.logger.debug(f"等待页面加载超时，继续检查登录状态: {e}")
             
-            # 直接使用check_already_logged_in函数判断登录状态
-            if await self.check_already_logged_in(browser_manager):
-                success_msg = "登录成功: 检测到'您已经成功登录'提示"
-                self.logger.info(f"✅ {success_msg}")
+            # 一次读取页面文本，同时判断成功与失败标识
+            verdict = await self.read_login_state(browser_manager)
+            if verdict["state"] == LOGGED_IN:
+                success_msg = f"登录成功: {verdict['reason']}"
+                self.logger.info(f"✅ {success_msg} (位置: {verdict['source']} {verdict['span'] or ''})")
                 return True, success_msg
             
-            # 如果没有检测到成功登录，检查是否有失败提示
-            failure_indicators = [
-                "认证失败", "登录失败", "用户名或密码错误", "账号或密码", "incorrect",
-                "authentication failed", "login failed", "invalid username or password",
-                "用户不存在", "密码错误", "账户被锁定", "网络异常"
-            ]
-            
-            body_text = (await page.text_content("body") or "")
-            body_text_lower = body_text.lower()
-            
-            # 检查失败标识
-            for indicator in failure_indicators:
-                if indicator.lower() in body_text_lower:
-                    failure_msg = f"登录失败: 检测到失败标识 '{indicator}'"
-                    self.logger.warning(f"❌ {failure_msg}")
-                    # 保存截图用于调试
-                    try:
-                        await browser_manager.take_screenshot("auth_failed.png")
-                    except Exception:
-                        pass
-                    return False, failure_msg
+            if verdict["state"] == LOGIN_FAILED:
+                failure_msg = f"登录失败: 检测到失败标识 '{verdict['keyword']}'"
+                self.logger.warning(f"❌ {failure_msg} (位置: {verdict['source']} {verdict['span']})")
+                # 保存截图用于调试
+                try:
+                    await browser_manager.take_screenshot("auth_failed.png")
+                except Exception:
+                    pass
+                return False, failure_msg
             
             # 如果没有明确的成功或失败标识，默认认为失败
             failure_msg = "登录失败: 未检测到明确的成功标识"
@@ -353,24 +599,75 @@ class EnhancedCampusNetworkAuth:
         pass
 
     async def authenticate_once(self) -> tuple[bool, str]:
-        """执行一次认证尝试（使用上下文管理器修复内存泄漏）"""
+        """执行一次认证尝试：优先使用HTTP快速登录，无法解析表单时回退到浏览器"""
+        self._timer = PhaseTimer()
+        path, success = "browser", False
         try:
-            async with BrowserContextManager(self.config) as browser_manager:
-                if not await self.navigate_to_auth_page(browser_manager):
-                    return False, "无法访问认证页面"
-
-                # ✅ 核心修改：在填表单前先检查是否已登录
-                if await self.check_already_logged_in(browser_manager):
-                    self.logger.info("✅ 检测到已登录状态，跳过认证流程")
-                    return True, "已经处于登录状态"
-
-                if not await self.fill_login_form(browser_manager):
-                    return False, "填写登录表单失败"
-
-                if not await self.submit_form(browser_manager):
-                    return False, "提交登录表单失败"
+            if self.login_settings.get("http_fast_path", True):
+                try:
+                    with self._timer.span("http_login"):
+                        success, message = await http_login(self.auth_url, self.username, self.password, self.isp,
+                                                            timeout=self.login_settings.get("http_timeout", 5),
+                                                            logger=self.logger)
+                    path = "http"
+                    if success:
+                        LOGIN_COUNTERS.increment(
+                            "precheck_online" if message == ALREADY_LOGGED_IN_MESSAGE else "http_login")
+                    return success, message
+                except LoginFormParseError as e:
+                    self.logger.info(f"🔄 HTTP快速登录不可用，改用浏览器登录: {e}")
+                except Exception as e:
+                    self.logger.warning(f"⚠️ HTTP快速登录异常，改用浏览器登录: {e}")
+            elif self.login_settings.get("http_precheck", True):
+                with self._timer.span("precheck"):
+                    online = await self._precheck_online()
+                if online:
+                    path, success = "precheck", True
+                    LOGIN_COUNTERS.increment("precheck_online")
+                    return True, ALREADY_LOGGED_IN_MESSAGE
+
+            success, message = await self._authenticate_with_browser()
+            return success, message
+        finally:
+            self.logger.info(f"📈 登录统计: {format_login_counters()}")
+            self.logger.info(f"⏱️ 登录耗时: {self._timer.finish('success' if success else 'failed', path)}")
+
+    async def _precheck_online(self) -> bool:
+        """启动浏览器前用一次HTTP请求检查是否已在线"""
+        try:
+            verdict = await check_login_status(self.auth_url, self.login_settings.get("http_timeout", 5))
+        except Exception as e:
+            self.logger.debug(f"HTTP预检失败，继续启动浏览器: {e}")
+            return False
+        if verdict["state"] == LOGGED_IN:
+            self.logger.info(f"✅ HTTP预检发现已在线（{verdict['reason']}），跳过浏览器启动")
+            return True
+        if verdict["error"]:
+            self.logger.debug(f"HTTP预检无法访问认证页面: {verdict['error']}")
+        return False
 
-                return await self.check_auth_result(browser_manager)
+    async def _authenticate_with_browser(self) -> tuple[bool, str]:
+        """使用浏览器执行一次认证尝试（使用上下文管理器修复内存泄漏）"""
+        session = self._browser_session
+        try:
+            if session is not None:
+                # 重试共用浏览器：每次尝试只新建上下文和页面，浏览器崩溃时才重新启动
+                session.timer = self._timer
+                launches, attaches = session.launches, session.attaches
+                try:
+                    await session.begin_attempt()
+                    return await self._run_browser_attempt(session)
+                finally:
+                    self._browser_launches += session.launches - launches
+                    self._browser_attaches += session.attaches - attaches
+                    await session.end_attempt()
+
+            async with BrowserContextManager(self.config, timer=self._timer, pool=current_pool()) as browser_manager:
+                try:
+                    return await self._run_browser_attempt(browser_manager)
+                finally:
+                    self._browser_launches += browser_manager.launches
+                    self._browser_attaches += browser_manager.attaches
 
         except Exception as e:
             error_msg = f"认证过程中发生错误: {e}"
@@ -378,74 +675,79 @@ class EnhancedCampusNetworkAuth:
             return False, error_msg
         # 无需手动清理，上下文管理器会自动处理
 
+    async def _run_browser_attempt(self, browser_manager: BrowserContextManager) -> tuple[bool, str]:
+        """在已打开的页面上完成导航、已登录检查、填表提交和结果判断"""
+        if not await self.navigate_to_auth_page(browser_manager):
+            return False, "无法访问认证页面"
+
+        # ✅ 核心修改：在填表单前先检查是否已登录
+        with self._timer.span("check_logged_in"):
+            logged_in = await self.check_already_logged_in(browser_manager)
+        if logged_in:
+            self.logger.info("✅ 检测到已登录状态，跳过认证流程")
+            return True, ALREADY_LOGGED_IN_MESSAGE
+
+        submitted, error_msg = await self.fill_and_submit(browser_manager)
+        if not submitted:
+            return False, error_msg
+
+        with self._timer.span("verify"):
+            return await self.check_auth_result(browser_manager)
+
     async def authenticate(self) -> tuple[bool, str]:
-        """执行完整的认证流程（使用简单重试机制）
+        """执行完整的认证流程（按失败类型决定是否重试及重试间隔）
         
         返回:
             tuple[bool, str]: (是否成功, 详细信息)
         """
         retry_handler = SimpleRetryHandler(self.config)
+        attempts = 0
+        self._browser_launches = 0
+        self._browser_attaches = 0
+        if self.retry_settings.get("reuse_browser", True):
+            # 浏览器在第一次需要时才启动（HTTP快速登录成功时不启动）
+            self._browser_session = BrowserContextManager(self.config, pool=current_pool())
         
         async def auth_operation():
             """重试操作封装"""
+            nonlocal attempts
+            attempts += 1
             return await self.authenticate_once()
         
-        success, result, error_msg = await retry_handler.retry_with_simple_backoff(auth_operation)
+        try:
+            success, result, error_msg = await retry_handler.retry_with_simple_backoff(
+                auth_operation,
+                failure_of=lambda outcome: None if outcome[0] else outcome[1],
+                classify=self._analyze_failure_type
+            )
+        finally:
+            session, self._browser_session = self._browser_session, None
+            if session is not None:
+                await session.close()
+            summary = f"📈 本次登录: 尝试{attempts}次, 浏览器启动{self._browser_launches}次"
+            if self._browser_attaches:
+                summary += f", 附加现有浏览器{self._browser_attaches}次"
+            self.logger.info(summary)
         
         if success:
-            success_status, message = result
-            if success_status:
-                success_info = f"认证成功！({message})"
-                self.logger.info(f"🎉 {success_info}")
-                return True, success_info
-            else:
-                return False, message
+            _, message = result
+            success_info = f"认证成功！({message})"
+            self.logger.info(f"🎉 {success_info}")
+            return True, success_info
         else:
             failure_info = f"认证失败！{error_msg}"
             return False, failure_info
     
     def _analyze_failure_type(self, error_message: str) -> str:
-        """分析失败类型
+        """分析失败类型（见 login_state.classify_failure）
         
         参数:
             error_message: 错误消息
             
         返回:
-            str: 失败类型
+            str: 失败类型（wrong_password / network_error / rate_limited / blacklisted / unknown）
         """
-        error_lower = error_message.lower()
-        
-        # 检测可能的拉黑情况
-        blacklist_indicators = [
-            "authentication fail", "认证失败", "被拒绝", "access denied",
-            "forbidden", "blocked", "banned", "拉黑", "限制", "locked"
-        ]
-        
-        # 检测频率限制
-        rate_limit_indicators = [
-            "too many requests", "rate limit", "频率限制", "请求过于频繁",
-            "timeout", "超时", "connection reset"
-        ]
-        
-        # 检测网络问题
-        network_indicators = [
-            "network error", "网络错误", "connection failed", "连接失败",
-            "dns", "无法访问", "unreachable"
-        ]
-        
-        for indicator in blacklist_indicators:
-            if indicator in error_lower:
-                return "blacklisted"
-        
-        for indicator in rate_limit_indicators:
-            if indicator in error_lower:
-                return "rate_limited"
-        
-        for indicator in network_indicators:
-            if indicator in error_lower:
-                return "network_error"
-        
-        return "unknown"
+        return classify_failure(error_message)
     
     async def manual_auth_fallback(self) -> tuple[bool, str]:
         """手动认证备选方案
@@ -474,6 +776,7 @@ class EnhancedCampusNetworkAuth:
                     return True, "已经处于登录状态"
                 
                 # 填写表单
+                self._reset_form_state()
                 if not await self.fill_login_form(browser_manager):
                     return False, "填写登录表单失败"
                 
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录表单发现 - 用一次 page.evaluate 评估所有候选选择器
+
+逐个候选调用 count / is_visible / is_enabled / get_attribute 时，每次都要跨越
+Python ↔ 驱动 ↔ 浏览器；这里把账号、密码、运营商和提交按钮的全部候选一次性
+交给页面脚本评估，并可选地用一个脚本原子地完成填写和提交。
+
+候选选择器沿用 Playwright 语法，其中 :visible 和 :has-text("...") 伪类
+在脚本中转换为可见性检查和文本过滤。
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+USERNAME_SELECTORS = [
+    'input[name="DDDDD"][type="text"]:visible',
+    'input[name="DDDDD"]:not([type="hidden"]):visible',
+    'input[type="text"][placeholder*="学工号"]:visible',
+    'input[type="text"][placeholder*="用户名"]:visible',
+    'input[name="username"]:visible',
+    'input[type="text"]:visible'
+]
+
+PASSWORD_SELECTORS = [
+    'input[name="upass"][type="password"]:visible',
+    'input[name="upass"]:not([type="hidden"]):visible',
+    'input[type="password"][placeholder*="密码"]:visible',
+    'input[name="password"]:visible',
+    'input[type="password"]:visible'
+]
+
+ISP_SELECTORS = [
+    'select[name="ISP_select"]:visible',
+    'select[name="isp"]:visible',
+    '#ISP_select:visible',
+    '#isp:visible'
+]
+
+SUBMIT_SELECTORS = [
+    'input[name="0MKKey"][type="button"]:visible',
+    'input[name="0MKKey"]:not([type="hidden"]):visible',
+    'input[onclick*="ee(1)"]:visible',
+    'input[value="登录"][type="button"]:visible',
+    'input[value="登录"]:visible',
+    'input[type="submit"]:visible',
+    'button[type="submit"]:visible',
+    'button:has-text("登录"):visible'
+]
+
+FORM_ROLES = {
+    "username": USERNAME_SELECTORS,
+    "password": PASSWORD_SELECTORS,
+    "isp": ISP_SELECTORS,
+    "submit": SUBMIT_SELECTORS,
+}
+
+_HAS_TEXT_PATTERN = re.compile(r':has-text\("([^"]*)"\)')
+
+# 页面脚本共用的辅助函数：与 Playwright 一致，非空包围盒且未被 visibility:hidden 隐藏即为可见
+_JS_HELPERS = """
+    const isVisible = e => {
+        const rect = e.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(e).visibility !== 'hidden';
+    };
+    const query = ([css, text, visibleOnly]) => Array.from(document.querySelectorAll(css))
+        .filter(e => !text || (e.textContent || '').includes(text))
+        .filter(e => !visibleOnly || isVisible(e));
+"""
+
+# 评估所有候选，同时计算页面结构签名（只取表单相关元素的标签、name、type、id，供选择器缓存使用）
+DISCOVERY_SCRIPT = """(roles) => {""" + _JS_HELPERS + """
+    const result = {};
+    for (const [role, candidates] of Object.entries(roles)) {
+        result[role] = candidates.map(candidate => {
+            let matches;
+            try {
+                matches = query(candidate);
+            } catch (err) {
+                return {found: 0, error: String(err)};
+            }
+            const e = matches[0];
+            if (!e) return {found: 0};
+            return {found: matches.length, visible: isVisible(e), enabled: !e.disabled,
+                    type: (e.getAttribute('type') || '').toLowerCase()};
+        });
+    }
+    const signature = Array.from(document.querySelectorAll('form, input, select, button'))
+        .map(e => [e.tagName, e.getAttribute('name') || '', e.getAttribute('type') || '', e.id || ''].join('|'))
+        .join(';');
+    return {signature, roles: result};
+}"""
+
+# 原子地填写并提交：返回空字符串表示成功，否则为错误描述
+FILL_AND_SUBMIT_SCRIPT = """({fields, submit}) => {""" + _JS_HELPERS + """
+    for (const field of fields) {
+        const e = query(field.selector)[0];
+        if (!e) {
+            if (field.optional) continue;
+            return `未找到${field.label}`;
+        }
+        e.focus();
+        e.value = field.value;
+        e.dispatchEvent(new Event('input', {bubbles: true}));
+        e.dispatchEvent(new Event('change', {bubbles: true}));
+        if (e.value !== field.value && !field.optional) return `${field.label}填写失败`;
+    }
+    const button = query(submit)[0];
+    if (!button) return '未找到提交按钮';
+    // 延后点击，避免表单提交引起的页面跳转打断本次 evaluate
+    setTimeout(() => button.click(), 0);
+    return '';
+}"""
+
+# 登录表单提交的目标地址（含密码框的表单的 action，浏览器已解析为绝对地址），没有表单时返回 null
+FORM_ACTION_SCRIPT = """() => {
+    const password = document.querySelector('input[type="password"]');
+    const form = password && password.form;
+    return form ? form.action : null;
+}"""
+
+
+def to_script_selector(selector: str) -> Tuple[str, Optional[str], bool]:
+    """
+    把 Playwright 选择器转换为页面脚本可用的形式
+
+    返回:
+        Tuple[str, Optional[str], bool]: (CSS选择器, 需要包含的文本, 是否只要可见元素)
+    """
+    visible_only = ":visible" in selector
+    css = selector.replace(":visible", "")
+    match = _HAS_TEXT_PATTERN.search(css)
+    text = match.group(1) if match else None
+    css = _HAS_TEXT_PATTERN.sub("", css)
+    return css, text, visible_only
+
+
+def discovery_arguments(roles: Dict[str, Sequence[str]]) -> Dict[str, List]:
+    """构造 DISCOVERY_SCRIPT 的参数"""
+    return {role: [list(to_script_selector(selector)) for selector in selectors] for role, selectors in roles.items()}
+
+
+def choose_selector(selectors: Sequence[str], states: Sequence[Dict[str, Any]]) -> Optional[str]:
+    """
+    按候选顺序选出第一个可用的选择器（存在、可见、可用且不是隐藏输入框）
+
+    参数:
+        selectors: 候选选择器
+        states: DISCOVERY_SCRIPT 返回的对应候选状态
+    """
+    for selector, state in zip(selectors, states):
+        if state.get("found") and state.get("visible") and state.get("enabled") and state.get("type") != "hidden":
+            return selector
+    return None
+
+
+def plan_from_discovery(roles: Dict[str, Sequence[str]], discovery: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """按 DISCOVERY_SCRIPT 的评估结果为每个角色选出选择器（未找到为None）"""
+    return {role: choose_selector(selectors, discovery["roles"][role]) for role, selectors in roles.items()}
+
+
+def cached_roles(selectors: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
+    """把缓存的表单方案转换为只含缓存选择器的候选列表（缓存中未找到的角色没有候选）"""
+    return {role: [selectors[role]] if selectors.get(role) else [] for role in FORM_ROLES}
+
+
+def cached_plan(selectors: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """缓存的表单方案，补齐所有角色，用于和评估结果比较"""
+    return {role: selectors.get(role) for role in FORM_ROLES}
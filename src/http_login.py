@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP快速登录 - 不启动浏览器，直接解析Dr.COM认证页面的表单并提交
+
+流程：GET认证页面 → 检查是否已登录 → 解析包含 DDDDD/upass 的表单 →
+按表单的 action/method 提交账号（带运营商后缀）和密码 → 用与浏览器相同的标识判断结果。
+以下情况抛出 LoginFormParseError，由调用方回退到浏览器登录：
+
+- 无法解析表单或无法识别提交结果
+- 表单由脚本提交且脚本会改写字段（如对密码做哈希/编码），或脚本不在页面内无法检查
+- 提交结果为账号或密码错误（可能是脚本处理导致的误判，由浏览器登录确认后才停止重试）
+"""
+
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urljoin
+
+from login_state import (ALREADY_LOGGED_IN_MESSAGE, LOGGED_IN, LOGIN_FAILED, classify_failure, is_logout_text,
+                         match_login_state)
+from probe_engine import http_request
+
+USERNAME_FIELDS = ("DDDDD", "username")
+PASSWORD_FIELDS = ("upass", "password")
+ISP_FIELDS = ("ISP_select", "isp")
+SUBMIT_FIELD = "0MKKey"
+
+MAX_REDIRECTS = 3
+MAX_PAGE_SIZE = 512 * 1024
+
+_CHARSET_PATTERN = re.compile(rb'charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# 脚本中给字段赋值：f.DDDDD.value = ...、getElementById("upass").value = ...、getElementsByName('upass')[0].value = ...
+_FIELD_ASSIGNMENT_PATTERN = re.compile(r"""\b(\w+)["']?\)?(?:\[\d+\])?\.value\s*=(?!=)\s*([^;\n]*)""")
+
+# 脚本中对密码做哈希/编码的常见函数
+_ENCODING_CALL_PATTERN = re.compile(r"\b(?:hex_md5|md5|sha1|sha256|hmac\w*|encrypt\w*|rsa\w*|btoa|base64\w*)\s*\(",
+                                    re.IGNORECASE)
+
+
+class LoginFormParseError(Exception):
+    """无法从认证页面解析出登录表单（或无法识别提交结果）"""
+
+
+class PortalPageParser(HTMLParser):
+    """
+    认证页面解析器
+
+    收集页面中的表单字段、PageTips提示、注销按钮和正文文本（忽略script/style）
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms: List[Dict[str, Any]] = []
+        self.page_tips = ""
+        self.has_logout = False
+        # 内联脚本和事件处理函数的代码，以及外部脚本的地址（用于判断表单是否由脚本改写后提交）
+        self.scripts: List[str] = []
+        self.external_scripts: List[str] = []
+        self._text: List[str] = []
+        self._form: Optional[Dict[str, Any]] = None
+        self._loose_form = {"action": "", "method": "get", "onsubmit": "", "fields": [], "selects": {}}
+        self._skip_depth = 0
+        self._div_stack: List[bool] = []
+        self._select: Optional[Dict[str, Any]] = None
+        self._button_text: Optional[List[str]] = None
+
+    @property
+    def text(self) -> str:
+        """页面正文文本"""
+        return " ".join(self._text)
+
+    def _current_form(self) -> Dict[str, Any]:
+        return self._form if self._form is not None else self._loose_form
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {key.lower(): value or "" for key, value in attrs}
+        if tag in ("script", "style"):
+            self._skip_depth += 1
+            if tag == "script":
+                if attrs.get("src"):
+                    self.external_scripts.append(attrs["src"])
+                self.scripts.append("")
+        elif tag == "div":
+            self._div_stack.append(attrs.get("name") == "PageTips")
+        elif tag == "form":
+            self._form = {"action": attrs.get("action", ""), "method": attrs.get("method", "get").lower(),
+                          "onsubmit": attrs.get("onsubmit", ""), "fields": [], "selects": {}}
+            self.forms.append(self._form)
+        elif tag == "input":
+            name = attrs.get("name", "")
+            if name == "logout":
+                self.has_logout = True
+            if name:
+                self._current_form()["fields"].append({
+                    "name": name,
+                    "type": attrs.get("type", "text").lower(),
+                    "value": attrs.get("value", ""),
+                    "checked": "checked" in attrs,
+                    "onclick": attrs.get("onclick", ""),
+                })
+        elif tag == "select":
+            self._select = {"name": attrs.get("name", ""), "options": [], "selected": None}
+        elif tag == "option" and self._select is not None:
+            value = attrs.get("value", "")
+            self._select["options"].append(value)
+            if "selected" in attrs:
+                self._select["selected"] = value
+        elif tag == "button":
+            self._button_text = []
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "div" and self._div_stack:
+            self._div_stack.pop()
+        elif tag == "form":
+            self._form = None
+        elif tag == "select" and self._select is not None:
+            if self._select["name"]:
+                self._current_form()["selects"][self._select["name"]] = self._select
+            self._select = None
+        elif tag == "button" and self._button_text is not None:
+            if is_logout_text("".join(self._button_text)):
+                self.has_logout = True
+            self._button_text = None
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            if self.lasttag == "script" and self.scripts:
+                self.scripts[-1] += data
+            return
+        self._text.append(data)
+        if any(self._div_stack):
+            self.page_tips += data
+        if self._button_text is not None:
+            self._button_text.append(data)
+
+    def close(self):
+        super().close()
+        if self._loose_form["fields"]:
+            self.forms.append(self._loose_form)
+
+
+def _decode_page(body: bytes, headers: Dict[str, str]) -> Tuple[str, str]:
+    """
+    按 Content-Type / meta 声明的编码解码页面（Dr.COM页面多为GB2312）
+
+    返回:
+        Tuple[str, str]: (页面文本, 使用的编码)
+    """
+    candidates = []
+    match = _CHARSET_PATTERN.search(headers.get("content-type", "").encode("latin-1", errors="ignore"))
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    match = _CHARSET_PATTERN.search(body[:2048])
+    if match:
+        candidates.append(match.group(1).decode("ascii"))
+    candidates += ["utf-8", "gbk"]
+    for charset in candidates:
+        charset = "gbk" if charset.lower() in ("gb2312", "gb_2312-80") else charset
+        try:
+            return body.decode(charset), charset
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return body.decode("utf-8", errors="ignore"), "utf-8"
+
+
+def parse_portal_page(html: str) -> PortalPageParser:
+    """解析认证页面"""
+    parser = PortalPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def find_login_form(parser: PortalPageParser) -> Dict[str, Any]:
+    """
+    找到同时包含账号和密码输入框的表单
+
+    异常:
+        LoginFormParseError: 页面中没有登录表单
+    """
+    for form in parser.forms:
+        names = {field["name"] for field in form["fields"]}
+        if names & set(USERNAME_FIELDS) and names & set(PASSWORD_FIELDS):
+            return form
+    raise LoginFormParseError("认证页面中未找到账号/密码表单")
+
+
+def _submit_button(form: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """表单的提交按钮（优先 0MKKey），没有按钮时返回None"""
+    buttons = [field for field in form["fields"] if field["type"] in ("submit", "button", "image")]
+    return next((field for field in buttons if field["name"] == SUBMIT_FIELD), buttons[0] if buttons else None)
+
+
+def script_submission_problem(page: PortalPageParser, form: Dict[str, Any]) -> Optional[str]:
+    """
+    检查表单是否由脚本改写字段后提交（直接提交原始字段会得到错误结果）
+
+    允许的改写只有把运营商后缀拼到账号后面（build_login_payload 会同样处理）；
+    密码被哈希/编码、其他字段被改写、或表单由无法检查的外部脚本提交时返回原因。
+
+    返回:
+        Optional[str]: 无法用HTTP直接提交的原因，可以直接提交时返回None
+    """
+    submit = _submit_button(form)
+    handlers = [form["onsubmit"]] + [field["onclick"] for field in form["fields"]]
+    code = "\n".join(page.scripts + [handler for handler in handlers if handler])
+    submitted_by_script = bool(form["onsubmit"]) or submit is None or (
+        submit["type"] == "button" and bool(submit["onclick"]))
+
+    field_names = {field["name"] for field in form["fields"]} | set(form["selects"])
+    for name, value in _FIELD_ASSIGNMENT_PATTERN.findall(code):
+        if name not in field_names:
+            continue
+        referenced = set(re.findall(r"\w+", value)) & field_names
+        if name in USERNAME_FIELDS and referenced <= set(USERNAME_FIELDS) | set(ISP_FIELDS) \
+                and not _ENCODING_CALL_PATTERN.search(value):
+            continue
+        return f"提交前脚本会改写字段 {name}"
+    if _ENCODING_CALL_PATTERN.search(code):
+        return "页面脚本会对提交的字段做哈希/编码"
+    if submitted_by_script and page.external_scripts:
+        return f"表单由脚本提交，且页面引用了无法检查的外部脚本（{', '.join(page.external_scripts)}）"
+    return None
+
+
+def build_login_payload(form: Dict[str, Any], username: str, password: str, isp: str = "") -> List[Tuple[str, str]]:
+    """
+    按表单字段构造提交数据：账号带运营商后缀，保留隐藏字段，只提交一个提交按钮
+
+    返回:
+        List[Tuple[str, str]]: 有序的表单字段
+    """
+    isp = (isp or "").strip()
+    account = username if not isp or username.endswith(isp) else username + isp
+    submit = _submit_button(form)
+
+    payload = []
+    for field in form["fields"]:
+        name, field_type = field["name"], field["type"]
+        if field_type in ("submit", "button", "image", "reset"):
+            if field is submit:
+                payload.append((name, field["value"]))
+        elif field_type in ("checkbox", "radio"):
+            if field["checked"]:
+                payload.append((name, field["value"] or "on"))
+        elif name in USERNAME_FIELDS and field_type != "hidden":
+            payload.append((name, account))
+        elif name in PASSWORD_FIELDS and field_type != "hidden":
+            payload.append((name, password))
+        else:
+            payload.append((name, field["value"]))
+
+    for name, select in form["selects"].items():
+        if name in ISP_FIELDS and isp in select["options"]:
+            payload.append((name, isp))
+        elif select["selected"] is not None or select["options"]:
+            payload.append((name, select["selected"] if select["selected"] is not None else select["options"][0]))
+    return payload
+
+
+async def _fetch(url: str, timeout: float, method: str = "GET", body: Optional[bytes] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Any], str]:
+    """发送请求并跟随Location重定向，返回 (响应, 最终URL)"""
+    for _ in range(MAX_REDIRECTS + 1):
+        response = await http_request(url, timeout, timeout, method=method, max_body=MAX_PAGE_SIZE,
+                                      headers=headers, body=body)
+        location = response["headers"].get("location")
+        if response["status"] not in (301, 302, 303, 307, 308) or not location:
+            return response, url
+        url = urljoin(url, location)
+        if response["status"] in (301, 302, 303):
+            method, body, headers = "GET", None, None
+    return response, url
+
+
+async def _load_portal_page(auth_url: str, timeout: float) -> Tuple[Dict[str, Any], str, str, Optional[PortalPageParser]]:
+    """
+    请求并解析认证页面
+
+    返回:
+        Tuple: (响应, 最终URL, 页面编码, 解析结果)；页面无法访问时解析结果为None
+    """
+    response, page_url = await _fetch(auth_url, timeout)
+    if response["status"] is None:
+        return response, page_url, "utf-8", None
+    html, charset = _decode_page(response["body"], response["headers"])
+    return response, page_url, charset, parse_portal_page(html)
+
+
+async def check_login_status(auth_url: str, timeout: float = 5) -> Dict[str, Any]:
+    """
+    只请求认证页面（不提交表单），用与浏览器相同的标识判断本机是否已在线
+
+    返回:
+        Dict[str, Any]: match_login_state 的判定结果，另附 error（页面无法访问时的错误信息）
+    """
+    response, _, _, page = await _load_portal_page(auth_url, timeout)
+    if page is None:
+        return {**match_login_state(), "error": response["error"]}
+    return {**match_login_state(page.page_tips, page.has_logout, page.text), "error": ""}
+
+
+async def http_login(auth_url: str, username: str, password: str, isp: str = "", timeout: float = 5,
+                     logger: Optional[logging.Logger] = None) -> Tuple[bool, str]:
+    """
+    不启动浏览器完成一次认证
+
+    参数:
+        auth_url: 认证页面地址
+        username: 账号（不含运营商后缀）
+        password: 密码
+        isp: 运营商后缀（如 @cmcc）
+        timeout: 每个请求的超时（秒）
+        logger: 日志记录器
+
+    返回:
+        Tuple[bool, str]: (是否成功, 提示信息)
+
+    异常:
+        LoginFormParseError: 无法解析登录表单或无法识别提交结果，应回退到浏览器登录
+    """
+    logger = logger or logging.getLogger(__name__)
+
+    response, page_url, charset, page = await _load_portal_page(auth_url, timeout)
+    if page is None:
+        return False, f"无法访问认证页面: {response['error']}"
+
+    verdict = match_login_state(page.page_tips, page.has_logout, page.text)
+    if verdict["state"] == LOGGED_IN:
+        logger.info(f"✅ 检测到已登录状态: {verdict['keyword']}")
+        return True, ALREADY_LOGGED_IN_MESSAGE
+
+    form = find_login_form(page)
+    problem = script_submission_problem(page, form)
+    if problem:
+        raise LoginFormParseError(problem)
+    payload = build_login_payload(form, username, password, isp)
+    action = urljoin(page_url, form["action"] or page_url)
+    data = urlencode(payload, encoding=charset, errors="replace")
+    logger.info(f"⚡ 正在通过HTTP提交认证表单: {action}")
+
+    if form["method"] == "post":
+        response, _ = await _fetch(action, timeout, "POST", data.encode("ascii"), {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Referer": page_url,
+        })
+    else:
+        response, _ = await _fetch(f"{action}{'&' if '?' in action else '?'}{data}", timeout,
+                                   headers={"Referer": page_url})
+    if response["status"] is None:
+        return False, f"提交认证表单失败: {response['error']}"
+
+    result = parse_portal_page(_decode_page(response["body"], response["headers"])[0])
+    verdict = match_login_state(result.page_tips, result.has_logout, result.text)
+    if verdict["state"] == LOGGED_IN:
+        return True, f"登录成功: {verdict['reason']}"
+    if verdict["state"] == LOGIN_FAILED:
+        message = f"登录失败: 检测到失败标识 '{verdict['keyword']}'"
+        if classify_failure(message) == "wrong_password":
+            # 账号密码错误会停止重试；HTTP提交可能漏掉了页面脚本的处理，交给浏览器登录确认
+            raise LoginFormParseError(f"HTTP登录返回'{verdict['keyword']}'，需要浏览器登录确认")
+        return False, message
+
+    # 提交结果页没有明确标识（例如靠脚本跳转），重新加载认证页面确认
+    response, _ = await _fetch(auth_url, timeout)
+    if response["status"] is not None:
+        page = parse_portal_page(_decode_page(response["body"], response["headers"])[0])
+        verdict = match_login_state(page.page_tips, page.has_logout, page.text)
+        if verdict["state"] == LOGGED_IN:
+            return True, f"登录成功: {verdict['reason']}"
+    raise LoginFormParseError("无法识别表单提交后的认证结果")
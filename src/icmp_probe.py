@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ICMP Echo 探测 - 最轻量的存活信号（一个数据包，无TCP/TLS握手）
+
+优先使用无需特权的 SOCK_DGRAM ICMP 套接字（受 net.ipv4.ping_group_range 限制），
+不可用时回退到原始套接字（需要root/CAP_NET_RAW）。所有目标共用同一个套接字
+并发发送，按序列号匹配回复。
+"""
+
+import asyncio
+import functools
+import os
+import socket
+import struct
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from probe_engine import _make_result, get_resolver, register_probe
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_HEADER = struct.Struct("!BBHHH")  # type, code, checksum, identifier, sequence
+
+DEFAULT_PAYLOAD = b"campus-network-auth"
+
+
+def _checksum(data: bytes) -> int:
+    """计算ICMP校验和（RFC 1071）"""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(identifier: int, sequence: int, payload: bytes = DEFAULT_PAYLOAD) -> bytes:
+    """构造ICMP Echo请求报文"""
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = _checksum(header + payload)
+    return ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence) + payload
+
+
+def parse_echo_reply(packet: bytes, raw: bool) -> Optional[Tuple[int, int]]:
+    """
+    解析ICMP Echo回复
+
+    参数:
+        packet: 收到的数据
+        raw: 是否来自原始套接字（原始套接字的数据带IP头）
+
+    返回:
+        Optional[Tuple[int, int]]: (identifier, sequence)，不是Echo回复时返回None
+    """
+    if raw:
+        if not packet:
+            return None
+        packet = packet[(packet[0] & 0x0F) * 4:]
+    if len(packet) < ICMP_HEADER.size:
+        return None
+    icmp_type, _, _, identifier, sequence = ICMP_HEADER.unpack_from(packet)
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return identifier, sequence
+
+
+def open_icmp_socket() -> Tuple[socket.socket, bool]:
+    """
+    创建ICMP套接字
+
+    返回:
+        Tuple[socket.socket, bool]: (套接字, 是否为原始套接字)
+
+    异常:
+        PermissionError: 两种套接字都无权限创建
+    """
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        raw = False
+    except OSError:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        raw = True
+    sock.setblocking(False)
+    return sock, raw
+
+
+async def _resolve_ipv4(target: str, timeout: float) -> Tuple[Optional[str], str]:
+    """解析目标的IPv4地址（ICMP探测只支持IPv4）"""
+    answer = await get_resolver().resolve(target, timeout)
+    for address in answer["addresses"]:
+        if ":" not in address:
+            return address, ""
+    return None, answer["error"] or "没有IPv4地址"
+
+
+async def icmp_ping(targets: Sequence[str], timeout: float = 1, count: int = 1,
+                    return_on_first: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    通过同一个ICMP套接字并发ping所有目标
+
+    参数:
+        targets: 目标主机名或IP列表
+        timeout: 等待回复的超时（秒）
+        count: 每个目标发送的Echo请求数（用于计算丢包率）
+        return_on_first: 收到第一个回复后立即返回（用于竞速探测）
+
+    返回:
+        Dict[str, Dict[str, Any]]: 目标 -> {"address", "sent", "received", "pending", "rtt", "loss", "error"}
+            rtt为收到回复的平均往返时间（秒），没有回复时为None；
+            pending为提前返回时尚未超时的请求数，不计入丢包
+    """
+    stats: Dict[str, Dict[str, Any]] = {
+        target: {"address": None, "sent": 0, "received": 0, "pending": 0, "rtt": None, "loss": 1.0, "error": "",
+                 "_rtts": []}
+        for target in targets
+    }
+
+    resolved = await asyncio.gather(*(_resolve_ipv4(target, timeout) for target in targets))
+    for target, (address, error) in zip(targets, resolved):
+        stats[target]["address"] = address
+        stats[target]["error"] = error
+
+    try:
+        sock, raw = open_icmp_socket()
+    except OSError as e:
+        for entry in stats.values():
+            entry["error"] = entry["error"] or f"无法创建ICMP套接字: {e}"
+            del entry["_rtts"]
+        return stats
+
+    loop = asyncio.get_running_loop()
+    identifier = os.getpid() & 0xFFFF
+    sequence = int.from_bytes(os.urandom(2), "big")
+    outstanding: Dict[int, Tuple[str, float]] = {}
+    done = asyncio.Event()
+
+    def _on_readable() -> None:
+        while True:
+            try:
+                packet, (source, _) = sock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            reply = parse_echo_reply(packet, raw)
+            if reply is None:
+                continue
+            reply_id, reply_seq = reply
+            # 非特权套接字的identifier由内核改写，只能按序列号匹配
+            if raw and reply_id != identifier:
+                continue
+            pending = outstanding.get(reply_seq)
+            if pending is None or stats[pending[0]]["address"] != source:
+                continue
+            del outstanding[reply_seq]
+            entry = stats[pending[0]]
+            entry["received"] += 1
+            entry["_rtts"].append(time.perf_counter() - pending[1])
+            if return_on_first or not outstanding:
+                done.set()
+
+    loop.add_reader(sock.fileno(), _on_readable)
+    try:
+        for _ in range(count):
+            for target in targets:
+                entry = stats[target]
+                if not entry["address"]:
+                    continue
+                sequence = (sequence + 1) & 0xFFFF
+                try:
+                    sock.sendto(build_echo_request(identifier, sequence), (entry["address"], 0))
+                except OSError as e:
+                    entry["error"] = str(e)
+                    continue
+                outstanding[sequence] = (target, time.perf_counter())
+                entry["sent"] += 1
+
+        timed_out = False
+        if outstanding:
+            try:
+                await asyncio.wait_for(done.wait(), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+        if not timed_out:
+            # 提前返回：未回复的请求既不算回复也不算丢包
+            for target, _ in outstanding.values():
+                stats[target]["pending"] += 1
+    finally:
+        loop.remove_reader(sock.fileno())
+        sock.close()
+
+    for entry in stats.values():
+        rtts = entry.pop("_rtts")
+        if rtts:
+            entry["rtt"] = sum(rtts) / len(rtts)
+        answered = entry["sent"] - entry["pending"]
+        if answered:
+            entry["loss"] = 1 - entry["received"] / answered
+            if not entry["received"] and not entry["error"]:
+                entry["error"] = "请求超时"
+        elif entry["pending"]:
+            entry["loss"] = 0.0
+            entry["error"] = entry["error"] or "未等待回复"
+    return stats
+
+
+async def probe_icmp(targets: Sequence[str], timeout: float = 1) -> Dict[str, Any]:
+    """
+    探测引擎使用的ICMP探测：任一目标回复即成功
+
+    返回:
+        Dict[str, Any]: 探测结果，附带每个目标的统计 per_target
+    """
+    start = time.perf_counter()
+    per_target = await icmp_ping(targets, timeout, return_on_first=True)
+    replied = [target for target, entry in per_target.items() if entry["received"]]
+    latency = time.perf_counter() - start
+    label = ",".join(targets)
+    if replied:
+        return _make_result("icmp", label, True, per_target[replied[0]]["rtt"], per_target=per_target)
+    errors = "; ".join(f"{target}: {entry['error']}" for target, entry in per_target.items())
+    return _make_result("icmp", label, False, latency, errors, per_target=per_target)
+
+
+@register_probe("icmp")
+def _build_icmp_probes(context: Dict[str, Any]) -> List:
+    """所有ICMP目标共用一个套接字，算作一个探测项，超时取各目标超时的最大值"""
+    targets = list(context["ping_targets"])
+    if not targets:
+        return []
+    timeout = max(context["timeout_for"](f"icmp:{target}") for target in targets)
+    return [functools.partial(probe_icmp, targets, timeout)]
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地网络状态读取 - 直接读取网卡、地址和默认路由，不经过DNS/NSS
+
+Linux 下从 /sys/class/net、/proc/net/route、/proc/net/if_inet6 和 rtnetlink
+（RTM_GETADDR，包含次要地址和别名地址）读取信息，耗时在微秒级；
+其他系统回退到基于主机名的解析。
+"""
+
+import errno
+import logging
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SYS_CLASS_NET = "/sys/class/net"
+PROC_NET_ROUTE = "/proc/net/route"
+PROC_NET_IPV6_ROUTE = "/proc/net/ipv6_route"
+PROC_NET_IF_INET6 = "/proc/net/if_inet6"
+
+SIOCGIFADDR = 0x8915
+RTF_UP = 0x0001
+
+# IPv6 地址作用域：0x00 为全局地址
+IPV6_SCOPE_GLOBAL = 0x00
+
+# rtnetlink 多播组（linux/rtnetlink.h）
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+RTNETLINK_GROUPS = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_IFADDR | RTMGRP_IPV6_ROUTE
+
+# rtnetlink 消息类型
+RTM_EVENT_NAMES = {
+    16: "link_up",        # RTM_NEWLINK
+    17: "link_removed",   # RTM_DELLINK
+    20: "address_added",  # RTM_NEWADDR
+    21: "address_removed",  # RTM_DELADDR
+    24: "route_added",    # RTM_NEWROUTE
+    25: "route_removed",  # RTM_DELROUTE
+}
+
+# struct nlmsghdr: nlmsg_len, nlmsg_type, nlmsg_flags, nlmsg_seq, nlmsg_pid
+NLMSG_HEADER = struct.Struct("=LHHLL")
+NETLINK_ROUTE = 0
+
+# 地址转储（RTM_GETADDR）：struct ifaddrmsg 与 struct rtattr
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+IFADDRMSG = struct.Struct("=BBBBI")  # ifa_family, ifa_prefixlen, ifa_flags, ifa_scope, ifa_index
+RTATTR_HEADER = struct.Struct("=HH")  # rta_len, rta_type
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+
+def _read_text(path: str) -> Optional[str]:
+    """读取 sysfs/procfs 文本文件，失败返回None（例如网卡关闭时读取carrier会报EINVAL）"""
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _align4(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_ipv4_address_messages(data: bytes) -> Tuple[Dict[int, List[str]], bool]:
+    """
+    解析 RTM_GETADDR 转储返回的一段数据
+
+    参数:
+        data: recv 得到的原始字节（可能包含多条消息）
+
+    返回:
+        Tuple[Dict[int, List[str]], bool]: (网卡序号 -> IPv4地址列表, 转储是否已结束)
+            点对点网卡的 IFA_ADDRESS 是对端地址，因此优先使用 IFA_LOCAL
+    """
+    addresses: Dict[int, List[str]] = {}
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        if msg_type in (NLMSG_DONE, NLMSG_ERROR):
+            return addresses, True
+        body = offset + NLMSG_HEADER.size
+        end = min(offset + length, len(data))
+        if msg_type == RTM_NEWADDR and body + IFADDRMSG.size <= end:
+            family, _, _, _, index = IFADDRMSG.unpack_from(data, body)
+            attrs: Dict[int, bytes] = {}
+            position = body + IFADDRMSG.size
+            while position + RTATTR_HEADER.size <= end:
+                rta_len, rta_type = RTATTR_HEADER.unpack_from(data, position)
+                if rta_len < RTATTR_HEADER.size:
+                    break
+                attrs[rta_type] = data[position + RTATTR_HEADER.size:position + rta_len]
+                position += _align4(rta_len)
+            raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+            if family == socket.AF_INET and raw and len(raw) == 4:
+                addresses.setdefault(index, []).append(socket.inet_ntoa(raw))
+        offset += _align4(length)
+    return addresses, False
+
+
+def _read_ipv4_addresses() -> Optional[Dict[str, List[str]]]:
+    """
+    通过 rtnetlink 转储所有IPv4地址（含次要地址和别名地址）
+
+    返回:
+        Optional[Dict[str, List[str]]]: 网卡名 -> 地址列表；netlink 不可用时返回None
+    """
+    if not hasattr(socket, "AF_NETLINK"):
+        return None
+    request = NLMSG_HEADER.pack(NLMSG_HEADER.size + IFADDRMSG.size, RTM_GETADDR, NLM_F_REQUEST | NLM_F_DUMP, 1, 0)
+    request += IFADDRMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+    by_index: Dict[int, List[str]] = {}
+    try:
+        with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+            sock.settimeout(1)
+            sock.bind((0, 0))
+            sock.send(request)
+            done = False
+            while not done:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                chunk, done = parse_ipv4_address_messages(data)
+                for index, addresses in chunk.items():
+                    by_index.setdefault(index, []).extend(addresses)
+    except OSError:
+        return None
+
+    result: Dict[str, List[str]] = {}
+    for index, addresses in by_index.items():
+        try:
+            name = socket.if_indextoname(index)
+        except OSError:
+            continue
+        result.setdefault(name, []).extend(dict.fromkeys(addresses))
+    return result
+
+
+def _get_ipv4_address(sock: socket.socket, name: str) -> Optional[str]:
+    """通过 SIOCGIFADDR 获取网卡的主IPv4地址（netlink 不可用时使用，不含次要地址）"""
+    try:
+        packed = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, struct.pack("256s", name[:15].encode()))
+        return socket.inet_ntoa(packed[20:24])
+    except OSError:
+        return None
+
+
+def _read_ipv6_addresses() -> Dict[str, List[str]]:
+    """解析 /proc/net/if_inet6，只保留全局作用域地址"""
+    addresses: Dict[str, List[str]] = {}
+    content = _read_text(PROC_NET_IF_INET6)
+    if not content:
+        return addresses
+    for line in content.splitlines():
+        fields = line.split()
+        if len(fields) < 6:
+            continue
+        raw, _, _, scope, _, name = fields[:6]
+        if int(scope, 16) != IPV6_SCOPE_GLOBAL:
+            continue
+        address = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(raw))
+        addresses.setdefault(name, []).append(address)
+    return addresses
+
+
+def _read_default_route() -> Dict[str, Optional[str]]:
+    """从 /proc/net/route（及 ipv6_route）读取默认路由所在网卡与网关"""
+    content = _read_text(PROC_NET_ROUTE)
+    if content:
+        best = None
+        for line in content.splitlines()[1:]:
+            fields = line.split()
+            if len(fields) < 8 or fields[1] != "00000000" or fields[7] != "00000000":
+                continue
+            if not int(fields[3], 16) & RTF_UP:
+                continue
+            metric = int(fields[6])
+            if best is None or metric < best[0]:
+                gateway = socket.inet_ntoa(struct.pack("<I", int(fields[2], 16)))
+                best = (metric, fields[0], gateway)
+        if best:
+            return {"interface": best[1], "gateway": best[2], "family": "ipv4"}
+
+    content = _read_text(PROC_NET_IPV6_ROUTE)
+    if content:
+        for line in content.splitlines():
+            fields = line.split()
+            if len(fields) < 10 or fields[0] != "0" * 32 or fields[1] != "00":
+                continue
+            if fields[9] == "lo" or not int(fields[8], 16) & RTF_UP:
+                continue
+            gateway = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(fields[4]))
+            return {"interface": fields[9], "gateway": gateway, "family": "ipv6"}
+
+    return {"interface": None, "gateway": None, "family": None}
+
+
+def _get_linux_network_state() -> Dict[str, Any]:
+    """读取Linux网卡、地址、载波状态和默认路由"""
+    interfaces: Dict[str, Dict[str, Any]] = {}
+    ipv4_by_name = _read_ipv4_addresses()
+    ipv6 = _read_ipv6_addresses()
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for name in sorted(os.listdir(SYS_CLASS_NET)):
+            base = os.path.join(SYS_CLASS_NET, name)
+            carrier = _read_text(os.path.join(base, "carrier"))
+            if ipv4_by_name is not None:
+                ipv4 = ipv4_by_name.get(name, [])
+            else:
+                primary = _get_ipv4_address(sock, name)
+                ipv4 = [primary] if primary else []
+            interfaces[name] = {
+                "operstate": _read_text(os.path.join(base, "operstate")) or "unknown",
+                "carrier": carrier == "1" if carrier is not None else None,
+                "loopback": name == "lo" or any(address.startswith("127.") for address in ipv4),
+                "ipv4": ipv4,
+                "ipv6": ipv6.get(name, []),
+            }
+
+    route = _read_default_route()
+    return {
+        "interfaces": interfaces,
+        "default_interface": route["interface"],
+        "default_gateway": route["gateway"],
+        "source": "linux",
+    }
+
+
+def _get_fallback_network_state() -> Dict[str, Any]:
+    """非Linux系统：通过主机名解析获取本机地址（可能经过DNS）"""
+    ip_list = socket.gethostbyname_ex(socket.gethostname())[2]
+    non_loopback = [ip for ip in ip_list if not ip.startswith("127.")]
+    interfaces = {}
+    if non_loopback:
+        interfaces["hostname"] = {"operstate": "unknown", "carrier": True, "loopback": False,
+                                  "ipv4": non_loopback, "ipv6": []}
+    return {"interfaces": interfaces, "default_interface": None, "default_gateway": None, "source": "hostname"}
+
+
+def _interface_usable(info: Dict[str, Any]) -> bool:
+    """网卡是否可用：非回环、已启用且有地址"""
+    if info["loopback"] or not (info["ipv4"] or info["ipv6"]):
+        return False
+    # 部分虚拟网卡（如tun、WSL）operstate 恒为 unknown，此时以是否有地址为准
+    return info["operstate"] == "up" or (info["operstate"] == "unknown" and info["carrier"] is not False)
+
+
+def get_local_network_state() -> Dict[str, Any]:
+    """
+    获取本地网络状态
+
+    返回:
+        Dict[str, Any]: {
+            "interfaces": {网卡名: {"operstate", "carrier"(None表示未知), "loopback", "ipv4", "ipv6"}},
+            "default_interface": 默认路由所在网卡,
+            "default_gateway": 默认网关,
+            "addresses": 可用网卡上的非回环地址,
+            "connected": 是否已连接到本地网络,
+            "source": 数据来源（linux / hostname）
+        }
+    """
+    if sys.platform.startswith("linux") and fcntl is not None and os.path.isdir(SYS_CLASS_NET):
+        state = _get_linux_network_state()
+    else:
+        state = _get_fallback_network_state()
+
+    addresses = []
+    for info in state["interfaces"].values():
+        if _interface_usable(info):
+            addresses.extend(info["ipv4"] + info["ipv6"])
+    state["addresses"] = addresses
+    state["connected"] = bool(addresses)
+    return state
+
+
+def parse_netlink_messages(data: bytes) -> List[str]:
+    """
+    解析一次 recv 得到的 rtnetlink 数据，返回其中链路/地址/路由事件名
+
+    参数:
+        data: 原始netlink数据（可能包含多条消息）
+
+    返回:
+        List[str]: 事件名列表（见 RTM_EVENT_NAMES），忽略其他消息类型
+    """
+    events = []
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        if msg_type in RTM_EVENT_NAMES:
+            events.append(RTM_EVENT_NAMES[msg_type])
+        # 消息按4字节对齐
+        offset += (length + 3) & ~3
+    return events
+
+
+def _state_fingerprint(state: Dict[str, Any]) -> tuple:
+    """提取与连通性相关的状态，用于过滤无实际变化的事件（如IPv6路由刷新）"""
+    interfaces = tuple(sorted(
+        (name, info["operstate"], info["carrier"], tuple(info["ipv4"]), tuple(info["ipv6"]))
+        for name, info in state["interfaces"].items()
+    ))
+    return interfaces, state["default_interface"], state["default_gateway"]
+
+
+class LinkChangeWatcher:
+    """
+    网络变化监听器 - 链路/地址/路由变化时立即通知监控循环
+
+    Linux 下订阅 rtnetlink 多播组，事件经过防抖合并后回调；
+    netlink 不可用时回退为定期轮询本地网络状态。
+    """
+
+    def __init__(self, callback: Callable[[List[str]], None], debounce: float = 2.0,
+                 poll_interval: float = 10.0, sock: Optional[socket.socket] = None,
+                 logger: Optional[logging.Logger] = None, max_wait: Optional[float] = None):
+        """
+        初始化监听器
+
+        参数:
+            callback: 网络状态变化时调用，参数为合并后的事件名列表
+            debounce: 防抖时间（秒），最后一个事件之后静默这么久才回调
+            poll_interval: 轮询模式下的检查间隔（秒）
+            sock: 已绑定的netlink套接字（测试时可传入socketpair模拟事件流）
+            logger: 日志记录器
+            max_wait: 从第一个未处理事件起最多等待多久（秒）就回调，默认 5 * debounce
+                （事件持续不断时，如链路抖动或DHCP/RA频繁刷新，也能及时唤醒监控）
+        """
+        self.callback = callback
+        self.debounce = debounce
+        self.max_wait = 5 * debounce if max_wait is None else max_wait
+        self.poll_interval = poll_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.mode: Optional[str] = None
+
+        self._sock = sock
+        self._owns_socket = sock is None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_fingerprint: Optional[tuple] = None
+
+    def _open_netlink_socket(self) -> Optional[socket.socket]:
+        """创建并绑定rtnetlink套接字，失败返回None"""
+        if not hasattr(socket, "AF_NETLINK"):
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.bind((0, RTNETLINK_GROUPS))
+            return sock
+        except OSError as e:
+            self.logger.debug(f"无法创建netlink套接字，使用轮询模式: {e}")
+            return None
+
+    def _snapshot(self) -> Optional[tuple]:
+        try:
+            return _state_fingerprint(get_local_network_state())
+        except Exception as e:
+            self.logger.debug(f"读取本地网络状态失败: {e}")
+            return None
+
+    def _notify_if_changed(self, events: List[str]) -> None:
+        """仅在连通性相关状态确实变化时回调"""
+        fingerprint = self._snapshot()
+        if fingerprint is not None and fingerprint == self._last_fingerprint:
+            return
+        self._last_fingerprint = fingerprint
+        try:
+            self.callback(events)
+        except Exception as e:
+            self.logger.warning(f"网络变化回调执行失败: {e}")
+
+    def start(self) -> "LinkChangeWatcher":
+        """启动后台监听线程"""
+        if self._thread and self._thread.is_alive():
+            return self
+        if self._sock is None:
+            self._sock = self._open_netlink_socket()
+        self.mode = "netlink" if self._sock is not None else "polling"
+        self._last_fingerprint = self._snapshot()
+        self._stop_event.clear()
+        target = self._run_netlink if self._sock is not None else self._run_polling
+        self._thread = threading.Thread(target=target, name="link-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止监听"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        if self._sock is not None and self._owns_socket:
+            self._sock.close()
+            self._sock = None
+
+    def _run_netlink(self) -> None:
+        """netlink事件循环：收集事件，静默 debounce 秒后（最迟第一个事件之后 max_wait 秒）合并回调"""
+        pending: List[str] = []
+        first_event = last_event = 0.0
+        while not self._stop_event.is_set():
+            timeout = 0.5
+            if pending:
+                deadline = min(last_event + self.debounce, first_event + self.max_wait)
+                if time.monotonic() >= deadline:
+                    self._notify_if_changed(list(dict.fromkeys(pending)))
+                    pending.clear()
+                else:
+                    timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+            try:
+                readable, _, _ = select.select([self._sock], [], [], timeout)
+                data = self._sock.recv(65536) if readable else None
+            except OSError as e:
+                if self._stop_event.is_set():
+                    return
+                if e.errno == errno.ENOBUFS:
+                    # 接收缓冲区溢出，期间的事件已丢失：按一次变化处理，由防抖后的状态比较重新同步
+                    self.logger.debug("netlink接收缓冲区溢出，重新同步网络状态")
+                    last_event = time.monotonic()
+                    if not pending:
+                        first_event = last_event
+                    pending.append("resync")
+                    continue
+                self._fallback_to_polling(pending, e)
+                return
+            except ValueError as e:
+                if not self._stop_event.is_set():
+                    self._fallback_to_polling(pending, e)
+                return
+
+            if readable:
+                if not data:
+                    if not self._stop_event.is_set():
+                        self._fallback_to_polling(pending, "套接字已关闭")
+                    return
+                events = parse_netlink_messages(data)
+                if events:
+                    last_event = time.monotonic()
+                    if not pending:
+                        first_event = last_event
+                    pending.extend(events)
+
+        if pending and not self._stop_event.is_set():
+            self._notify_if_changed(list(dict.fromkeys(pending)))
+
+    def _fallback_to_polling(self, pending: List[str], reason: Any) -> None:
+        """netlink出错后改用轮询，避免监听线程静默退出"""
+        self.logger.warning(f"⚠️ netlink监听出错，改用轮询模式: {reason}")
+        self.mode = "polling"
+        if self._owns_socket and self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+        if pending:
+            self._notify_if_changed(list(dict.fromkeys(pending)))
+        self._run_polling()
+
+    def _run_polling(self) -> None:
+        """轮询模式：定期比较本地网络状态"""
+        while not self._stop_event.wait(self.poll_interval):
+            self._notify_if_changed(["state_changed"])
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录基准测试 - 对模拟门户执行N次登录，报告延迟分位数和峰值内存
+
+每轮登录前把模拟门户重置为未登录状态，然后调用 EnhancedCampusNetworkAuth.authenticate_once，
+因此每一轮都走完整的登录路径（不经过重试和请求合并）。峰值内存按本进程及其子进程
+（浏览器）的RSS之和采样。
+
+用法:
+    python src/login_benchmark.py -n 20                     # HTTP快速登录路径
+    python src/login_benchmark.py -n 10 --path browser      # 浏览器登录路径
+    python src/login_benchmark.py -n 10 --path browser --pool   # 浏览器登录路径，复用常驻浏览器
+    python src/login_benchmark.py -n 10 --path browser --cdp-url http://127.0.0.1:9222  # 附加到已运行的浏览器
+    python src/login_benchmark.py -n 10 --latency 0.05 --failure-mode wrong_password
+    python src/login_benchmark.py -n 20 --max-p95 1.5       # p95超过1.5秒时退出码为1
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from browser_pool import get_browser_pool, shutdown_browser_pool
+from mock_portal import FAILURE_MODES, MockPortal
+from process_monitor import PeakRssSampler
+from utils import ConfigLoader, LatencyHistogram
+
+LOGIN_PATHS = ("http", "browser")
+
+
+def build_config(portal: MockPortal, args: argparse.Namespace, cache_dir: str) -> Dict[str, Any]:
+    """在 .env 配置的基础上指向模拟门户"""
+    config = ConfigLoader.load_config_from_env()
+    config.update({"username": args.username, "password": args.password, "auth_url": portal.url,
+                   "isp": args.isp})
+    config["browser_settings"]["headless"] = not args.headed
+    config["browser_settings"]["pool_enabled"] = args.pool
+    if args.cdp_url is not None:
+        config["browser_settings"]["cdp_url"] = args.cdp_url
+    config["login"]["http_fast_path"] = args.path == "http"
+    config["login"]["http_precheck"] = False
+    config["login"]["selector_cache_file"] = os.path.join(cache_dir, "selector_cache.json")
+    config["logging"] = {**config["logging"], "level": "DEBUG" if args.verbose else "WARNING", "file": None}
+    return config
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+async def run_benchmark(args: argparse.Namespace) -> int:
+    """
+    执行基准测试并打印报告
+
+    返回:
+        int: 进程退出码（有登录失败或超过 --max-p95 时为1）
+    """
+    # 延迟导入：只有真正执行登录时才加载Playwright
+    from campus_login import EnhancedCampusNetworkAuth
+
+    latencies = LatencyHistogram(max_samples=max(args.iterations, 1))
+    phases: Dict[str, LatencyHistogram] = {}
+    failures: Dict[str, int] = {}
+
+    with MockPortal(args.username, args.password, args.isp, latency=args.latency,
+                    submit_latency=args.submit_latency, failure_mode=args.failure_mode,
+                    failure_rate=args.failure_rate) as portal, \
+            tempfile.TemporaryDirectory() as cache_dir, PeakRssSampler() as sampler:
+        config = build_config(portal, args, cache_dir)
+        pool = get_browser_pool(config)
+        cdp_url = config["browser_settings"].get("cdp_url")
+        print(f"🧪 模拟门户: {portal.url}（路径: {args.path}{', 常驻浏览器池' if pool else ''}"
+              f"{f', 附加浏览器 {cdp_url}' if cdp_url else ''}, "
+              f"故障模式: {args.failure_mode}, 延迟: {args.latency}s）")
+
+        for index in range(args.warmup + args.iterations):
+            portal.reset()
+            auth = EnhancedCampusNetworkAuth(config)
+            if args.verbose and not any(isinstance(h, logging.StreamHandler) for h in auth.logger.handlers):
+                auth.logger.addHandler(logging.StreamHandler())
+            start = time.perf_counter()
+            if pool:
+                success, message = await asyncio.get_running_loop().run_in_executor(
+                    None, pool.run, auth.authenticate_once())
+            else:
+                success, message = await auth.authenticate_once()
+            elapsed = time.perf_counter() - start
+            if index < args.warmup:
+                continue
+            latencies.observe(elapsed)
+            for name, seconds in auth._timer.phases.items():
+                phases.setdefault(name, LatencyHistogram(max_samples=max(args.iterations, 1))).observe(seconds)
+            if not success:
+                failures[message] = failures.get(message, 0) + 1
+            if args.verbose:
+                print(f"  #{index - args.warmup + 1}: {'✅' if success else '❌'} {_ms(elapsed)} {message}")
+
+        shutdown_browser_pool()
+
+    summary = latencies.summary()
+    failed = sum(failures.values())
+    print(f"\n📊 {summary['count']} 次登录, 成功 {summary['count'] - failed}, 失败 {failed}")
+    print(f"⏱️ 延迟: p50={_ms(summary['p50'])} p95={_ms(summary['p95'])} max={_ms(summary['max'])}")
+    for name, histogram in phases.items():
+        stats = histogram.summary()
+        print(f"   {name:<16} n={stats['count']:<4} p50={_ms(stats['p50']):>7} p95={_ms(stats['p95']):>7} "
+              f"max={_ms(stats['max']):>7}")
+    peak = sampler.peak_bytes()
+    print(f"💾 峰值RSS: {peak / 1024 / 1024:.1f} MB" if peak else "💾 峰值RSS: 无法获取")
+    for message, count in failures.items():
+        print(f"❌ {count} 次: {message}")
+
+    if args.max_p95 is not None and summary["p95"] is not None and summary["p95"] > args.max_p95:
+        print(f"⚠️ p95 {_ms(summary['p95'])} 超过阈值 {_ms(args.max_p95)}")
+        return 1
+    return 1 if failed and args.failure_mode == "ok" else 0
+
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="对模拟认证门户执行登录基准测试")
+    parser.add_argument("-n", "--iterations", type=int, default=10, help="登录次数（默认 10）")
+    parser.add_argument("--warmup", type=int, default=1, help="不计入统计的预热次数（默认 1）")
+    parser.add_argument("--path", choices=LOGIN_PATHS, default="http",
+                        help="登录路径：http 为HTTP快速登录（失败时回退浏览器），browser 为浏览器登录")
+    parser.add_argument("--latency", type=float, default=0, help="模拟门户每个请求的延迟（秒）")
+    parser.add_argument("--submit-latency", type=float, default=0, help="模拟门户提交表单的额外延迟（秒）")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="ok", help="模拟门户的故障模式")
+    parser.add_argument("--failure-rate", type=float, default=1.0, help="故障模式生效的概率（0~1）")
+    parser.add_argument("--username", default="test", help="测试账号（默认 test）")
+    parser.add_argument("--password", default="test", help="测试密码（默认 test）")
+    parser.add_argument("--isp", default="@cmcc", help="运营商后缀（默认 @cmcc）")
+    parser.add_argument("--headed", action="store_true", help="显示浏览器窗口")
+    parser.add_argument("--pool", action="store_true", help="使用常驻浏览器池（对比冷启动与预热的延迟）")
+    parser.add_argument("--cdp-url", default=None,
+                        help="附加到已运行浏览器的DevTools端点（如 http://127.0.0.1:9222），不可用时启动新浏览器")
+    parser.add_argument("--max-p95", type=float, default=None, help="p95延迟阈值（秒），超过时退出码为1")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印每次登录的结果和详细日志")
+    return parser.parse_args(argv)
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    try:
+        sys.exit(asyncio.run(run_benchmark(args)))
+    except KeyboardInterrupt:
+        print("\n👋 用户中断，程序退出")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
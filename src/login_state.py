@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录状态判定 - 浏览器登录与HTTP登录共用的成功/失败标识
+
+本模块不依赖Playwright，HTTP登录路径可以单独使用。
+"""
+
+import re
+from typing import Any, Dict, Iterable, Match, Optional, Pattern, Tuple
+
+# PageTips 提示区域中表示已登录的关键字
+PAGE_TIPS_KEYWORDS = ['成功登录', 'already logged in']
+
+# 注销按钮的文字（忽略空白，兼容"注  销"写法）
+LOGOUT_TEXT = '注销'
+
+# 页面正文中表示已登录的关键字
+BODY_LOGIN_KEYWORDS = ['您已登录', '在线用户', '当前在线', 'logout', '登出', '注销',
+                       'already logged in', 'online user', 'logged in', 'success']
+
+# 页面正文中表示请求过于频繁的关键字（频率限制页面没有其他失败标识）
+RATE_LIMIT_KEYWORDS = ["请求过于频繁", "频率限制", "too many requests"]
+
+# 页面正文中表示登录失败的关键字
+FAILURE_KEYWORDS = [
+    "认证失败", "登录失败", "用户名或密码错误", "账号或密码", "incorrect",
+    "authentication failed", "login failed", "invalid username or password",
+    "用户不存在", "密码错误", "账户被锁定", "网络异常", *RATE_LIMIT_KEYWORDS
+]
+
+# 失败信息的分类关键字，按顺序匹配（见 classify_failure）
+FAILURE_TYPE_INDICATORS = (
+    # 账号或密码错误（重试只会增加被锁定的风险）
+    ("wrong_password", ("用户名或密码错误", "账号或密码", "密码错误", "用户不存在",
+                        "incorrect", "invalid username or password")),
+    # 网络问题（包括浏览器和socket的超时、连接被重置）
+    ("network_error", ("network error", "网络错误", "网络异常", "connection failed", "连接失败",
+                       "dns", "无法访问", "unreachable", "timeout", "timed out", "超时", "connection reset")),
+    # 频率限制
+    ("rate_limited", ("rate limit", *RATE_LIMIT_KEYWORDS)),
+    # 可能被拉黑
+    ("blacklisted", ("authentication fail", "认证失败", "被拒绝", "access denied",
+                     "forbidden", "blocked", "banned", "拉黑", "限制", "locked", "锁定")),
+)
+
+# 浏览器中等待认证结果提示的脚本：只在提交后的DOM变化时检查，
+# PageTips出现已登录关键字或正文出现失败关键字即返回该关键字，超时返回null
+RESULT_TEXT_WAIT_SCRIPT = """({tips, failures, timeout}) => new Promise(resolve => {
+    const find = (text, keywords) => keywords.find(keyword => text.includes(keyword.toLowerCase()));
+    const check = () => {
+        const node = document.querySelector('div[name="PageTips"]');
+        const hit = find(((node && node.textContent) || '').toLowerCase(), tips);
+        return hit || find(((document.body && document.body.innerText) || '').toLowerCase(), failures);
+    };
+    const observer = new MutationObserver(() => {
+        const hit = check();
+        if (hit) {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(hit);
+        }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true, attributes: true});
+    const timer = setTimeout(() => {
+        observer.disconnect();
+        resolve(null);
+    }, timeout);
+})"""
+
+
+# 浏览器中一次性读取判定所需的全部页面信息：PageTips文本、是否有可见的注销按钮、正文文本
+PAGE_STATE_SCRIPT = """(logoutText) => {
+    const isVisible = e => {
+        const rect = e.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(e).visibility !== 'hidden';
+    };
+    const tips = document.querySelector('div[name="PageTips"]');
+    const hasLogout = Array.from(document.querySelectorAll('input[name="logout"], button'))
+        .some(e => isVisible(e) && (e.tagName === 'INPUT' || (e.textContent || '').replace(/\\s+/g, '').includes(logoutText)));
+    return {
+        tips: tips ? tips.textContent || '' : '',
+        hasLogout,
+        body: document.body ? document.body.textContent || '' : ''
+    };
+}"""
+
+# 判定结果
+LOGGED_IN = "logged_in"
+LOGIN_FAILED = "failed"
+LOGIN_UNKNOWN = "unknown"
+
+# 登录前发现已在线时返回的提示
+ALREADY_LOGGED_IN_MESSAGE = "已经处于登录状态"
+
+
+def classify_failure(message: str) -> str:
+    """
+    把登录失败信息归类为失败类型（决定重试策略，见 utils.RETRY_POLICIES）
+
+    按 账号密码错误 → 网络问题 → 频率限制 → 拉黑 的顺序匹配，
+    避免"频率限制"被"限制"误判为拉黑、"无法访问...超时"被误判为频率限制。
+
+    返回:
+        str: wrong_password / network_error / rate_limited / blacklisted / unknown
+    """
+    lowered = (message or "").lower()
+    for failure_type, indicators in FAILURE_TYPE_INDICATORS:
+        if any(indicator in lowered for indicator in indicators):
+            return failure_type
+    return "unknown"
+
+
+def is_logout_text(text: str) -> bool:
+    """按钮文字是否为注销"""
+    return LOGOUT_TEXT in re.sub(r"\s+", "", text or "")
+
+
+class LoginStateMatcher:
+    """
+    登录状态匹配器
+
+    成功和失败关键字预先编译为一个正则（同一位置优先匹配较长的关键字，不论成功还是失败），
+    正文只扫描一遍；判定优先级与原来的逐项检查一致：
+    PageTips成功提示 > 注销按钮 > 正文成功关键字 > 正文失败关键字。
+    """
+
+    def __init__(self, tips_keywords: Iterable[str] = PAGE_TIPS_KEYWORDS,
+                 body_keywords: Iterable[str] = BODY_LOGIN_KEYWORDS,
+                 failure_keywords: Iterable[str] = FAILURE_KEYWORDS):
+        self._tips_pattern, _ = self._compile({"success": tips_keywords})
+        self._body_pattern, self._body_kinds = self._compile({"success": body_keywords, "failure": failure_keywords})
+
+    @staticmethod
+    def _compile(groups: Dict[str, Iterable[str]]) -> Tuple[Pattern, Dict[str, str]]:
+        """编译关键字正则，返回 (正则, 小写关键字 -> 分组名)；同一关键字出现在多个分组时取靠前的分组"""
+        kinds: Dict[str, str] = {}
+        for name, keywords in reversed(list(groups.items())):
+            for keyword in keywords:
+                if keyword:
+                    kinds[keyword.lower()] = name
+        if not kinds:
+            return re.compile(r"(?!)"), kinds  # 没有关键字时永不匹配
+        alternatives = "|".join(re.escape(keyword) for keyword in sorted(kinds, key=len, reverse=True))
+        return re.compile(alternatives, re.IGNORECASE), kinds
+
+    @staticmethod
+    def _verdict(state: str, source: str, match: Optional[Match] = None, keyword: str = "") -> Dict[str, Any]:
+        keyword = match.group() if match else keyword
+        return {"state": state, "source": source, "keyword": keyword,
+                "span": match.span() if match else None, "reason": f"检测到'{keyword}'" if keyword else ""}
+
+    def match(self, page_tips: str = "", has_logout: bool = False, body_text: str = "") -> Dict[str, Any]:
+        """
+        判定登录状态
+
+        参数:
+            page_tips: div[name="PageTips"] 的文本
+            has_logout: 页面是否存在可见的注销按钮
+            body_text: 页面正文文本
+
+        返回:
+            Dict[str, Any]: {"state", "source", "keyword", "span", "reason"}
+                state为 logged_in / failed / unknown；source为命中的位置（page_tips / logout / body）；
+                span为关键字在对应文本中的 (起始, 结束) 位置
+        """
+        match = self._tips_pattern.search(page_tips or "")
+        if match:
+            return self._verdict(LOGGED_IN, "page_tips", match)
+        if has_logout:
+            return self._verdict(LOGGED_IN, "logout", keyword="注销按钮")
+
+        failure = None
+        for match in self._body_pattern.finditer(body_text or ""):
+            if self._body_kinds.get(match.group().lower()) == "success":
+                return self._verdict(LOGGED_IN, "body", match)
+            if failure is None:
+                failure = match
+        if failure:
+            return self._verdict(LOGIN_FAILED, "body", failure)
+        return {"state": LOGIN_UNKNOWN, "source": "", "keyword": "", "span": None, "reason": ""}
+
+
+_MATCHER = LoginStateMatcher()
+
+
+def match_login_state(page_tips: str = "", has_logout: bool = False, body_text: str = "") -> Dict[str, Any]:
+    """使用默认关键字判定登录状态（参见 LoginStateMatcher.match）"""
+    return _MATCHER.match(page_tips, has_logout, body_text)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录子进程 - 在短生命周期的子进程中完成需要Playwright的登录
+
+监控进程常驻运行却只偶尔需要登录，把 Playwright（及其驱动和浏览器）放到子进程中，
+登录结束后随子进程一起退出，监控进程本身只保留网络探测代码。
+
+协议：父进程把 {"config": 配置, "spawned_at": 启动时间戳, "latency": 已有的登录耗时样本}
+以JSON写入子进程的stdin；子进程在stdout的最后一行输出JSON结果：
+
+    {"success", "message", "startup_time", "import_time", "login_time", "peak_rss", "counters", "latency"}
+
+counters 和 latency 是子进程中新记录的登录计数和分阶段耗时样本，由父进程合并到
+LOGIN_COUNTERS 和 LOGIN_LATENCY；子进程先载入父进程的耗时样本，日志中的分位数与父进程一致。
+
+子进程的日志写入配置的日志文件和stderr，stdout只用于返回结果。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from process_monitor import PeakRssSampler
+from utils import LOGIN_COUNTERS, LOGIN_LATENCY
+
+WORKER_SCRIPT = Path(__file__).resolve()
+
+# 子进程没有返回结果时的默认超时（秒）
+DEFAULT_WORKER_TIMEOUT = 300
+
+
+def worker_available() -> bool:
+    """能否以子进程方式运行登录（打包成单个可执行文件时没有独立的Python解释器可用）"""
+    return not getattr(sys, "frozen", False) and WORKER_SCRIPT.exists()
+
+
+def _failure(message: str, **extra) -> Dict[str, Any]:
+    return {"success": False, "message": message, "startup_time": None, "import_time": None,
+            "login_time": None, "peak_rss": None, "counters": {}, "latency": {}, **extra}
+
+
+async def run_login_worker(config: Dict[str, Any], timeout: float = DEFAULT_WORKER_TIMEOUT,
+                           logger: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """
+    启动登录子进程并等待结果（在监控进程中调用，不会加载Playwright）
+
+    参数:
+        config: 配置字典
+        timeout: 等待子进程的超时（秒），超时后结束子进程
+        logger: 日志记录器
+
+    返回:
+        Dict[str, Any]: 子进程返回的结果，另附 wall_time（父进程视角的总耗时）
+    """
+    logger = logger or logging.getLogger(__name__)
+    start = time.perf_counter()
+    request = json.dumps({"config": config, "spawned_at": time.time(), "latency": LOGIN_LATENCY.export()},
+                         ensure_ascii=False, default=str)
+
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(WORKER_SCRIPT),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        cwd=os.getcwd()
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(request.encode("utf-8")), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        result = _failure(f"登录子进程超时（{timeout:.0f}秒），已结束")
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    else:
+        lines = [line for line in stdout.decode("utf-8", errors="replace").splitlines() if line.strip()]
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, ValueError):
+            result = _failure(f"登录子进程异常退出（退出码 {process.returncode}）")
+
+    result["wall_time"] = time.perf_counter() - start
+    for name, count in (result.get("counters") or {}).items():
+        LOGIN_COUNTERS.increment(name, count)
+    LOGIN_LATENCY.merge(result.get("latency") or {})
+    LOGIN_LATENCY.observe("worker", result["wall_time"])
+    if result.get("startup_time") is not None:
+        LOGIN_LATENCY.observe("worker_startup", result["startup_time"])
+
+    peak = f"{result['peak_rss'] / 1024 / 1024:.0f}MB" if result.get("peak_rss") else "未知"
+    startup = f"{result['startup_time'] * 1000:.0f}ms" if result.get("startup_time") is not None else "未知"
+    logger.info(f"🧩 登录子进程: 启动{startup}, 总耗时{result['wall_time']:.1f}s, 峰值RSS {peak}")
+    return result
+
+
+async def _login(config: Dict[str, Any]) -> Dict[str, Any]:
+    """在子进程中执行登录"""
+    from campus_login import EnhancedCampusNetworkAuth
+
+    auth = EnhancedCampusNetworkAuth(config)
+    success, message = await auth.authenticate()
+    return {"success": success, "message": message}
+
+
+def main() -> int:
+    """子进程入口"""
+    entered = time.time()
+    request = json.loads(sys.stdin.read() or "{}")
+    # stdout只用于返回结果，其他输出（print、第三方库）都转到stderr
+    result_stream, sys.stdout = sys.stdout, sys.stderr
+    LOGIN_LATENCY.merge(request.get("latency") or {})
+    latency_start = LOGIN_LATENCY.counts()
+
+    with PeakRssSampler(interval=0.2) as sampler:
+        import_start = time.perf_counter()
+        import campus_login  # noqa: F401  加载Playwright，单独计时
+        import_time = time.perf_counter() - import_start
+        startup_time = time.time() - request.get("spawned_at", entered)
+
+        login_start = time.perf_counter()
+        try:
+            result = asyncio.run(_login(request["config"]))
+        except Exception as e:
+            result = _failure(f"登录子进程发生错误: {e}")
+        login_time = time.perf_counter() - login_start
+
+    result.update({
+        "startup_time": startup_time,
+        "import_time": import_time,
+        "login_time": login_time,
+        "peak_rss": sampler.peak_bytes(),
+        "counters": LOGIN_COUNTERS.snapshot(),
+        "latency": LOGIN_LATENCY.export(since=latency_start),
+    })
+    result_stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+    result_stream.flush()
+    return 0 if result["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟Dr.COM认证门户 - 不依赖真实的 172.29.0.2 演练登录流程
+
+提供登录页、登录成功页、登录失败页和已登录页，表单字段与真实门户一致
+（DDDDD / upass / ISP_select / 0MKKey / PageTips），页面按GB2312编码输出。
+可以配置每个请求的延迟以及提交表单时的故障模式：
+
+    ok              正常登录（账号密码不匹配时返回失败页）
+    wrong_password  返回"用户名或密码错误"
+    rate_limited    返回"请求过于频繁"（没有已知的失败标识，登录方需回退或重试）
+    server_error    返回HTTP 500
+    timeout         提交后不响应，直到请求超时
+    blank           返回空白页面（模拟靠脚本跳转的结果页）
+
+单独运行: python src/mock_portal.py --port 8080 --latency 0.1 --failure-mode wrong_password
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+FAILURE_MODES = ("ok", "wrong_password", "rate_limited", "server_error", "timeout", "blank")
+
+PAGE_CHARSET = "gb2312"
+
+# 1x1 透明GIF，作为页面上的图片资源（低资源模式下应被拦截）
+_PIXEL_GIF = (b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00"
+              b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;")
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=gb2312">
+<title>{title}</title>
+</head>
+<body>
+<img src="/images/logo.gif" width="1" height="1">
+{content}
+</body>
+</html>"""
+
+# 登录页不能出现任何登录成功/失败标识（如 注销、success），否则会被误判为已登录
+_LOGIN_CONTENT = """<script type="text/javascript">
+function ee(flag) {
+    // 与真实门户一致：提交前把运营商后缀拼到账号后面
+    var f = document.f1;
+    f.DDDDD.value = f.DDDDD.value + f.ISP_select.value;
+    f.submit();
+}
+</script>
+<form name="f1" method="post" action="/">
+<div name="PageTips">请输入学工号和密码</div>
+<input type="text" name="DDDDD" placeholder="学工号" value="">
+<input type="password" name="upass" placeholder="密码" value="">
+<select name="ISP_select">
+<option value="">校园网</option>
+<option value="@cmcc">中国移动</option>
+<option value="@unicom">中国联通</option>
+<option value="@telecom">中国电信</option>
+<option value="@edu">教育网</option>
+</select>
+<input type="hidden" name="R1" value="0">
+<input type="hidden" name="para" value="00">
+<input type="button" name="0MKKey" value="登录" onclick="ee(1)">
+</form>"""
+
+_ONLINE_CONTENT = """<form name="f2" method="post" action="/logout">
+<div name="PageTips">您已经成功登录。</div>
+<p>当前账号: {account}</p>
+<input type="submit" name="logout" value="注销">
+</form>"""
+
+_FAILURE_CONTENT = """<div name="PageTips">{message}</div>
+<a href="/">返回</a>"""
+
+
+class MockPortal:
+    """
+    在本机线程中运行的模拟认证门户
+
+    用法:
+        with MockPortal(username="20210001", password="secret", latency=0.05) as portal:
+            config["auth_url"] = portal.url
+    """
+
+    def __init__(self, username: str = "test", password: str = "test", isp: str = "@cmcc",
+                 host: str = "127.0.0.1", port: int = 0, latency: float = 0, submit_latency: float = 0,
+                 failure_mode: str = "ok", failure_rate: float = 1.0, start_online: bool = False):
+        """
+        参数:
+            username: 接受的账号（不含运营商后缀）
+            password: 接受的密码
+            isp: 接受的运营商后缀
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            latency: 每个请求的额外延迟（秒）
+            submit_latency: 提交表单的额外延迟（秒）
+            failure_mode: 提交表单时的故障模式，见 FAILURE_MODES
+            failure_rate: 故障模式生效的概率（0~1）
+            start_online: 启动时是否处于已登录状态
+        """
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"未知的故障模式: {failure_mode}（可选: {', '.join(FAILURE_MODES)}）")
+        self.account = username + isp
+        self.password = password
+        self.latency = latency
+        self.submit_latency = submit_latency
+        self.failure_mode = failure_mode
+        self.failure_rate = failure_rate
+        self.online = start_online
+        self.submit_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """认证页面地址"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockPortal":
+        """在后台线程中开始服务"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="mock-portal", daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """在当前线程中服务，直到被中断"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """停止服务"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._server.server_close()
+
+    def reset(self, online: bool = False) -> None:
+        """重置登录状态（基准测试每轮开始前调用）"""
+        with self._lock:
+            self.online = online
+
+    def __enter__(self) -> "MockPortal":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def _submit(self, fields: dict) -> tuple:
+        """
+        处理登录表单提交
+
+        返回:
+            tuple: (HTTP状态码, 页面标题, 页面内容)；状态码为None表示不响应
+        """
+        with self._lock:
+            self.submit_count += 1
+        account = fields.get("DDDDD", [""])[0]
+        password = fields.get("upass", [""])[0]
+
+        mode = self.failure_mode if random.random() < self.failure_rate else "ok"
+        if mode == "timeout":
+            return None, "", ""
+        if mode == "server_error":
+            return 500, "Internal Server Error", "<p>Internal Server Error</p>"
+        if mode == "blank":
+            return 200, "", ""
+        if mode == "rate_limited":
+            return 200, "认证结果", _FAILURE_CONTENT.format(message="请求过于频繁，请稍后再试")
+        if mode == "wrong_password" or account != self.account or password != self.password:
+            return 200, "认证结果", _FAILURE_CONTENT.format(message="用户名或密码错误，请重新输入")
+
+        with self._lock:
+            self.online = True
+        return 200, "认证结果", _ONLINE_CONTENT.format(account=account)
+
+    def _make_handler(self):
+        portal = self
+
+        class PortalRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_page(self, status: int, title: str, content: str) -> None:
+                body = _PAGE_TEMPLATE.format(title=title, content=content) if title or content else ""
+                self._send(status, body.encode(PAGE_CHARSET), f"text/html; charset={PAGE_CHARSET}")
+
+            def _current_page(self) -> None:
+                if portal.online:
+                    self._send_page(200, "上网信息", _ONLINE_CONTENT.format(account=portal.account))
+                else:
+                    self._send_page(200, "上网登录页", _LOGIN_CONTENT)
+
+            def do_GET(self):
+                time.sleep(portal.latency)
+                parts = urlsplit(self.path)
+                if parts.path == "/images/logo.gif":
+                    self._send(200, _PIXEL_GIF, "image/gif")
+                elif parts.path == "/":
+                    fields = parse_qs(parts.query)
+                    if "DDDDD" in fields:
+                        self._handle_submit(fields)
+                    else:
+                        self._current_page()
+                else:
+                    self._send(404, b"Not Found", "text/plain")
+
+            def do_POST(self):
+                time.sleep(portal.latency)
+                length = int(self.headers.get("Content-Length") or 0)
+                data = self.rfile.read(length).decode("latin-1")
+                path = urlsplit(self.path).path
+                if path == "/logout":
+                    portal.reset()
+                    self._current_page()
+                elif path == "/":
+                    self._handle_submit(parse_qs(data, encoding=PAGE_CHARSET))
+                else:
+                    self._send(404, b"Not Found", "text/plain")
+
+            def _handle_submit(self, fields: dict) -> None:
+                time.sleep(portal.submit_latency)
+                status, title, content = portal._submit(fields)
+                if status is None:
+                    # 不响应，等客户端超时后断开
+                    time.sleep(60)
+                    self.close_connection = True
+                    return
+                self._send_page(status, title, content)
+
+        return PortalRequestHandler
+
+
+def parse_arguments():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="模拟Dr.COM认证门户")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=8080, help="监听端口（默认 8080）")
+    parser.add_argument("--username", default="test", help="接受的账号（默认 test）")
+    parser.add_argument("--password", default="test", help="接受的密码（默认 test）")
+    parser.add_argument("--isp", default="@cmcc", help="接受的运营商后缀（默认 @cmcc）")
+    parser.add_argument("--latency", type=float, default=0, help="每个请求的延迟（秒）")
+    parser.add_argument("--submit-latency", type=float, default=0, help="提交表单的额外延迟（秒）")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="ok", help="提交表单时的故障模式")
+    parser.add_argument("--failure-rate", type=float, default=1.0, help="故障模式生效的概率（0~1）")
+    parser.add_argument("--online", action="store_true", help="启动时处于已登录状态")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+    portal = MockPortal(args.username, args.password, args.isp, args.host, args.port, args.latency,
+                        args.submit_latency, args.failure_mode, args.failure_rate, args.online)
+    print(f"🧪 模拟认证门户已启动: {portal.url}（故障模式: {args.failure_mode}）")
+    try:
+        portal.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 用户中断，程序退出")
+
+
+if __name__ == "__main__":
+    main()
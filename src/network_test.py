@@ -1,9 +1,19 @@
+import asyncio
+import functools
+import re
 import socket
-import subprocess
 import platform
 import sys
 import time
 
+from urllib.parse import urljoin, urlsplit
+
+from icmp_probe import icmp_ping
+from local_network import get_local_network_state
+from probe_engine import (_make_result, build_probes, curl_available, get_resolver, get_rtt_estimator, http_request,
+                          register_probe, run_probes, run_strategy, update_rtt_estimates)
+from singleflight import PROBE_FLIGHT
+
 def log(message, verbose=True):
     """可选的日志输出函数"""
     if verbose:
@@ -12,102 +22,347 @@ def log(message, verbose=True):
 def is_local_network_connected(verbose=False):
     """
     检查是否连接到本地网络（是否获取到非回环IP）
+    直接读取网卡和路由信息，不经过DNS
     """
     try:
-        hostname = socket.gethostname()
-        ip_list = socket.gethostbyname_ex(hostname)[2]
-        non_loopback_ips = [ip for ip in ip_list if not ip.startswith("127.")]
+        state = get_local_network_state()
         if verbose:
-            log(f"本地IP地址: {non_loopback_ips}", verbose)
-        return len(non_loopback_ips) > 0
+            log(f"本地IP地址: {state['addresses']}", verbose)
+            if state["default_interface"]:
+                log(f"默认路由: {state['default_interface']} (网关 {state['default_gateway']})", verbose)
+        return state["connected"]
     except Exception as e:
         if verbose:
             log(f"获取本地IP失败: {e}", verbose)
         return False
 
-def is_network_available_socket(test_sites=None, timeout=1, verbose=False):
+DEFAULT_TEST_SITES = [
+    ("www.baidu.com", 443),
+]
+
+DEFAULT_TEST_URLS = [
+    "https://www.baidu.com",
+]
+
+DEFAULT_PING_TARGETS = ["114.114.114.114", "8.8.8.8"]
+
+DEFAULT_DNS_HOSTS = ["www.baidu.com"]
+
+DEFAULT_METHODS = ("socket", "http")
+
+
+def _log_probe_results(results, verbose=False):
+    """输出每个探测项的结果"""
+    labels = {"socket": "Socket连接", "curl": "curl访问", "http": "HTTP访问", "icmp": "ICMP Ping",
+              "dns": "DNS解析", "portal": "门户探测"}
+    for result in results:
+        label = labels.get(result["method"], result["method"])
+        detail = f"{result['latency'] * 1000:.0f}ms"
+        if result.get("connect_time") is not None:
+            detail = (f"DNS{result['resolve_time'] * 1000:.0f}ms({result['dns_source']}), "
+                      f"连接{result['connect_time'] * 1000:.0f}ms")
+        if result.get("status") is not None:
+            ttfb = result["ttfb"] * 1000 if result.get("ttfb") is not None else 0
+            detail = f"HTTP {result['status']}, 首字节{ttfb:.0f}ms, 总耗时{result['total'] * 1000:.0f}ms"
+        if result["success"]:
+            log(f"✅ {label}成功: {result['target']} ({detail})", verbose)
+        else:
+            log(f"❌ {label}失败: {result['target']} ({result['error'] or detail})", verbose)
+
+
+def _probe_timeout(key, timeout):
+    """显式指定timeout时直接使用，否则按该目标的RTT估计计算自适应超时"""
+    if timeout is not None:
+        return timeout
+    return get_rtt_estimator().timeout_for(key)
+
+
+def _build_context(test_sites=None, test_urls=None, timeout=None, http_backend=None, ping_targets=None, config=None):
+    """
+    构造探测上下文：显式参数优先，其次是配置，最后是默认值
+
+    参数:
+        timeout: 探测超时（秒），None表示按每个目标的RTT估计自适应
+        http_backend: HTTP探测后端，native为内置实现，curl为调用curl子进程（不可用时回退到native）
+        ping_targets: ICMP探测目标（所有目标共用一个套接字，算作一个探测项）
+        config: 完整配置字典（ConfigLoader.load_config_from_env 的结果）
+    """
+    config = config or {}
+    probe_config = config.get("probe", {})
+    monitor_config = config.get("monitor", {})
+    return {
+        "test_sites": test_sites or DEFAULT_TEST_SITES,
+        "test_urls": test_urls or DEFAULT_TEST_URLS,
+        "ping_targets": ping_targets or monitor_config.get("ping_targets") or DEFAULT_PING_TARGETS,
+        "dns_hosts": probe_config.get("dns_hosts") or DEFAULT_DNS_HOSTS,
+        "auth_url": config.get("auth_url"),
+        "portal_probe_url": monitor_config.get("portal_probe_url"),
+        "http_backend": http_backend or probe_config.get("http_backend", "native"),
+        "timeout_for": functools.partial(_probe_timeout, timeout=timeout),
+    }
+
+
+def _run_and_learn(probes):
+    """执行探测并用结果更新RTT估计"""
+    report = run_probes(probes)
+    update_rtt_estimates(report)
+    return report
+
+
+def is_network_available_socket(test_sites=None, timeout=None, verbose=False):
     """
     方法1：使用Socket连接检测网络是否可用（TCP 443端口）
+    所有目标并发连接，任一成功即返回
     """
-    if test_sites is None:
-        test_sites = [
-            ("www.baidu.com", 443),
-        ]
-
-    for site, port in test_sites:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(timeout)
-                result = s.connect_ex((site, port))
-                if result == 0:
-                    log(f"✅ Socket连接成功: {site}:{port}", verbose)
-                    return True
-                else:
-                    log(f"❌ Socket连接失败: {site}:{port} (错误码: {result})", verbose)
-        except Exception as e:
-            log(f"⚠️ Socket连接异常: {site}:{port} ({e})", verbose)
-            continue
-    return False
-
-def is_network_available_curl(test_urls=None, timeout=1, verbose=False):
+    report = _run_and_learn(build_probes(["socket"], _build_context(test_sites, timeout=timeout)))
+    _log_probe_results(report["results"], verbose)
+    return report["success"]
+
+
+def is_network_available_curl(test_urls=None, timeout=None, verbose=False):
     """
     方法2：使用curl命令检测网络是否可用（模拟真实HTTP请求）
+    所有URL并发访问，任一成功即返回
     """
-    if test_urls is None:
-        test_urls = [
-            "https://www.baidu.com",
-        ]
-
-    # 检测系统是否安装 curl
-    try:
-        subprocess.run(["curl", "--version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not curl_available():
         log("⚠️ curl 命令未找到，跳过 curl 测试", verbose)
-        return False  # 或者你可以 fallback 到其他方法
-
-    for url in test_urls:
-        try:
-            cmd = [
-                "curl",
-                "-s",           # 静默模式
-                "-S",           # 显示错误
-                "-f",           # 失败时返回非0
-                "-m", str(timeout),  # 超时
-                "--connect-timeout", str(timeout),
-                url
-            ]
-            result = subprocess.run(cmd, capture_output=True, timeout=timeout + 2)
-            if result.returncode == 0:
-                log(f"✅ curl访问成功: {url}", verbose)
-                return True
-            else:
-                log(f"❌ curl访问失败: {url} (返回码: {result.returncode})", verbose)
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError) as e:
-            log(f"⚠️ curl执行异常: {url} ({e})", verbose)
-            continue
-    return False
-
-def is_network_available(test_sites=None, test_urls=None, timeout=1, verbose=True, require_both=False):
-    """
-    综合网络检测：使用Socket和curl两种方法检测网络（简化版）
-    
+        return False
+
+    context = _build_context(test_urls=test_urls, timeout=timeout, http_backend="curl")
+    report = _run_and_learn(build_probes(["http"], context))
+    _log_probe_results(report["results"], verbose)
+    return report["success"]
+
+
+def is_network_available_http(test_urls=None, timeout=None, verbose=False):
+    """
+    方法3：使用内置HTTP客户端检测网络是否可用（无需创建子进程）
+    语义与curl一致：HTTP错误视为失败，连接和总耗时都受timeout限制
+    """
+    context = _build_context(test_urls=test_urls, timeout=timeout, http_backend="native")
+    report = _run_and_learn(build_probes(["http"], context))
+    _log_probe_results(report["results"], verbose)
+    return report["success"]
+
+
+def is_network_available_icmp(ping_targets=None, timeout=1, count=1, verbose=False):
+    """
+    方法4：使用ICMP Echo检测网络是否可用（一个数据包，无TCP/TLS开销）
+    所有目标共用一个套接字并发发送，输出每个目标的往返时间和丢包率
+    """
+    targets = list(ping_targets or DEFAULT_PING_TARGETS)
+    per_target = asyncio.run(icmp_ping(targets, timeout, count))
+    for target, entry in per_target.items():
+        if entry["received"]:
+            log(f"✅ ICMP Ping成功: {target} ({entry['address']}, RTT {entry['rtt'] * 1000:.1f}ms, "
+                f"丢包率 {entry['loss']:.0%})", verbose)
+        else:
+            log(f"❌ ICMP Ping失败: {target} ({entry['error']})", verbose)
+    return any(entry["received"] for entry in per_target.values())
+
+
+async def is_network_available_async(test_sites=None, test_urls=None, timeout=None, verbose=True, require_both=False,
+                                     quorum=None, http_backend=None, methods=None, ping_targets=None, config=None):
+    """
+    综合网络检测（异步版）：按配置的策略执行注册的探测
+
     参数:
-        require_both: 是否要求两种方法都成功（默认False，任一成功即可）
+        timeout: 探测超时（秒），None表示按RTT估计自适应
+        require_both: 是否要求每种启用的方法都成功（默认False，达到quorum即可）
+        quorum: 需要达到的成功分数（按方法权重计分），默认取配置 PROBE_QUORUM
+        http_backend: HTTP探测后端（native / curl）
+        methods: 启用的探测方法（见 PROBE_REGISTRY），默认取配置 PROBE_METHODS
+        ping_targets: ICMP探测目标（methods包含icmp时使用）
+        config: 完整配置字典，提供策略、权重、法定分数等探测设置
+
+    返回:
+        Dict[str, Any]: 探测报告，包含每个探测的耗时与错误（results）及按方法的汇总（by_method）
     """
-    log("正在进行 Socket 连接测试...", verbose)
-    socket_result = is_network_available_socket(test_sites, timeout, verbose)
+    probe_config = (config or {}).get("probe", {})
+    methods = tuple(methods or probe_config.get("methods") or DEFAULT_METHODS)
+    quorum = quorum if quorum is not None else probe_config.get("quorum", 1)
+    context = _build_context(test_sites, test_urls, timeout, http_backend, ping_targets, config)
+    probes = build_probes(methods, context)
+    required = set(methods) if require_both else None
+    report = await run_strategy(probes, probe_config.get("strategy", "parallel"), quorum,
+                                probe_config.get("weights"), required)
+    update_rtt_estimates(report)
+    _log_probe_results(report["results"], verbose)
+    return report
+
 
-    log("正在进行 curl HTTP 测试...", verbose)
-    curl_result = is_network_available_curl(test_urls, timeout, verbose)
+def is_network_available(test_sites=None, test_urls=None, timeout=None, verbose=True, require_both=False, quorum=None,
+                         http_backend=None, methods=None, ping_targets=None, config=None):
+    """
+    综合网络检测：默认 Socket 和 HTTP 所有目标并发竞速
 
-    log(f"Socket测试结果: {'成功' if socket_result else '失败'}", verbose)
-    log(f"curl测试结果: {'成功' if curl_result else '失败'}", verbose)
+    首个成功（或达到quorum分数）即返回并取消其余探测，
+    断网时的检测耗时只受单个超时限制。探测方法、执行策略（parallel / ordered）、
+    方法权重和法定分数可以通过 config（即 .env 中的 PROBE_* 配置）调整。
 
-    # 灵活的策略选择
-    if require_both:
-        return socket_result and curl_result
+    参数:
+        timeout: 探测超时（秒），None表示按每个目标的RTT估计自适应（限制在配置的上下限内）
+        require_both: 是否要求每种方法都成功（默认False，任一成功即可）
+        quorum: 需要达到的成功分数
+        http_backend: HTTP探测后端，native为内置实现（默认），curl为调用curl子进程
+        methods: 启用的探测方法（socket / http / icmp / dns / portal），默认 socket + http
+        ping_targets: ICMP探测目标（PING_TARGETS）
+        config: 完整配置字典
+    """
+    probe_config = (config or {}).get("probe", {})
+    methods = tuple(methods or probe_config.get("methods") or DEFAULT_METHODS)
+    strategy = probe_config.get("strategy", "parallel")
+    fresh_for = probe_config.get("result_fresh_for", PROBE_FLIGHT.fresh_for)
+    # 同一组检测参数的并发调用（GUI测试按钮/监控线程）共享同一次检测
+    key = repr(("network", test_sites, test_urls, timeout, require_both, quorum, http_backend, methods, ping_targets,
+                sorted(probe_config.items()), (config or {}).get("monitor", {}).get("ping_targets")))
+    age = PROBE_FLIGHT.last_result_age(key)
+    if age is not None and age <= fresh_for:
+        log(f"复用{age:.1f}秒前的网络检测结果", verbose)
     else:
-        return socket_result or curl_result
+        log(f"正在进行 {' / '.join(methods)} 网络测试（{'按顺序' if strategy == 'ordered' else '并发'}）...", verbose)
+    report = PROBE_FLIGHT.do(key, lambda: asyncio.run(is_network_available_async(
+        test_sites, test_urls, timeout, verbose, require_both, quorum, http_backend, methods, ping_targets, config)),
+        fresh_for)
+
+    log(f"网络测试结果: {'成功' if report['success'] else '失败'} "
+        f"(得分{report['score']:g}, 耗时{report['elapsed'] * 1000:.0f}ms, 取消{report['cancelled']}项)", verbose)
+    dns_stats = get_resolver().stats()
+    log(f"DNS缓存命中率: {dns_stats['hit_ratio']:.0%} (查询{dns_stats['lookups']}次, "
+        f"平均解析{dns_stats['avg_resolve_time'] * 1000:.0f}ms)", verbose)
+    return report["success"]
+
+
+# 明文HTTP的"generate_204"探测地址（国内可直连）
+DEFAULT_PORTAL_PROBE_URL = "http://connect.rom.miui.com/generate_204"
+
+# 门户探测结果
+PORTAL_OPEN = "open"            # 互联网可达，未被拦截
+PORTAL_INTERCEPT = "portal"     # 被校园网认证门户拦截（重定向或注入页面）
+PORTAL_NO_ROUTE = "no_route"    # 没有路由/无法建立连接，问题在上游
+PORTAL_UNKNOWN = "unknown"      # 有响应但无法判断来源
+
+# 注入页面中常见的跳转写法
+_REDIRECT_PATTERNS = [
+    re.compile(r'<meta[^>]+http-equiv=["\']?refresh["\']?[^>]*url=([^"\'>\s]+)', re.IGNORECASE),
+    re.compile(r'location\.(?:href|replace)\s*[=(]\s*["\']([^"\']+)["\']', re.IGNORECASE),
+    re.compile(r'location\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE),
+]
+
+# Dr.COM 认证页面的表单字段名
+_PORTAL_PAGE_MARKERS = ("DDDDD", "upass", "0MKKey", "PageTips")
+
+
+def _extract_redirect_target(response, probe_url):
+    """从 Location 头或注入页面中提取跳转目标"""
+    location = response["headers"].get("location")
+    if location:
+        return urljoin(probe_url, location)
+    body = response["body"].decode("utf-8", errors="ignore")
+    for pattern in _REDIRECT_PATTERNS:
+        match = pattern.search(body)
+        if match:
+            return urljoin(probe_url, match.group(1))
+    return None
+
+
+def _classify_portal_response(response, probe_url, auth_url):
+    """根据一次HTTP响应判断是否被认证门户拦截"""
+    result = {"state": PORTAL_UNKNOWN, "redirect": None, "status": response["status"],
+              "latency": response["total"], "detail": "", "auth_reachable": None}
+
+    if response["status"] is None:
+        result["state"] = PORTAL_NO_ROUTE
+        result["detail"] = response["error"]
+        return result
+
+    if response["status"] == 204:
+        result["state"] = PORTAL_OPEN
+        return result
+
+    auth_host = urlsplit(auth_url).hostname if auth_url else None
+    redirect = _extract_redirect_target(response, probe_url)
+    result["redirect"] = redirect
+
+    if redirect and auth_host and urlsplit(redirect).hostname == auth_host:
+        result["state"] = PORTAL_INTERCEPT
+        result["detail"] = f"跳转到认证页面: {redirect}"
+        return result
+
+    body = response["body"].decode("utf-8", errors="ignore")
+    if (auth_host and auth_host in body) or any(marker in body for marker in _PORTAL_PAGE_MARKERS):
+        result["state"] = PORTAL_INTERCEPT
+        result["detail"] = "响应被替换为认证页面"
+        return result
+
+    result["detail"] = f"未知响应: HTTP {response['status']}" + (f", 跳转到 {redirect}" if redirect else "")
+    return result
+
+
+async def detect_captive_portal_async(auth_url=None, probe_url=None, timeout=2, check_auth_host=False):
+    """
+    认证门户拦截检测（异步版）：只需一次HTTP往返
+
+    参数:
+        auth_url: 校园网认证地址（CAMPUS_AUTH_URL），用于识别门户跳转
+        probe_url: 明文HTTP的generate_204探测地址
+        timeout: 超时（秒）
+        check_auth_host: 结果为 no_route / unknown 时再请求一次认证页面，确认认证服务器是否可达
+
+    返回:
+        Dict[str, Any]: {"state", "redirect", "status", "latency", "detail", "auth_reachable"}
+            auth_reachable 只在检查了认证服务器时为True/False，否则为None
+    """
+    probe_url = probe_url or DEFAULT_PORTAL_PROBE_URL
+    # 门户常通过DNS劫持拦截，必须使用当前的解析结果，不能用过期缓存IP绕过
+    response = await http_request(probe_url, timeout, timeout, allow_stale_dns=False)
+    result = _classify_portal_response(response, probe_url, auth_url)
+    if check_auth_host and auth_url and result["state"] in (PORTAL_NO_ROUTE, PORTAL_UNKNOWN):
+        # 很多校园网在认证前屏蔽DNS或外网HTTP，探测地址不可达不代表上游断网
+        auth_response = await http_request(auth_url, timeout, timeout, max_body=1024)
+        result["auth_reachable"] = auth_response["status"] is not None
+    return result
+
+
+async def probe_portal(auth_url=None, probe_url=None, timeout=2):
+    """探测引擎使用的门户探测：只有互联网可达（未被拦截）才算成功"""
+    result = await detect_captive_portal_async(auth_url, probe_url, timeout)
+    target = probe_url or DEFAULT_PORTAL_PROBE_URL
+    return _make_result("portal", target, result["state"] == PORTAL_OPEN, result["latency"],
+                        "" if result["state"] == PORTAL_OPEN else f"{result['state']} {result['detail']}".strip(),
+                        portal_state=result["state"], redirect=result["redirect"],
+                        timed_out=result["detail"] == "连接超时")
+
+
+@register_probe("portal")
+def _build_portal_probes(context):
+    probe_url = context.get("portal_probe_url") or DEFAULT_PORTAL_PROBE_URL
+    timeout = context["timeout_for"](f"portal:{probe_url}")
+    return [functools.partial(probe_portal, context.get("auth_url"), probe_url, timeout)]
+
+
+def detect_captive_portal(auth_url=None, probe_url=None, timeout=2, verbose=True, check_auth_host=False):
+    """
+    认证门户拦截检测：区分"需要登录"和"上游断网"
+
+    返回的 state 取值:
+        open: 互联网可达
+        portal: 被认证门户拦截（需要登录）
+        no_route: 无法建立连接，认证服务器也不可达（auth_reachable 为False）时问题在上游
+        unknown: 有响应但无法判断来源
+    """
+    result = asyncio.run(detect_captive_portal_async(auth_url, probe_url, timeout, check_auth_host))
+    messages = {
+        PORTAL_OPEN: "🟢 门户探测: 互联网可达",
+        PORTAL_INTERCEPT: "🟡 门户探测: 被认证门户拦截",
+        PORTAL_NO_ROUTE: "🔴 门户探测: 无法建立连接（上游网络故障）",
+        PORTAL_UNKNOWN: "⚪ 门户探测: 无法判断",
+    }
+    log(f"{messages[result['state']]} {result['detail']}".rstrip(), verbose)
+    if result["auth_reachable"] is not None:
+        log(f"认证服务器{'可达' if result['auth_reachable'] else '不可达'}: {auth_url}", verbose)
+    return result
+
 
 def check_campus_network_status(verbose=True):
     """
@@ -116,7 +371,7 @@ def check_campus_network_status(verbose=True):
     log("正在检测网络状态...", verbose)
 
     is_local = is_local_network_connected(verbose)
-    is_internet = is_network_available(None, None, 1, verbose)
+    is_internet = is_network_available(None, None, None, verbose)
 
     if not is_local:
         return "🔴 未连接到校园网，请检查网络连接（未获取到有效IP）"
@@ -0,0 +1,873 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步网络探测引擎 - 并发竞速所有探测目标，首个成功（或达到法定成功数）即返回
+
+所有探测目标和探测方法同时发起，满足条件后立即取消其余探测，
+因此断网时的检测耗时只受单个超时限制，而不是所有超时之和。
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import ipaddress
+import json
+import os
+import socket
+import ssl
+import subprocess
+import threading
+import time
+from urllib.parse import urlsplit
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 探测工厂：调用后返回一个探测协程，协程结果为 _make_result 生成的字典
+ProbeFactory = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+# DNS解析专用线程池：asyncio.run 结束时不会等待其中卡住的 getaddrinfo
+_RESOLVER_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="probe-dns")
+
+# DNS缓存默认参数（秒）
+DEFAULT_DNS_TTL = 300
+DEFAULT_DNS_NEGATIVE_TTL = 30
+DEFAULT_DNS_STALE_TTL = 24 * 3600
+
+
+class AsyncResolver:
+    """
+    带TTL缓存和负缓存的异步DNS解析器
+
+    - 解析在独立线程池中执行，调用方只等待自己的超时，不会被卡住的解析阻塞
+    - 解析失败的主机在负缓存有效期内直接返回失败
+    - 缓存过期但仍有旧IP时，立即返回旧IP供探测使用，同时在后台重新解析
+    - 同一主机的并发解析请求共享同一次 getaddrinfo
+    """
+
+    def __init__(self, ttl: float = DEFAULT_DNS_TTL, negative_ttl: float = DEFAULT_DNS_NEGATIVE_TTL,
+                 stale_ttl: float = DEFAULT_DNS_STALE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._lock = threading.Lock()
+        # host -> {"addresses": [...], "expires": float, "error": str}
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._stats = {"lookups": 0, "hits": 0, "stale_hits": 0, "negative_hits": 0,
+                       "misses": 0, "failures": 0, "resolve_time_total": 0.0, "resolutions": 0}
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += value
+
+    def _start_resolution(self, host: str) -> concurrent.futures.Future:
+        """提交一次后台解析（同一主机只会有一个进行中的解析）"""
+        with self._lock:
+            future = self._inflight.get(host)
+            if future is None:
+                future = _RESOLVER_EXECUTOR.submit(self._resolve_blocking, host)
+                self._inflight[host] = future
+            return future
+
+    def _resolve_blocking(self, host: str) -> List[str]:
+        """在线程池中执行的阻塞解析，结果直接写入缓存"""
+        start = time.perf_counter()
+        try:
+            # 只取IPv4：探测只连接第一个地址，有AAAA记录但没有IPv6路由的网络会被误判为断网
+            infos = socket.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            with self._lock:
+                self._cache[host] = {"addresses": addresses, "expires": time.monotonic() + self.ttl, "error": ""}
+            return addresses
+        except OSError as e:
+            with self._lock:
+                entry = self._cache.get(host)
+                if entry and entry["addresses"]:
+                    # 保留旧IP，继续作为过期缓存使用
+                    entry["error"] = str(e)
+                else:
+                    self._cache[host] = {"addresses": [], "expires": time.monotonic() + self.negative_ttl,
+                                         "error": str(e)}
+                self._stats["failures"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(host, None)
+                self._stats["resolutions"] += 1
+                self._stats["resolve_time_total"] += time.perf_counter() - start
+
+    async def resolve(self, host: str, timeout: float = 1, allow_stale: bool = True,
+                      force: bool = False) -> Dict[str, Any]:
+        """
+        解析主机名
+
+        参数:
+            host: 主机名或IP
+            timeout: 本次调用最多等待的时间（秒）
+            allow_stale: 是否允许在后台重新解析期间使用过期的缓存IP
+            force: 忽略未过期的缓存（含负缓存），强制发起一次解析
+
+        返回:
+            Dict[str, Any]: {"addresses", "source", "resolve_time", "error"}
+                source取值: literal / cache / stale / resolved / negative / timeout / error
+        """
+        start = time.perf_counter()
+
+        def _answer(addresses: List[str], source: str, error: str = "") -> Dict[str, Any]:
+            return {"addresses": addresses, "source": source,
+                    "resolve_time": time.perf_counter() - start, "error": error}
+
+        try:
+            ipaddress.ip_address(host)
+            return _answer([host], "literal")
+        except ValueError:
+            pass
+
+        self._count("lookups")
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(host)
+            entry = dict(entry) if entry else None
+
+        if entry and entry["expires"] > now and not force:
+            if entry["addresses"]:
+                self._count("hits")
+                return _answer(entry["addresses"], "cache")
+            self._count("negative_hits")
+            return _answer([], "negative", entry["error"])
+
+        future = self._start_resolution(host)
+        if allow_stale and entry and entry["addresses"] and entry["expires"] + self.stale_ttl > now:
+            # 过期缓存：先用旧IP探测，后台解析完成后自动更新缓存
+            self._count("stale_hits")
+            return _answer(entry["addresses"], "stale")
+
+        self._count("misses")
+        try:
+            addresses = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            return _answer(addresses, "resolved")
+        except asyncio.TimeoutError:
+            with self._lock:
+                if host not in self._cache:
+                    # 解析器无响应时同样进入负缓存，避免后续探测反复等待
+                    self._cache[host] = {"addresses": [], "expires": time.monotonic() + self.negative_ttl,
+                                         "error": "DNS解析超时"}
+            return _answer([], "timeout", "DNS解析超时")
+        except OSError as e:
+            return _answer([], "error", str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        """返回解析统计：命中率与解析耗时单独统计，不计入连接耗时"""
+        with self._lock:
+            stats = dict(self._stats)
+        cached = stats["hits"] + stats["stale_hits"] + stats["negative_hits"]
+        stats["hit_ratio"] = cached / stats["lookups"] if stats["lookups"] else 0.0
+        stats["avg_resolve_time"] = (stats["resolve_time_total"] / stats["resolutions"]
+                                     if stats["resolutions"] else 0.0)
+        return stats
+
+    def clear(self) -> None:
+        """清空缓存（网络切换后调用）"""
+        with self._lock:
+            self._cache.clear()
+
+
+_RESOLVER = AsyncResolver()
+
+
+def get_resolver() -> AsyncResolver:
+    """获取进程级共享的DNS解析器"""
+    return _RESOLVER
+
+
+def configure_resolver(ttl: float = DEFAULT_DNS_TTL, negative_ttl: float = DEFAULT_DNS_NEGATIVE_TTL) -> AsyncResolver:
+    """调整共享解析器的缓存时间"""
+    _RESOLVER.ttl = ttl
+    _RESOLVER.negative_ttl = negative_ttl
+    return _RESOLVER
+
+
+# 自适应超时默认参数（秒）
+DEFAULT_TIMEOUT_MIN = 0.3
+DEFAULT_TIMEOUT_MAX = 3.0
+DEFAULT_INITIAL_TIMEOUT = 1.0
+
+# RTT估计的持久化：超时相对上次保存变化超过此比例才写文件，否则最多每隔 RTT_SAVE_INTERVAL 秒写一次
+RTT_SAVE_DRIFT = 0.2
+RTT_SAVE_INTERVAL = 1800
+
+
+class RttEstimator:
+    """
+    按目标维护往返时间估计，并据此计算探测超时（参考 TCP RTO 计算，RFC 6298）
+
+    SRTT/RTTVAR 平滑更新，超时 = SRTT + max(G, 4 * RTTVAR)，并限制在[min, max]之间；
+    探测超时后对该目标的超时做指数退避，直到下一次成功测量。
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    GRANULARITY = 0.01
+
+    def __init__(self, min_timeout: float = DEFAULT_TIMEOUT_MIN, max_timeout: float = DEFAULT_TIMEOUT_MAX,
+                 initial_timeout: float = DEFAULT_INITIAL_TIMEOUT):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.initial_timeout = initial_timeout
+        self._lock = threading.Lock()
+        # key -> {"srtt", "rttvar", "backoff", "samples", "timeouts"}
+        self._targets: Dict[str, Dict[str, float]] = {}
+
+    def _clamp(self, value: float) -> float:
+        return min(max(value, self.min_timeout), self.max_timeout)
+
+    def timeout_for(self, key: str) -> float:
+        """计算目标当前应使用的超时（秒）"""
+        with self._lock:
+            state = self._targets.get(key)
+            if not state or state["srtt"] is None:
+                backoff = state["backoff"] if state else 1
+                return self._clamp(self.initial_timeout * backoff)
+            rto = state["srtt"] + max(self.GRANULARITY, 4 * state["rttvar"])
+            return self._clamp(rto * state["backoff"])
+
+    def observe(self, key: str, rtt: float) -> None:
+        """记录一次成功测量的往返时间（秒）"""
+        with self._lock:
+            state = self._targets.setdefault(key, {"srtt": None, "rttvar": None, "backoff": 1,
+                                                   "samples": 0, "timeouts": 0})
+            if state["srtt"] is None:
+                state["srtt"] = rtt
+                state["rttvar"] = rtt / 2
+            else:
+                state["rttvar"] = (1 - self.BETA) * state["rttvar"] + self.BETA * abs(state["srtt"] - rtt)
+                state["srtt"] = (1 - self.ALPHA) * state["srtt"] + self.ALPHA * rtt
+            state["backoff"] = 1
+            state["samples"] += 1
+
+    def observe_timeout(self, key: str) -> None:
+        """记录一次超时：超时时间指数退避（上限仍为max_timeout）"""
+        with self._lock:
+            state = self._targets.setdefault(key, {"srtt": None, "rttvar": None, "backoff": 1,
+                                                   "samples": 0, "timeouts": 0})
+            state["timeouts"] += 1
+            if self.initial_timeout * state["backoff"] < self.max_timeout:
+                state["backoff"] *= 2
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """导出所有目标的估计状态（附带当前超时），用于日志和持久化"""
+        with self._lock:
+            keys = list(self._targets)
+            states = {key: dict(self._targets[key]) for key in keys}
+        for key in keys:
+            states[key]["timeout"] = self.timeout_for(key)
+        return states
+
+    def drifted_from(self, saved: Dict[str, Dict[str, Any]], threshold: float = RTT_SAVE_DRIFT) -> bool:
+        """
+        判断当前估计相对一次快照是否有明显变化
+
+        参数:
+            saved: 之前的 snapshot() 结果
+            threshold: 超时的相对变化阈值
+
+        返回:
+            bool: 出现新目标，或任一目标的超时变化超过 threshold 时为True
+        """
+        for key, state in self.snapshot().items():
+            previous = saved.get(key)
+            if previous is None:
+                return True
+            if abs(state["timeout"] - previous["timeout"]) > threshold * previous["timeout"]:
+                return True
+        return False
+
+    def load(self, states: Dict[str, Dict[str, Any]]) -> None:
+        """从快照恢复估计状态"""
+        with self._lock:
+            for key, state in states.items():
+                self._targets[key] = {
+                    "srtt": state.get("srtt"),
+                    "rttvar": state.get("rttvar"),
+                    "backoff": state.get("backoff", 1),
+                    "samples": state.get("samples", 0),
+                    "timeouts": state.get("timeouts", 0),
+                }
+
+    def save_to_file(self, path: str) -> None:
+        """持久化估计状态到JSON文件"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def load_from_file(self, path: str) -> bool:
+        """从JSON文件恢复估计状态，文件不存在或损坏时返回False"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.load(json.load(f))
+            return True
+        except (OSError, ValueError, AttributeError):
+            return False
+
+
+_RTT_ESTIMATOR = RttEstimator()
+
+
+def get_rtt_estimator() -> RttEstimator:
+    """获取进程级共享的RTT估计器"""
+    return _RTT_ESTIMATOR
+
+
+def configure_rtt_estimator(min_timeout: float = DEFAULT_TIMEOUT_MIN,
+                            max_timeout: float = DEFAULT_TIMEOUT_MAX) -> RttEstimator:
+    """调整共享估计器的超时上下限"""
+    _RTT_ESTIMATOR.min_timeout = min_timeout
+    _RTT_ESTIMATOR.max_timeout = max_timeout
+    return _RTT_ESTIMATOR
+
+
+def update_rtt_estimates(report: Dict[str, Any], estimator: Optional[RttEstimator] = None) -> None:
+    """
+    用一次探测报告更新RTT估计：成功的探测记录耗时，超时的探测触发退避，
+    被取消或因其他原因失败的探测不提供信息
+
+    参数:
+        report: race_probes 返回的报告
+        estimator: RTT估计器，默认使用共享实例
+    """
+    estimator = estimator or _RTT_ESTIMATOR
+    for result in report["results"]:
+        per_target = result.get("per_target")
+        if per_target:
+            # ICMP：每个目标单独统计
+            for target, entry in per_target.items():
+                key = f"{result['method']}:{target}"
+                if entry["received"]:
+                    estimator.observe(key, entry["rtt"])
+                elif entry["sent"] > entry.get("pending", 0):
+                    estimator.observe_timeout(key)
+            continue
+        key = f"{result['method']}:{result['target']}"
+        if result["success"]:
+            estimator.observe(key, result["latency"])
+        elif result.get("timed_out"):
+            estimator.observe_timeout(key)
+
+
+def _make_result(method: str, target: str, success: bool, latency: float, error: str = "", **extra: Any) -> Dict[str, Any]:
+    """生成统一格式的单项探测结果"""
+    result = {
+        "method": method,
+        "target": target,
+        "success": success,
+        "latency": latency,
+        "error": error,
+    }
+    result.update(extra)
+    return result
+
+
+async def probe_socket(host: str, port: int, timeout: float = 1) -> Dict[str, Any]:
+    """
+    TCP连接探测
+
+    参数:
+        host: 目标主机
+        port: 目标端口
+        timeout: 超时（秒），DNS解析与连接共用
+
+    返回:
+        Dict[str, Any]: 探测结果，附带 resolve_time / connect_time / dns_source
+    """
+    target = f"{host}:{port}"
+    start = time.perf_counter()
+    answer = await _RESOLVER.resolve(host, timeout)
+    extra = {"resolve_time": answer["resolve_time"], "connect_time": None, "dns_source": answer["source"]}
+    if not answer["addresses"]:
+        return _make_result("socket", target, False, time.perf_counter() - start, answer["error"], **extra)
+
+    connect_start = time.perf_counter()
+    remaining = max(timeout - answer["resolve_time"], 0.05)
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(answer["addresses"][0], port), remaining)
+        extra["connect_time"] = time.perf_counter() - connect_start
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return _make_result("socket", target, True, time.perf_counter() - start, **extra)
+    except asyncio.TimeoutError:
+        extra["connect_time"] = time.perf_counter() - connect_start
+        return _make_result("socket", target, False, time.perf_counter() - start, "连接超时", timed_out=True, **extra)
+    except OSError as e:
+        extra["connect_time"] = time.perf_counter() - connect_start
+        return _make_result("socket", target, False, time.perf_counter() - start, str(e), **extra)
+
+
+async def probe_curl(url: str, timeout: float = 1) -> Dict[str, Any]:
+    """
+    curl 子进程探测（模拟真实HTTP请求，HTTP错误视为失败）
+
+    参数:
+        url: 目标URL
+        timeout: 连接和总超时（秒）
+
+    返回:
+        Dict[str, Any]: 探测结果
+    """
+    start = time.perf_counter()
+    cmd = [
+        "curl",
+        "-s",           # 静默模式
+        "-S",           # 显示错误
+        "-f",           # 失败时返回非0
+        "-o", os.devnull,
+        "-m", str(timeout),  # 超时
+        "--connect-timeout", str(timeout),
+        url,
+    ]
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError as e:
+        return _make_result("curl", url, False, time.perf_counter() - start, f"curl执行异常: {e}", backend="curl")
+
+    try:
+        returncode = await asyncio.wait_for(proc.wait(), timeout + 2)
+    except asyncio.TimeoutError:
+        return _make_result("curl", url, False, time.perf_counter() - start, "curl执行超时", backend="curl",
+                            timed_out=True)
+    finally:
+        # 被取消或超时时确保子进程被回收
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+
+    latency = time.perf_counter() - start
+    if returncode == 0:
+        return _make_result("curl", url, True, latency, backend="curl")
+    # curl 返回码28表示操作超时
+    return _make_result("curl", url, False, latency, f"返回码: {returncode}", backend="curl",
+                        timed_out=returncode == 28)
+
+
+_SSL_CONTEXT: Optional[ssl.SSLContext] = None
+
+
+def _get_ssl_context() -> ssl.SSLContext:
+    """复用同一个SSL上下文，避免每次探测重新加载证书"""
+    global _SSL_CONTEXT
+    if _SSL_CONTEXT is None:
+        _SSL_CONTEXT = ssl.create_default_context()
+    return _SSL_CONTEXT
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str], max_body: int) -> bytes:
+    """按 Content-Length / chunked / 连接关闭 三种方式读取响应体（最多max_body字节）"""
+    if "content-length" in headers:
+        try:
+            length = int(headers["content-length"])
+        except ValueError:
+            length = max_body
+        data = await reader.read(min(length, max_body))
+        while len(data) < min(length, max_body):
+            chunk = await reader.read(min(length, max_body) - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        data = b""
+        while len(data) < max_body:
+            size_line = await reader.readline()
+            if not size_line:
+                break
+            try:
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+            except ValueError:
+                break
+            if size == 0:
+                break
+            data += await reader.readexactly(size)
+            await reader.readline()  # 块结尾的CRLF
+        return data[:max_body]
+
+    data = b""
+    while len(data) < max_body:
+        chunk = await reader.read(max_body - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+async def http_request(url: str, connect_timeout: float = 1, total_timeout: float = 1,
+                       method: str = "GET", max_body: int = 64 * 1024,
+                       headers: Optional[Dict[str, str]] = None, allow_stale_dns: bool = True,
+                       body: Optional[bytes] = None) -> Dict[str, Any]:
+    """
+    基于 asyncio 流的最小HTTP(S)客户端，不跟随重定向
+
+    参数:
+        url: 请求URL（http或https）
+        connect_timeout: 建立连接（含TLS握手）超时（秒）
+        total_timeout: 整个请求的总超时（秒）
+        method: 请求方法
+        max_body: 最多读取的响应体字节数
+        headers: 额外请求头
+        allow_stale_dns: 是否允许使用过期的DNS缓存IP
+        body: 请求体（POST表单等）
+
+    返回:
+        Dict[str, Any]: {"status", "headers", "body", "ttfb", "total", "resolve_time", "dns_source",
+                         "error", "timed_out"}
+            status为None表示请求未得到HTTP响应
+    """
+    start = time.perf_counter()
+    response: Dict[str, Any] = {"status": None, "headers": {}, "body": b"", "ttfb": None, "total": None,
+                                "resolve_time": None, "dns_source": None, "error": "", "timed_out": False}
+    parts = urlsplit(url)
+    use_tls = parts.scheme == "https"
+    host = parts.hostname or ""
+    port = parts.port or (443 if use_tls else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    writer = None
+
+    async def _exchange() -> None:
+        nonlocal writer
+        answer = await _RESOLVER.resolve(host, connect_timeout, allow_stale=allow_stale_dns)
+        response["resolve_time"] = answer["resolve_time"]
+        response["dns_source"] = answer["source"]
+        if not answer["addresses"]:
+            raise OSError(answer["error"] or "DNS解析失败")
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(answer["addresses"][0], port, ssl=_get_ssl_context() if use_tls else None,
+                                    server_hostname=host if use_tls else None),
+            connect_timeout,
+        )
+        request_headers = {
+            "Host": parts.netloc,
+            "User-Agent": "campus-network-auth/1.0",
+            "Accept": "*/*",
+            "Connection": "close",
+        }
+        if body is not None:
+            request_headers["Content-Length"] = str(len(body))
+        request_headers.update(headers or {})
+        request = f"{method} {path} HTTP/1.1\r\n"
+        request += "".join(f"{key}: {value}\r\n" for key, value in request_headers.items())
+        writer.write((request + "\r\n").encode("latin-1") + (body or b""))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        response["ttfb"] = time.perf_counter() - start
+        status_parts = status_line.decode("latin-1").split(None, 2)
+        if len(status_parts) < 2 or not status_parts[0].startswith("HTTP/"):
+            raise ValueError(f"无效的HTTP响应: {status_line[:50]!r}")
+        response["status"] = int(status_parts[1])
+
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response["headers"][key.strip().lower()] = value.strip()
+
+        if method != "HEAD" and response["status"] not in (204, 304):
+            response["body"] = await _read_body(reader, response["headers"], max_body)
+
+    try:
+        await asyncio.wait_for(_exchange(), total_timeout)
+    except asyncio.TimeoutError:
+        response["error"] = "连接超时" if response["ttfb"] is None else "读取超时"
+        response["timed_out"] = True
+    except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+        response["error"] = str(e) or e.__class__.__name__
+    finally:
+        if writer is not None:
+            writer.close()
+        response["total"] = time.perf_counter() - start
+    return response
+
+
+async def probe_http(url: str, timeout: float = 1, connect_timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    原生HTTP(S)探测，语义与 curl -f 一致：HTTP状态码>=400视为失败
+
+    参数:
+        url: 目标URL
+        timeout: 总超时（秒）
+        connect_timeout: 连接超时（秒），默认与总超时相同
+
+    返回:
+        Dict[str, Any]: 探测结果，附带 status / ttfb / total
+    """
+    response = await http_request(url, connect_timeout or timeout, timeout)
+    extra = {"status": response["status"], "ttfb": response["ttfb"], "total": response["total"], "backend": "native",
+             "resolve_time": response["resolve_time"], "dns_source": response["dns_source"],
+             "timed_out": response["timed_out"]}
+    if response["status"] is None:
+        return _make_result("http", url, False, response["total"], response["error"], **extra)
+    if response["status"] >= 400:
+        return _make_result("http", url, False, response["total"], f"HTTP {response['status']}", **extra)
+    return _make_result("http", url, True, response["total"], **extra)
+
+
+async def probe_dns(host: str, timeout: float = 1) -> Dict[str, Any]:
+    """
+    DNS探测：绕过缓存向解析器发起一次真实查询（成功结果同时刷新缓存）
+
+    注意认证门户可能劫持DNS，解析成功不代表互联网可达，建议配合较低的权重使用。
+    """
+    answer = await _RESOLVER.resolve(host, timeout, allow_stale=False, force=True)
+    extra = {"resolve_time": answer["resolve_time"], "dns_source": answer["source"],
+             "addresses": answer["addresses"], "timed_out": answer["source"] == "timeout"}
+    if answer["addresses"]:
+        return _make_result("dns", host, True, answer["resolve_time"], **extra)
+    return _make_result("dns", host, False, answer["resolve_time"], answer["error"], **extra)
+
+
+# 探测注册表：名称 -> 构造函数，构造函数接收探测上下文，返回探测工厂列表
+# 上下文字段: test_sites, test_urls, ping_targets, dns_hosts, auth_url, portal_probe_url,
+#             http_backend, timeout_for(key) -> 超时秒数
+ProbeBuilder = Callable[[Dict[str, Any]], List[ProbeFactory]]
+PROBE_REGISTRY: Dict[str, ProbeBuilder] = {}
+
+
+def register_probe(name: str) -> Callable[[ProbeBuilder], ProbeBuilder]:
+    """装饰器：将探测构造函数注册到指定名称下"""
+    def decorator(builder: ProbeBuilder) -> ProbeBuilder:
+        PROBE_REGISTRY[name] = builder
+        return builder
+    return decorator
+
+
+def build_probes(methods: Iterable[str], context: Dict[str, Any]) -> List[Tuple[str, ProbeFactory]]:
+    """
+    按方法名从注册表构造探测列表
+
+    参数:
+        methods: 探测方法名（保持顺序）
+        context: 探测上下文
+
+    返回:
+        List[Tuple[str, ProbeFactory]]: (方法名, 探测工厂) 列表，未注册的方法被忽略
+    """
+    probes = []
+    for method in methods:
+        builder = PROBE_REGISTRY.get(method)
+        if builder is None:
+            continue
+        probes.extend((method, factory) for factory in builder(context))
+    return probes
+
+
+@register_probe("socket")
+def _build_socket_probes(context: Dict[str, Any]) -> List[ProbeFactory]:
+    timeout_for = context["timeout_for"]
+    return [functools.partial(probe_socket, host, port, timeout_for(f"socket:{host}:{port}"))
+            for host, port in context["test_sites"]]
+
+
+@register_probe("http")
+def _build_http_probes(context: Dict[str, Any]) -> List[ProbeFactory]:
+    timeout_for = context["timeout_for"]
+    use_curl = context.get("http_backend") == "curl" and curl_available()
+    probe = probe_curl if use_curl else probe_http
+    method = "curl" if use_curl else "http"
+    return [functools.partial(probe, url, timeout_for(f"{method}:{url}")) for url in context["test_urls"]]
+
+
+@register_probe("dns")
+def _build_dns_probes(context: Dict[str, Any]) -> List[ProbeFactory]:
+    timeout_for = context["timeout_for"]
+    return [functools.partial(probe_dns, host, timeout_for(f"dns:{host}")) for host in context["dns_hosts"]]
+
+
+@functools.lru_cache(maxsize=1)
+def curl_available() -> bool:
+    """检测系统是否安装 curl（每个进程只检测一次）"""
+    try:
+        subprocess.run(["curl", "--version"], capture_output=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+
+def _quorum_reached(score: float, succeeded_methods: set, quorum: float, required_methods: set) -> bool:
+    """判断是否已满足成功条件"""
+    return score >= quorum and required_methods.issubset(succeeded_methods)
+
+
+def _quorum_impossible(score: float, pending_methods: List[str], succeeded_methods: set,
+                       quorum: float, required_methods: set, weights: Dict[str, float]) -> bool:
+    """判断剩余探测是否已不可能满足成功条件"""
+    if score + sum(weights.get(method, 1) for method in pending_methods) < quorum:
+        return True
+    for method in required_methods - succeeded_methods:
+        if method not in pending_methods:
+            return True
+    return False
+
+
+async def race_probes(probes: Sequence[Tuple[str, ProbeFactory]], quorum: float = 1,
+                      required_methods: Optional[Iterable[str]] = None,
+                      deadline: Optional[float] = None,
+                      weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    并发执行所有探测，满足条件后立即取消其余探测
+
+    参数:
+        probes: (探测方法名, 探测工厂) 列表
+        quorum: 需要达到的成功分数（每个成功探测按其方法的权重计分）
+        required_methods: 必须至少成功一次的探测方法（用于"两种方法都成功"策略）
+        deadline: 整体等待上限（秒），None表示等待所有探测自行超时
+        weights: 方法权重，未指定的方法权重为1
+
+    返回:
+        Dict[str, Any]: {"success", "score", "results", "elapsed", "cancelled"}
+    """
+    start = time.perf_counter()
+    required = set(required_methods or [])
+    weights = weights or {}
+    tasks = {asyncio.ensure_future(factory()): method for method, factory in probes}
+    pending = set(tasks)
+    results: List[Dict[str, Any]] = []
+    score = 0.0
+    succeeded_methods: set = set()
+    success = False
+
+    try:
+        while pending:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - (time.perf_counter() - start)
+                if remaining <= 0:
+                    break
+
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for task in done:
+                method = tasks[task]
+                if task.cancelled():
+                    continue
+                exc = task.exception()
+                if exc is not None:
+                    result = _make_result(method, "", False, time.perf_counter() - start, f"探测异常: {exc}")
+                else:
+                    result = task.result()
+                results.append(result)
+                if result["success"]:
+                    score += weights.get(method, 1)
+                    succeeded_methods.add(method)
+
+            if _quorum_reached(score, succeeded_methods, quorum, required):
+                success = True
+                break
+
+            pending_methods = [tasks[task] for task in pending]
+            if _quorum_impossible(score, pending_methods, succeeded_methods, quorum, required, weights):
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    return {
+        "success": success,
+        "score": score,
+        "results": results,
+        "elapsed": time.perf_counter() - start,
+        "cancelled": len(pending),
+    }
+
+
+def summarize_by_method(results: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """按探测方法汇总结果：是否成功、最快成功耗时、各目标的耗时和错误"""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        entry = summary.setdefault(result["method"], {"success": False, "latency": None,
+                                                       "latencies": {}, "errors": {}})
+        entry["latencies"][result["target"]] = result["latency"]
+        if result["success"]:
+            entry["success"] = True
+            if entry["latency"] is None or result["latency"] < entry["latency"]:
+                entry["latency"] = result["latency"]
+        elif result["error"]:
+            entry["errors"][result["target"]] = result["error"]
+    return summary
+
+
+async def run_strategy(probes: Sequence[Tuple[str, ProbeFactory]], strategy: str = "parallel",
+                       quorum: float = 1, weights: Optional[Dict[str, float]] = None,
+                       required_methods: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    按策略执行探测
+
+    参数:
+        probes: (探测方法名, 探测工厂) 列表，顺序即ordered策略的执行顺序
+        strategy: parallel（所有探测同时竞速）或 ordered（按方法顺序逐组执行，组内并发，
+                  达到成功分数后不再执行后续方法，适合把廉价探测放在前面）
+        quorum: 需要达到的成功分数
+        weights: 方法权重
+        required_methods: 必须至少成功一次的方法
+
+    返回:
+        Dict[str, Any]: race_probes 的报告，另附 strategy 和按方法汇总的 by_method
+    """
+    weights = weights or {}
+    required = set(required_methods or [])
+
+    if strategy != "ordered":
+        report = await race_probes(probes, quorum, required, weights=weights)
+    else:
+        start = time.perf_counter()
+        groups: Dict[str, List[Tuple[str, ProbeFactory]]] = {}
+        for method, factory in probes:
+            groups.setdefault(method, []).append((method, factory))
+
+        report = {"success": False, "score": 0.0, "results": [], "elapsed": 0.0, "cancelled": 0}
+        succeeded_methods: set = set()
+        for method, group in groups.items():
+            group_total = weights.get(method, 1) * len(group)
+            needed = max(quorum - report["score"], 0)
+            if method in required and method not in succeeded_methods:
+                needed = max(needed, weights.get(method, 1))
+            group_report = await race_probes(group, min(needed, group_total), weights=weights)
+            report["results"].extend(group_report["results"])
+            report["score"] += group_report["score"]
+            report["cancelled"] += group_report["cancelled"]
+            if group_report["score"] > 0:
+                succeeded_methods.add(method)
+            if _quorum_reached(report["score"], succeeded_methods, quorum, required):
+                report["success"] = True
+                break
+        report["elapsed"] = time.perf_counter() - start
+
+    report["strategy"] = strategy
+    report["by_method"] = summarize_by_method(report["results"])
+    return report
+
+
+def run_probes(probes: Sequence[Tuple[str, ProbeFactory]], quorum: float = 1,
+               required_methods: Optional[Iterable[str]] = None,
+               deadline: Optional[float] = None,
+               weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """race_probes 的同步包装，供监控线程等同步代码调用"""
+    return asyncio.run(race_probes(probes, quorum, required_methods, deadline, weights))
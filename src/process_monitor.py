@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器进程树资源统计 - 从 /proc 读取子进程的内存、CPU时间和进程数
+
+Playwright 驱动是本进程的子进程，Chromium（浏览器、渲染、GPU、网络等进程）是驱动的子孙进程。
+统计只以启动浏览器时新出现的驱动进程为根（见 spawned_children），不包括本进程的其他子进程
+（curl探测、其他会话的浏览器）。按进程树汇总 RSS、CPU 时间和进程数，记录每次登录的峰值；可选地：
+
+- RSS 或本次尝试的CPU时间（按采样差值计算）超过上限时回调（由调用方关闭或杀死浏览器）
+- 对新出现的子进程设置 RLIMIT_CPU（prlimit，累计整个进程生命周期，只适合短生命周期的浏览器）
+- 把浏览器进程移入预先创建的 cgroup v2 目录，并设置 memory.max
+
+PeakRssSampler 在后台线程中记录整个进程树（含根进程）的峰值RSS，供基准测试和登录子进程使用。
+
+没有 /proc 的系统（Windows、macOS）上所有统计都返回None，不影响登录流程。
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROC_ROOT = "/proc"
+
+# Chromium 各版本/打包方式的进程名
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+# Playwright 驱动的进程名（随 playwright 包分发的 node）
+DRIVER_PROCESS_NAMES = ("node", "playwright")
+
+MB = 1024 * 1024
+
+
+def proc_available() -> bool:
+    """当前系统是否可以通过 /proc 统计进程"""
+    return os.path.isdir(f"{PROC_ROOT}/self")
+
+
+def _sysconf(name: str, default: int) -> int:
+    try:
+        return os.sysconf(name)
+    except (AttributeError, ValueError, OSError):
+        return default
+
+
+PAGE_SIZE = _sysconf("SC_PAGE_SIZE", 4096)
+CLOCK_TICKS = _sysconf("SC_CLK_TCK", 100)
+
+
+def read_processes() -> Optional[Dict[int, Dict]]:
+    """
+    读取所有进程的父进程、名称、RSS和CPU时间
+
+    返回:
+        Optional[Dict[int, Dict]]: pid → {"ppid", "name", "rss"(字节), "cpu"(秒)}；没有 /proc 时返回None
+    """
+    if not proc_available():
+        return None
+    processes = {}
+    for name in os.listdir(PROC_ROOT):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"{PROC_ROOT}/{name}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"{PROC_ROOT}/{name}/statm", "rb") as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        # 进程名可能包含空格和括号，从最后一个右括号之后解析：state ppid ... utime(11) stime(12)
+        close = stat.rfind(b")")
+        fields = stat[close + 2:].split()
+        try:
+            processes[int(name)] = {
+                "ppid": int(fields[1]),
+                "name": stat[stat.find(b"(") + 1:close].decode("utf-8", errors="replace"),
+                "rss": rss_pages * PAGE_SIZE,
+                "cpu": (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+            }
+        except (IndexError, ValueError):
+            continue
+    return processes
+
+
+def descendants(processes: Dict[int, Dict], root_pid: int) -> List[int]:
+    """root_pid 的全部子孙进程（不含root_pid本身）"""
+    children: Dict[int, List[int]] = {}
+    for pid, info in processes.items():
+        children.setdefault(info["ppid"], []).append(pid)
+    result, stack = [], list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        result.append(pid)
+        stack.extend(children.get(pid, []))
+    return result
+
+
+def tree_pids(processes: Dict[int, Dict], root_pids: Iterable[int]) -> List[int]:
+    """仍在运行的根进程及其全部子孙进程"""
+    pids = []
+    for root in root_pids:
+        if root in processes and root not in pids:
+            pids.append(root)
+            pids.extend(pid for pid in descendants(processes, root) if pid not in pids)
+    return pids
+
+
+def child_pids(parent_pid: Optional[int] = None) -> Set[int]:
+    """parent_pid（默认本进程）当前的直接子进程；没有 /proc 时返回空集合"""
+    parent_pid = parent_pid or os.getpid()
+    processes = read_processes() or {}
+    return {pid for pid, info in processes.items() if info["ppid"] == parent_pid}
+
+
+def spawned_children(before: Set[int], parent_pid: Optional[int] = None) -> List[int]:
+    """
+    启动浏览器后新出现的Playwright驱动/Chromium子进程（作为资源统计的根）
+
+    参数:
+        before: 启动前的 child_pids()
+        parent_pid: 父进程，默认本进程
+
+    返回:
+        List[int]: 新出现的驱动或浏览器进程；按进程名无法识别时返回全部新出现的子进程
+    """
+    parent_pid = parent_pid or os.getpid()
+    processes = read_processes() or {}
+    spawned = [pid for pid, info in processes.items() if info["ppid"] == parent_pid and pid not in before]
+    known = [pid for pid in spawned if is_browser_process(processes[pid]["name"])
+             or any(driver in processes[pid]["name"].lower() for driver in DRIVER_PROCESS_NAMES)]
+    return known or spawned
+
+
+def is_browser_process(name: str) -> bool:
+    """进程名是否为Chromium"""
+    name = name.lower()
+    return any(browser in name for browser in BROWSER_PROCESS_NAMES)
+
+
+def browser_root_pids(processes: Dict[int, Dict], pids: List[int]) -> List[int]:
+    """在给定进程中找出Chromium主进程（父进程不是Chromium的Chromium进程）"""
+    roots = []
+    for pid in pids:
+        info = processes.get(pid)
+        if info and is_browser_process(info["name"]):
+            parent = processes.get(info["ppid"])
+            if not parent or not is_browser_process(parent["name"]):
+                roots.append(pid)
+    return roots
+
+
+def tree_usage(root_pid: int, include_root: bool = True) -> Optional[Dict[str, float]]:
+    """
+    汇总进程树的资源占用
+
+    返回:
+        Optional[Dict[str, float]]: {"rss"(字节), "cpu"(秒), "processes"}；没有 /proc 时返回None
+    """
+    processes = read_processes()
+    if processes is None:
+        return None
+    pids = descendants(processes, root_pid) + ([root_pid] if include_root and root_pid in processes else [])
+    return {
+        "rss": sum(processes[pid]["rss"] for pid in pids),
+        "cpu": sum(processes[pid]["cpu"] for pid in pids),
+        "processes": len(pids),
+    }
+
+
+def kill_processes(pids: List[int], sig: int = getattr(signal, "SIGKILL", signal.SIGTERM)) -> None:
+    """向进程发送信号（进程已退出时忽略）"""
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except OSError:
+            pass
+
+
+class ProcessTreeMonitor:
+    """
+    定期采样一个浏览器会话的进程树（Playwright驱动和浏览器），记录当前统计窗口内的峰值
+
+    进程树的根由 set_roots() 指定（启动浏览器时新出现的驱动进程），未指定时不统计。
+    一个统计窗口对应一次登录尝试：reset() 开始新窗口，summary() 读取窗口内的
+    峰值RSS、CPU时间和峰值进程数。
+    """
+
+    def __init__(self, interval: float = 0.5, rss_limit: int = 0, cpu_limit: float = 0,
+                 on_limit: Optional[Callable[[str, List[int]], Awaitable[None]]] = None,
+                 rlimit_cpu: int = 0, cgroup_path: Optional[str] = None, cgroup_memory_max: int = 0,
+                 root_pids: Iterable[int] = (), logger: Optional[logging.Logger] = None):
+        """
+        参数:
+            interval: 采样间隔（秒）
+            rss_limit: 进程树RSS上限（字节），0表示不限制
+            cpu_limit: 每个统计窗口（一次尝试）的CPU时间上限（秒），0表示不限制
+            on_limit: 超过上限时调用的协程函数，参数为 (超限说明, Chromium主进程pid列表)；每个窗口最多调用一次
+            rlimit_cpu: 对子进程设置的 RLIMIT_CPU（秒），0表示不设置；按进程累计，不要用于常驻浏览器
+            cgroup_path: 预先创建且有写权限的 cgroup v2 目录，浏览器进程会被移入其中
+            cgroup_memory_max: 写入该 cgroup 的 memory.max（字节），0表示不修改
+            root_pids: 进程树的根（Playwright驱动或浏览器主进程）
+            logger: 日志记录器
+        """
+        self.root_pids: List[int] = list(root_pids)
+        self.interval = interval
+        self.rss_limit = rss_limit
+        self.cpu_limit = cpu_limit
+        self.on_limit = on_limit
+        self.rlimit_cpu = rlimit_cpu
+        self.cgroup_path = cgroup_path
+        self.cgroup_memory_max = cgroup_memory_max
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._task: Optional[asyncio.Task] = None
+        self._limited_pids = set()
+        self._cgroup_ready = False
+        self.reset()
+
+    def set_roots(self, root_pids: Iterable[int]) -> None:
+        """指定进程树的根（浏览器重新启动后调用）"""
+        self.root_pids = list(root_pids)
+
+    def reset(self) -> None:
+        """开始新的统计窗口"""
+        self.peak_rss = 0
+        self.peak_processes = 0
+        self.samples = 0
+        self.limit_hit = False
+        self._cpu_baseline: Dict[int, float] = {}
+        self._cpu_latest: Dict[int, float] = {}
+        self._baseline_pending = True
+
+    def sample(self) -> Optional[Dict[str, float]]:
+        """
+        采样一次并更新峰值，同时对新进程应用限制
+
+        返回:
+            Optional[Dict[str, float]]: 本次采样的 {"rss", "processes", "browser_pids"}；没有 /proc 时返回None
+        """
+        processes = read_processes()
+        if processes is None:
+            return None
+        pids = tree_pids(processes, self.root_pids)
+        rss = sum(processes[pid]["rss"] for pid in pids)
+
+        for pid in pids:
+            cpu = processes[pid]["cpu"]
+            if self._baseline_pending:
+                self._cpu_baseline[pid] = cpu
+            self._cpu_latest[pid] = cpu
+        self._baseline_pending = False
+
+        self.samples += 1
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_processes = max(self.peak_processes, len(pids))
+        self._apply_limits(processes, pids)
+        return {"rss": rss, "processes": len(pids), "browser_pids": browser_root_pids(processes, pids)}
+
+    def summary(self) -> Dict[str, float]:
+        """当前窗口的 {"peak_rss", "cpu", "peak_processes", "samples"}（CPU时间包括窗口内已退出的进程）"""
+        cpu = sum(latest - self._cpu_baseline.get(pid, 0.0) for pid, latest in self._cpu_latest.items())
+        return {"peak_rss": self.peak_rss, "cpu": cpu, "peak_processes": self.peak_processes,
+                "samples": self.samples}
+
+    def _apply_limits(self, processes: Dict[int, Dict], pids: List[int]) -> None:
+        """对新出现的子进程设置 RLIMIT_CPU，把浏览器进程移入 cgroup"""
+        new_pids = [pid for pid in pids if pid not in self._limited_pids]
+        if not new_pids:
+            return
+        self._limited_pids.intersection_update(pids)
+        self._limited_pids.update(new_pids)
+
+        if self.rlimit_cpu and resource is not None and hasattr(resource, "prlimit"):
+            for pid in new_pids:
+                try:
+                    resource.prlimit(pid, resource.RLIMIT_CPU, (self.rlimit_cpu, self.rlimit_cpu))
+                except (OSError, ValueError) as e:
+                    self.logger.debug(f"设置进程{pid}的CPU时间限制失败: {e}")
+
+        if self.cgroup_path and self._prepare_cgroup():
+            for pid in new_pids:
+                if is_browser_process(processes[pid]["name"]):
+                    try:
+                        with open(os.path.join(self.cgroup_path, "cgroup.procs"), "w") as f:
+                            f.write(str(pid))
+                    except OSError as e:
+                        self.logger.debug(f"把进程{pid}移入cgroup失败: {e}")
+
+    def _prepare_cgroup(self) -> bool:
+        """检查 cgroup 目录并写入 memory.max（只执行一次，失败后不再尝试）"""
+        if self._cgroup_ready:
+            return True
+        try:
+            if self.cgroup_memory_max:
+                with open(os.path.join(self.cgroup_path, "memory.max"), "w") as f:
+                    f.write(str(self.cgroup_memory_max))
+            if not os.access(os.path.join(self.cgroup_path, "cgroup.procs"), os.W_OK):
+                raise PermissionError("cgroup.procs 不可写")
+            self._cgroup_ready = True
+        except OSError as e:
+            self.logger.warning(f"⚠️ 无法使用cgroup {self.cgroup_path}: {e}，已停用cgroup限制")
+            self.cgroup_path = None
+        return self._cgroup_ready
+
+    def start(self) -> None:
+        """在当前事件循环中开始定期采样（已在运行时不重复启动）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """停止采样"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def limit_exceeded(self, usage: Dict[str, float]) -> Optional[str]:
+        """
+        检查采样结果是否超过上限
+
+        返回:
+            Optional[str]: 超限说明，未超限时返回None
+        """
+        if self.rss_limit and usage["rss"] > self.rss_limit:
+            return f"进程树RSS {usage['rss'] / MB:.0f}MB 超过上限 {self.rss_limit / MB:.0f}MB"
+        if self.cpu_limit:
+            cpu = self.summary()["cpu"]
+            if cpu > self.cpu_limit:
+                return f"本次尝试CPU时间 {cpu:.1f}s 超过上限 {self.cpu_limit:g}s"
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            usage = self.sample()
+            if usage is None:
+                return
+            reason = None if self.limit_hit or not self.on_limit else self.limit_exceeded(usage)
+            if reason:
+                self.limit_hit = True
+                try:
+                    await self.on_limit(reason, usage["browser_pids"])
+                except Exception as e:
+                    self.logger.warning(f"处理浏览器资源超限失败: {e}")
+            await asyncio.sleep(self.interval)
+
+
+class PeakRssSampler:
+    """后台线程定期采样进程树的RSS，记录峰值"""
+
+    def __init__(self, interval: float = 0.1, root_pid: Optional[int] = None):
+        """
+        参数:
+            interval: 采样间隔（秒）
+            root_pid: 进程树的根，默认为本进程
+        """
+        self.interval = interval
+        self.root_pid = root_pid or os.getpid()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            usage = tree_usage(self.root_pid)
+            if usage is None:
+                return
+            self.peak = max(self.peak, usage["rss"])
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def peak_bytes(self) -> Optional[int]:
+        """峰值RSS（字节）；无法读取 /proc 时退回到本进程的 ru_maxrss（macOS单位为字节，Linux为KB），均不可用时返回None"""
+        if self.peak:
+            return self.peak
+        if resource is not None:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == "darwin" else maxrss * 1024
+        return None
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+门户选择器缓存 - 记录每个认证页面上实际生效的选择器
+
+每个认证URL保存一份表单方案（账号/密码/运营商/提交按钮的选择器）和页面结构指纹
+（表单元素的标签/name/type/id，由表单发现脚本计算）。下次登录同一门户时表单发现
+只评估缓存的几个选择器，而不是全部候选；指纹不一致或缓存的选择器不可用时删除该项，
+回退到完整的候选列表。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# 最多保留的门户数
+MAX_PORTALS = 20
+
+
+def page_digest(signature: str) -> str:
+    """页面结构签名的摘要（缓存中只保存摘要）"""
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+
+
+class SelectorCache:
+    """线程安全的选择器缓存，修改后立即写回磁盘"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        参数:
+            path: 缓存文件路径，None表示只在内存中缓存
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._entries = {url: entry for url, entry in data.items()
+                                         if isinstance(entry, dict) and "digest" in entry and "selectors" in entry}
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        entries = self._entries or {}
+        if len(entries) > MAX_PORTALS:
+            newest = sorted(entries, key=lambda key: entries[key].get("updated", 0), reverse=True)[:MAX_PORTALS]
+            self._entries = entries = {key: entries[key] for key in newest}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, auth_url: str) -> Optional[Dict]:
+        """
+        获取认证页面上次生效的表单方案
+
+        返回:
+            Optional[Dict]: {"digest": 页面结构摘要, "selectors": 角色 -> 选择器（未找到为None）}
+        """
+        with self._lock:
+            entry = self._load().get(auth_url)
+            return {"digest": entry["digest"], "selectors": dict(entry["selectors"])} if entry else None
+
+    def record(self, auth_url: str, digest: str, selectors: Dict[str, Optional[str]]) -> None:
+        """记录生效的表单方案（没有变化时不写盘）"""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(auth_url)
+            if entry and entry["digest"] == digest and entry["selectors"] == selectors:
+                return
+            entries[auth_url] = {"digest": digest, "selectors": dict(selectors), "updated": time.time()}
+            self._save()
+
+    def invalidate(self, auth_url: str) -> None:
+        """删除失效的表单方案"""
+        with self._lock:
+            if self._load().pop(auth_url, None) is not None:
+                self._save()
+
+
+_CACHES: Dict[Optional[str], SelectorCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_selector_cache(path: Optional[str] = None) -> SelectorCache:
+    """获取指定文件对应的进程级共享缓存"""
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = SelectorCache(path)
+        return _CACHES[path]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发请求合并 - 相同操作同一时间只执行一次，所有并发调用方共享结果
+
+GUI按钮、监控线程和手动登录线程可能同时触发网络检测或登录，
+这些调用分别运行在不同线程、不同事件循环中，因此这里用线程安全的
+concurrent.futures.Future 作为共享结果的载体。
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    请求合并器
+
+    - 同一个key同时只有一个操作在执行，其他调用方等待并共享它的结果（或异常）
+    - 操作成功返回后，在 fresh_for 秒内再次调用直接复用该结果，不重新执行；
+      cache_if 判定为失败的结果只交给已在等待的调用方，之后的调用会重新执行
+    """
+
+    def __init__(self, fresh_for: float = 0, cache_if: Optional[Callable[[Any], bool]] = None):
+        """
+        初始化请求合并器
+
+        参数:
+            fresh_for: 默认的结果复用时间（秒），0表示只合并并发调用
+            cache_if: 判断结果能否在 fresh_for 内复用，None表示所有正常返回的结果都可复用
+        """
+        self.fresh_for = fresh_for
+        self.cache_if = cache_if
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, concurrent.futures.Future] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self._stats = {"executed": 0, "shared": 0, "reused": 0}
+
+    def _join_or_lead(self, key: Hashable, fresh_for: Optional[float]) -> Tuple[str, Any]:
+        """
+        决定本次调用的角色
+
+        返回:
+            ("fresh", 结果) / ("follower", future) / ("leader", future)
+        """
+        fresh_for = self.fresh_for if fresh_for is None else fresh_for
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent and fresh_for > 0 and time.monotonic() - recent[0] <= fresh_for:
+                self._stats["reused"] += 1
+                return "fresh", recent[1]
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats["shared"] += 1
+                return "follower", future
+            future = concurrent.futures.Future()
+            self._inflight[key] = future
+            self._stats["executed"] += 1
+            return "leader", future
+
+    def _finish(self, key: Hashable, future: concurrent.futures.Future, result: Any = None,
+                error: Optional[BaseException] = None) -> None:
+        """发布执行结果并唤醒所有等待方"""
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and (self.cache_if is None or self.cache_if(result)):
+                self._recent[key] = (time.monotonic(), result)
+            else:
+                # 失败不复用，同时丢弃更早的结果（它已经不能代表当前状态）
+                self._recent.pop(key, None)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], fresh_for: Optional[float] = None) -> Any:
+        """
+        同步调用：相同key的并发调用只执行一次fn
+
+        参数:
+            key: 操作标识
+            fn: 实际执行的函数
+            fresh_for: 本次调用可接受的结果新鲜度（秒），None使用默认值
+
+        返回:
+            Any: fn的返回值（可能来自其他调用方的执行）
+        """
+        role, value = self._join_or_lead(key, fresh_for)
+        if role == "fresh":
+            return value
+        if role == "follower":
+            return value.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, value, error=e)
+            raise
+        self._finish(key, value, result)
+        return result
+
+    async def do_async(self, key: Hashable, coro_factory: Callable[[], Awaitable[Any]],
+                       fresh_for: Optional[float] = None) -> Any:
+        """
+        异步调用：相同key的并发调用只执行一次协程（调用方可以位于不同的事件循环/线程）
+
+        参数:
+            key: 操作标识
+            coro_factory: 返回协程的工厂函数
+            fresh_for: 本次调用可接受的结果新鲜度（秒），None使用默认值
+
+        返回:
+            Any: 协程的返回值（可能来自其他调用方的执行）
+        """
+        role, value = self._join_or_lead(key, fresh_for)
+        if role == "fresh":
+            return value
+        if role == "follower":
+            return await asyncio.wrap_future(value)
+
+        try:
+            result = await coro_factory()
+        except BaseException as e:
+            self._finish(key, value, error=e)
+            raise
+        self._finish(key, value, result)
+        return result
+
+    def last_result_age(self, key: Hashable) -> Optional[float]:
+        """返回key最近一次结果距今的秒数，没有结果时返回None"""
+        with self._lock:
+            recent = self._recent.get(key)
+        return time.monotonic() - recent[0] if recent else None
+
+    def forget(self, key: Hashable) -> None:
+        """丢弃key的缓存结果（例如网络变化后）"""
+        with self._lock:
+            self._recent.pop(key, None)
+
+    def clear(self) -> None:
+        """丢弃所有缓存结果（进行中的操作不受影响）"""
+        with self._lock:
+            self._recent.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """返回统计：实际执行次数、共享进行中结果次数、复用新鲜结果次数"""
+        with self._lock:
+            return dict(self._stats)
+
+
+# 进程级共享实例：网络检测与登录（只复用"网络正常"的检测报告和成功的登录）
+PROBE_FLIGHT = SingleFlight(fresh_for=5, cache_if=lambda report: bool(report.get("success")))
+LOGIN_FLIGHT = SingleFlight(fresh_for=10, cache_if=bool)
@@ -4,20 +4,41 @@
 公共工具类 - 解决代码重复问题
 """
 
+import asyncio
+import collections
+import contextlib
 import datetime
+import fnmatch
 import logging
 import logging.handlers
+import math
 import os
 import random
-from typing import Dict, Any, Tuple, Type, Optional
-from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, Deque, Iterable, List, Tuple, Type, Optional
+
+from process_monitor import MB, ProcessTreeMonitor, child_pids, kill_processes, proc_available, spawned_children
+from singleflight import LOGIN_FLIGHT
+
+
+def _playwright_timeout_error() -> Optional[Type[BaseException]]:
+    """
+    已加载Playwright时返回其超时异常类型
+    
+    只查找已导入的模块而不主动导入：监控进程只做网络探测，不需要加载Playwright。
+    """
+    module = sys.modules.get("playwright.async_api")
+    return getattr(module, "TimeoutError", None)
 
 
 class ExceptionHandler:
     """异常处理增强器 - 按项目规范处理具体异常类型"""
     
     @staticmethod
-    def handle_playwright_timeout(e: PlaywrightTimeoutError, operation: str, logger: logging.Logger) -> str:
+    def handle_playwright_timeout(e: Exception, operation: str, logger: logging.Logger) -> str:
         """处理Playwright超时异常"""
         error_msg = f"{operation}超时: {str(e)}"
         logger.error(error_msg)
@@ -42,11 +63,12 @@ class ExceptionHandler:
         """装饰器：为方法添加具体异常处理"""
         def decorator(func):
             async def wrapper(*args, **kwargs):
+                timeout_error = _playwright_timeout_error() or ()
                 try:
                     return await func(*args, **kwargs)
-                except PlaywrightTimeoutError as e:
+                except timeout_error as e:
                     error_msg = ExceptionHandler.handle_playwright_timeout(e, operation, logger)
-                    raise PlaywrightTimeoutError(error_msg) from e
+                    raise type(e)(error_msg) from e
                 except (ConnectionError, OSError) as e:
                     error_msg = ExceptionHandler.handle_network_error(e, operation, logger)
                     raise ConnectionError(error_msg) from e
@@ -62,21 +84,66 @@ class ExceptionHandler:
         return decorator
 
 
+# 各失败类型的重试策略：stop 立即停止；backoff 指数退避加抖动；fast 快速重试；fixed 固定间隔
+RETRY_POLICIES = {
+    "wrong_password": "stop",
+    "blacklisted": "stop",
+    "rate_limited": "backoff",
+    "network_error": "fast",
+    "unknown": "fixed",
+}
+
+FAILURE_TYPE_NAMES = {
+    "wrong_password": "账号或密码错误",
+    "blacklisted": "账号被拒绝或锁定",
+    "rate_limited": "请求过于频繁",
+    "network_error": "网络错误",
+    "unknown": "未知错误",
+}
+
+
 class SimpleRetryHandler:
-    """简化重试处理器 - 使用简单的重试机制"""
+    """简化重试处理器 - 按失败类型选择重试策略"""
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.retry_settings = config.get('retry_settings', {})
         self.logger = LoggerSetup.setup_logger(f"{__name__}_retry", config.get('logging', {}))
     
-    async def retry_with_simple_backoff(self, operation, max_retries: int = None) -> Tuple[bool, Any, str]:
+    def _retry_delay(self, failure_type: str, attempt: int) -> Optional[float]:
+        """
+        计算下次重试前的等待时间
+        
+        参数:
+            failure_type: 失败类型
+            attempt: 已失败的次数减一（从0开始）
+            
+        返回:
+            Optional[float]: 等待秒数，None表示不应重试
+        """
+        policy = RETRY_POLICIES.get(failure_type, "fixed")
+        retry_interval = self.retry_settings.get('retry_interval', 5)
+        if policy == "stop":
+            return None
+        if policy == "fast":
+            return self.retry_settings.get('fast_retry_interval', 1)
+        if policy == "backoff":
+            # 等抖动：在 [上限/2, 上限] 内随机，避免多个客户端同时重试
+            ceiling = min(self.retry_settings.get('max_backoff', 120), retry_interval * 2 ** attempt)
+            return random.uniform(ceiling / 2, ceiling)
+        return retry_interval
+    
+    async def retry_with_simple_backoff(self, operation, max_retries: int = None,
+                                        failure_of: Optional[Callable[[Any], Optional[str]]] = None,
+                                        classify: Optional[Callable[[str], str]] = None) -> Tuple[bool, Any, str]:
         """
-        简单的重试机制
+        按失败类型重试
         
         参数:
             operation: 要重试的异步操作
-            max_retries: 最大重试次数
+            max_retries: 最大尝试次数
+            failure_of: 从操作返回值中提取失败信息，返回None表示成功（默认只有抛出异常才算失败）
+            classify: 把失败信息归类为失败类型（见 RETRY_POLICIES），默认都视为unknown
             
         返回:
             Tuple[bool, Any, str]: (是否成功, 结果, 错误信息)
@@ -84,33 +151,41 @@ class SimpleRetryHandler:
         if max_retries is None:
             max_retries = self.retry_settings.get('max_retries', 3)
         
-        retry_interval = self.retry_settings.get('retry_interval', 5)
         last_error = None
+        last_result = None
         
         for attempt in range(max_retries):
             try:
                 result = await operation()
+                error = failure_of(result) if failure_of else None
+            except Exception as e:
+                result, error = None, str(e)
+            
+            if error is None:
                 if attempt > 0:
                     self.logger.info(f"✅ 操作在第{attempt + 1}次尝试后成功")
                 return True, result, ""
-                
-            except Exception as e:
-                last_error = e
-                
-                if attempt < max_retries - 1:  # 不是最后一次尝试
-                    self.logger.warning(
-                        f"❌ 第{attempt + 1}次尝试失败: {str(e)}, "
-                        f"{retry_interval}秒后重试..."
-                    )
-                    
-                    # 简单等待
-                    import asyncio
-                    await asyncio.sleep(retry_interval)
-                else:
-                    self.logger.error(f"❌ 所有{max_retries}次尝试均失败")
+            
+            last_error, last_result = error, result
+            failure_type = classify(error) if classify else "unknown"
+            failure_name = FAILURE_TYPE_NAMES.get(failure_type, failure_type)
+            delay = self._retry_delay(failure_type, attempt)
+            
+            if delay is None:
+                self.logger.error(f"🛑 第{attempt + 1}次尝试失败（{failure_name}）: {error}，停止重试")
+                return False, result, f"{failure_name}，已停止重试: {error}"
+            
+            if attempt < max_retries - 1:  # 不是最后一次尝试
+                self.logger.warning(
+                    f"❌ 第{attempt + 1}次尝试失败（{failure_name}）: {error}, "
+                    f"{delay:.1f}秒后重试..."
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.logger.error(f"❌ 所有{max_retries}次尝试均失败")
         
-        error_msg = f"重试{max_retries}次后仍然失败，最后错误: {str(last_error)}"
-        return False, None, error_msg
+        error_msg = f"重试{max_retries}次后仍然失败，最后错误: {last_error}"
+        return False, last_result, error_msg
 
 
 class TimeUtils:
@@ -214,16 +289,44 @@ class LoginAttemptHandler:
                     self.logger.info(f"⏰ 当前时间 {current_hour}:xx 在暂停登录时段（{start_hour}点-{end_hour}点），跳过登录")
                     return False
             
-            # 使用延迟导入避免循环依赖 - 但使用更安全的方式
-            return await self._perform_login_with_auth_class()
+            # 监控线程与手动登录线程的并发登录合并为一次，避免同时启动多个浏览器
+            key = (self.config.get('auth_url'), self.config.get('username'))
+            fresh_for = self.config.get('retry_settings', {}).get('login_result_fresh_for', LOGIN_FLIGHT.fresh_for)
+            age = LOGIN_FLIGHT.last_result_age(key)
+            if age is not None and age <= fresh_for:
+                self.logger.info(f"♻️ 复用{age:.1f}秒前的登录结果")
+            return await LOGIN_FLIGHT.do_async(key, self._perform_login_with_auth_class, fresh_for)
                 
         except Exception as e:
             self.logger.error(f"❌ 登录过程中发生错误: {str(e)}")
             return False
     
+    def _use_worker_process(self) -> bool:
+        """是否在子进程中登录（常驻浏览器池只能在本进程中使用）"""
+        from login_worker import worker_available
+        
+        return (self.config.get('login', {}).get('worker_process', True)
+                and not self.config.get('browser_settings', {}).get('pool_enabled', False)
+                and worker_available())
+    
+    async def _perform_login_in_worker(self) -> bool:
+        """在短生命周期的子进程中执行登录，本进程不加载Playwright"""
+        from login_worker import DEFAULT_WORKER_TIMEOUT, run_login_worker
+        
+        timeout = self.config.get('login', {}).get('worker_timeout', DEFAULT_WORKER_TIMEOUT)
+        result = await run_login_worker(self.config, timeout, self.logger)
+        if result["success"]:
+            self.logger.info(f"✅ 校园网登录成功: {result['message']}")
+            return True
+        self.logger.error(f"❌ 校园网登录失败: {result['message']}")
+        return False
+    
     async def _perform_login_with_auth_class(self) -> bool:
         """使用认证类执行登录（延迟导入）"""
         try:
+            if self._use_worker_process():
+                return await self._perform_login_in_worker()
+            
             # 延迟导入避免循环依赖
             from campus_login import EnhancedCampusNetworkAuth
             
@@ -308,6 +411,174 @@ class LoggerSetup:
         return logger
 
 
+class RuntimeCounters:
+    """线程安全的运行计数器（监控线程与GUI线程共用）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+    
+    def increment(self, name: str, amount: int = 1) -> None:
+        """增加计数"""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+    
+    def get(self, name: str) -> int:
+        """读取单个计数"""
+        with self._lock:
+            return self._counts.get(name, 0)
+    
+    def snapshot(self) -> Dict[str, int]:
+        """返回所有计数的副本"""
+        with self._lock:
+            return dict(self._counts)
+
+
+# 登录路径统计：precheck_online（HTTP预检发现已在线，跳过浏览器）、
+# http_login（HTTP快速登录成功）、browser_launch（实际启动浏览器）、
+# browser_reuse（复用常驻浏览器池中已运行的浏览器）
+LOGIN_COUNTERS = RuntimeCounters()
+
+
+def format_login_counters() -> str:
+    """格式化登录路径统计"""
+    counts = LOGIN_COUNTERS.snapshot()
+    text = (f"预检已在线: {counts.get('precheck_online', 0)}, HTTP登录: {counts.get('http_login', 0)}, "
+            f"浏览器启动: {counts.get('browser_launch', 0)}")
+    if counts.get('browser_attach'):
+        text += f", 浏览器附加: {counts['browser_attach']}"
+    if counts.get('browser_reuse'):
+        text += f", 浏览器复用: {counts['browser_reuse']}"
+    return text
+
+
+class LatencyHistogram:
+    """进程内延迟直方图：累计次数和最大值，分位数基于最近的样本计算"""
+    
+    def __init__(self, max_samples: int = 1000):
+        self._samples: Deque[float] = collections.deque(maxlen=max_samples)
+        self.count = 0
+        self.max = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        """记录一个样本（秒）"""
+        self._samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """最近样本的分位数（最近秩法），没有样本时返回None"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+    
+    def summary(self) -> Dict[str, Any]:
+        """返回 {"count", "p50", "p95", "max"}（单位：秒）"""
+        return {"count": self.count, "p50": self.percentile(50), "p95": self.percentile(95), "max": self.max}
+
+
+class LatencyHistograms:
+    """按名称分组的线程安全直方图集合"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+    
+    def observe(self, name: str, seconds: float) -> None:
+        """记录名为name的样本"""
+        with self._lock:
+            self._histograms.setdefault(name, LatencyHistogram()).observe(seconds)
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """返回所有直方图的统计"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self._histograms.items()}
+    
+    def counts(self) -> Dict[str, int]:
+        """返回各直方图的累计样本数（作为 export 的起点）"""
+        with self._lock:
+            return {name: histogram.count for name, histogram in self._histograms.items()}
+    
+    def export(self, since: Optional[Dict[str, int]] = None) -> Dict[str, List[float]]:
+        """
+        导出样本（用于在进程之间传递）
+        
+        参数:
+            since: counts() 的返回值，提供时只导出之后记录的样本；None表示导出保留的全部样本
+            
+        返回:
+            Dict[str, List[float]]: 名称 -> 样本（秒）
+        """
+        since = since or {}
+        exported = {}
+        with self._lock:
+            for name, histogram in self._histograms.items():
+                new = histogram.count - since.get(name, 0)
+                if new > 0:
+                    exported[name] = list(histogram._samples)[-new:]
+        return exported
+    
+    def merge(self, samples: Dict[str, Iterable[float]]) -> None:
+        """记录 export() 导出的样本"""
+        for name, values in samples.items():
+            for seconds in values:
+                self.observe(name, float(seconds))
+
+
+# 登录各阶段耗时的直方图（键为阶段名，total为整次登录）
+LOGIN_LATENCY = LatencyHistograms()
+
+
+class PhaseTimer:
+    """
+    一次登录的分阶段计时器
+    
+    各阶段互不重叠，同名阶段多次出现时累加；finish() 把各阶段和总耗时
+    记入 LOGIN_LATENCY，并生成一行结构化的摘要。
+    """
+    
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+    
+    def record(self, name: str, seconds: float) -> None:
+        """记录一个阶段的耗时（秒）"""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+    
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """计时代码块：with timer.span("navigate"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    def finish(self, outcome: str, path: str) -> str:
+        """
+        结束计时并汇总
+        
+        参数:
+            outcome: 结果（success / failed）
+            path: 登录路径（http / precheck / browser）
+            
+        返回:
+            str: 形如 "outcome=success path=browser total_ms=1830 navigate_ms=420 ... | total n=5 p50=1790ms p95=2410ms max=2410ms"
+        """
+        total = time.perf_counter() - self.start
+        for name, seconds in self.phases.items():
+            LOGIN_LATENCY.observe(name, seconds)
+        LOGIN_LATENCY.observe("total", total)
+        
+        fields = [f"outcome={outcome}", f"path={path}", f"total_ms={total * 1000:.0f}"]
+        fields += [f"{name}_ms={seconds * 1000:.0f}" for name, seconds in self.phases.items()]
+        stats = LOGIN_LATENCY.summary()["total"]
+        return (" ".join(fields) + f" | total n={stats['count']} p50={stats['p50'] * 1000:.0f}ms "
+                f"p95={stats['p95'] * 1000:.0f}ms max={stats['max'] * 1000:.0f}ms")
+
+
 def get_runtime_stats(start_time: float, check_count: int) -> Tuple[str, str]:
     """
     获取运行时统计信息
@@ -329,6 +600,11 @@ def get_runtime_stats(start_time: float, check_count: int) -> Tuple[str, str]:
         runtime_str = "00:00:00"
     
     stats_str = f"检测次数: {check_count}"
+    if LOGIN_COUNTERS.snapshot():
+        stats_str += f" | {format_login_counters()}"
+    latency = LOGIN_LATENCY.summary().get("total")
+    if latency:
+        stats_str += f" | 登录耗时 p50={latency['p50']:.1f}s p95={latency['p95']:.1f}s"
     
     return runtime_str, stats_str
 
@@ -349,6 +625,31 @@ class ConfigLoader:
         except ValueError:
             return default
 
+    @staticmethod
+    def _get_float_env(key: str, default: float) -> float:
+        """安全获取浮点数环境变量"""
+        try:
+            return float(os.getenv(key, str(default)))
+        except ValueError:
+            return default
+
+    @staticmethod
+    def _get_list_env(key: str, default: str) -> list[str]:
+        """获取逗号分隔的列表环境变量"""
+        return [item.strip() for item in os.getenv(key, default).split(",") if item.strip()]
+
+    @staticmethod
+    def _get_weights_env(key: str, default: str) -> dict[str, float]:
+        """获取形如 socket:1,http:0.5 的权重环境变量，格式错误的项被忽略"""
+        weights = {}
+        for item in ConfigLoader._get_list_env(key, default):
+            name, _, value = item.partition(":")
+            try:
+                weights[name.strip().lower()] = float(value)
+            except ValueError:
+                continue
+        return weights
+
     @staticmethod
     def _load_basic_config() -> dict:
         """加载基础配置"""
@@ -370,7 +671,20 @@ class ConfigLoader:
             "headless": ConfigLoader._str_to_bool(os.getenv("BROWSER_HEADLESS", "false")),
             "timeout": ConfigLoader._get_int_env("BROWSER_TIMEOUT", 8000),  # 从10000降低到8000ms
             "user_agent": os.getenv("BROWSER_USER_AGENT", default_user_agent),
-            "low_resource_mode": ConfigLoader._str_to_bool(os.getenv("BROWSER_LOW_RESOURCE_MODE", "true"))  # 新增低资源模式
+            "low_resource_mode": ConfigLoader._str_to_bool(os.getenv("BROWSER_LOW_RESOURCE_MODE", "true")),  # 新增低资源模式
+            "block_resource_types": [item.lower() for item in ConfigLoader._get_list_env("BROWSER_BLOCK_RESOURCE_TYPES", ",".join(DEFAULT_BLOCKED_RESOURCE_TYPES))],
+            "block_url_patterns": ConfigLoader._get_list_env("BROWSER_BLOCK_URL_PATTERNS", ",".join(DEFAULT_BLOCKED_URL_PATTERNS)),
+            "cdp_url": os.getenv("BROWSER_CDP_URL", "").strip(),
+            "cdp_timeout": ConfigLoader._get_int_env("BROWSER_CDP_TIMEOUT", 2000),
+            "pool_enabled": ConfigLoader._str_to_bool(os.getenv("BROWSER_POOL_ENABLED", "false")),
+            "pool_idle_timeout": ConfigLoader._get_float_env("BROWSER_POOL_IDLE_TIMEOUT", 300),
+            "pool_prewarm": ConfigLoader._str_to_bool(os.getenv("BROWSER_POOL_PREWARM", "false")),
+            "resource_monitor": ConfigLoader._str_to_bool(os.getenv("BROWSER_RESOURCE_MONITOR", "true")),
+            "max_rss_mb": ConfigLoader._get_float_env("BROWSER_MAX_RSS_MB", 0),
+            "rlimit_cpu": ConfigLoader._get_int_env("BROWSER_RLIMIT_CPU", 0),
+            "attempt_cpu_limit": ConfigLoader._get_float_env("BROWSER_ATTEMPT_CPU_LIMIT", 0),
+            "cgroup_path": os.getenv("BROWSER_CGROUP_PATH", "").strip(),
+            "cgroup_memory_max_mb": ConfigLoader._get_float_env("BROWSER_CGROUP_MEMORY_MAX_MB", 0)
         }
 
     @staticmethod
@@ -379,7 +693,11 @@ class ConfigLoader:
         return {
             "retry_settings": {
                 "max_retries": ConfigLoader._get_int_env("RETRY_MAX_RETRIES", 3),
-                "retry_interval": ConfigLoader._get_int_env("RETRY_INTERVAL", 5)
+                "retry_interval": ConfigLoader._get_int_env("RETRY_INTERVAL", 5),
+                "fast_retry_interval": ConfigLoader._get_float_env("RETRY_FAST_INTERVAL", 1),
+                "max_backoff": ConfigLoader._get_float_env("RETRY_MAX_BACKOFF", 120),
+                "reuse_browser": ConfigLoader._str_to_bool(os.getenv("RETRY_REUSE_BROWSER", "true")),
+                "login_result_fresh_for": ConfigLoader._get_float_env("LOGIN_RESULT_FRESH_FOR", 10)
             },
             "logging": {
                 "level": os.getenv("LOG_LEVEL", "INFO"),
@@ -391,9 +709,36 @@ class ConfigLoader:
                 "start_hour": ConfigLoader._get_int_env("PAUSE_LOGIN_START_HOUR", 0),
                 "end_hour": ConfigLoader._get_int_env("PAUSE_LOGIN_END_HOUR", 6)
             },
+            "login": {
+                "http_fast_path": ConfigLoader._str_to_bool(os.getenv("LOGIN_HTTP_FAST_PATH", "true")),
+                "http_timeout": ConfigLoader._get_float_env("LOGIN_HTTP_TIMEOUT", 5),
+                "http_precheck": ConfigLoader._str_to_bool(os.getenv("LOGIN_HTTP_PRECHECK", "true")),
+                "selector_cache_file": os.getenv("LOGIN_SELECTOR_CACHE_FILE", "").strip() or str(Path.home() / ".campus_network_auth" / "selector_cache.json"),
+                "atomic_submit": ConfigLoader._str_to_bool(os.getenv("LOGIN_ATOMIC_SUBMIT", "true")),
+                "worker_process": ConfigLoader._str_to_bool(os.getenv("LOGIN_WORKER_PROCESS", "true")),
+                "worker_timeout": ConfigLoader._get_float_env("LOGIN_WORKER_TIMEOUT", 300),
+                "completion_timeout": ConfigLoader._get_float_env("LOGIN_WAIT_TIMEOUT", 2)
+            },
+            "probe": {
+                "methods": [method.lower() for method in ConfigLoader._get_list_env("PROBE_METHODS", "socket,http")],
+                "strategy": os.getenv("PROBE_STRATEGY", "parallel").strip().lower(),
+                "weights": ConfigLoader._get_weights_env("PROBE_WEIGHTS", ""),
+                "quorum": ConfigLoader._get_float_env("PROBE_QUORUM", 1),
+                "http_backend": os.getenv("PROBE_HTTP_BACKEND", "native").strip().lower(),
+                "dns_hosts": ConfigLoader._get_list_env("PROBE_DNS_HOSTS", "www.baidu.com"),
+                "timeout_min": ConfigLoader._get_float_env("PROBE_TIMEOUT_MIN", 0.3),
+                "timeout_max": ConfigLoader._get_float_env("PROBE_TIMEOUT_MAX", 3.0),
+                "rtt_state_file": os.getenv("PROBE_RTT_STATE_FILE", "").strip() or str(Path.home() / ".campus_network_auth" / "rtt_state.json"),
+                "result_fresh_for": ConfigLoader._get_float_env("PROBE_RESULT_FRESH_FOR", 5)
+            },
             "monitor": {
                 "interval": ConfigLoader._get_int_env("MONITOR_INTERVAL", 240),
-                "ping_targets": [target.strip() for target in os.getenv("PING_TARGETS", "8.8.8.8,114.114.114.114,baidu.com").split(",") if target.strip()]
+                "ping_targets": [target.strip() for target in os.getenv("PING_TARGETS", "8.8.8.8,114.114.114.114,baidu.com").split(",") if target.strip()],
+                "portal_detection": ConfigLoader._str_to_bool(os.getenv("PORTAL_DETECTION_ENABLED", "true")),
+                "portal_probe_url": os.getenv("PORTAL_PROBE_URL", "").strip() or None,
+                "portal_force_login_after": ConfigLoader._get_int_env("PORTAL_FORCE_LOGIN_AFTER", 3),
+                "link_watch": ConfigLoader._str_to_bool(os.getenv("LINK_WATCH_ENABLED", "true")),
+                "link_watch_debounce": ConfigLoader._get_int_env("LINK_WATCH_DEBOUNCE", 2)
             }
         }
 
@@ -477,17 +822,80 @@ class ConfigValidator:
         return True, ""
 
 
+# 低资源模式下默认拦截的资源类型（渲染登录表单不需要）
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# 低资源模式下默认拦截的URL（统计/广告脚本），支持 * 通配符，不含通配符时按包含匹配
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    "google-analytics.com", "googletagmanager.com", "hm.baidu.com", "cnzz.com", "umeng.com", "*.ico"
+)
+
+
+# 拦截的请求没有响应，大小未知时按资源类型估算节省的字节数（典型门户页面上的资源大小）
+BLOCKED_SIZE_ESTIMATES = {"image": 20 * 1024, "media": 200 * 1024, "font": 40 * 1024,
+                          "stylesheet": 10 * 1024, "script": 30 * 1024}
+DEFAULT_BLOCKED_SIZE_ESTIMATE = 5 * 1024
+
+# 最近加载过的资源大小（URL -> 响应头 + 响应体字节数），用于计算之后拦截同一资源节省的字节数
+_RESOURCE_SIZES: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+_RESOURCE_SIZES_LIMIT = 512
+
+
+def remember_resource_size(url: str, size: int) -> None:
+    """记录一个已加载资源的大小（超过上限时丢弃最早的记录）"""
+    _RESOURCE_SIZES[url] = size
+    _RESOURCE_SIZES.move_to_end(url)
+    while len(_RESOURCE_SIZES) > _RESOURCE_SIZES_LIMIT:
+        _RESOURCE_SIZES.popitem(last=False)
+
+
+def blocked_request_size(resource_type: str, url: str) -> Tuple[int, bool]:
+    """
+    拦截一个请求节省的字节数
+
+    参数:
+        resource_type: 资源类型
+        url: 请求URL
+
+    返回:
+        Tuple[int, bool]: (字节数, 是否为按资源类型的估算值)；该URL之前加载过时使用实际大小
+    """
+    if url in _RESOURCE_SIZES:
+        return _RESOURCE_SIZES[url], False
+    return BLOCKED_SIZE_ESTIMATES.get(resource_type, DEFAULT_BLOCKED_SIZE_ESTIMATE), True
+
+
+def should_block_request(resource_type: str, url: str, block_types, block_patterns) -> bool:
+    """按资源类型和URL模式判断是否拦截请求（模式含*时按通配符匹配，否则按子串匹配）"""
+    if resource_type in block_types:
+        return True
+    url = url.lower()
+    for pattern in block_patterns:
+        pattern = pattern.lower()
+        if fnmatch.fnmatch(url, pattern) if "*" in pattern else pattern in url:
+            return True
+    return False
+
+
 class BrowserContextManager:
     """浏览器上下文管理器 - 使用异步上下文管理器确保资源正确释放"""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, timer: Optional[PhaseTimer] = None, pool=None):
         """
         初始化浏览器上下文管理器
         
         参数:
             config: 配置字典
+            timer: 分阶段计时器（记录启动、导航和关闭的耗时）
+            pool: 常驻浏览器池（browser_pool.BrowserPool），提供时从池中租用上下文而不是启动新浏览器
         """
         self.config = config
+        self.timer = timer or PhaseTimer()
+        self.pool = pool
+        self._leased = False
+        self._attached = False
+        self.launches = 0
+        self.attaches = 0
         self.browser_settings = config.get("browser_settings", {})
         self.logger = LoggerSetup.setup_logger(f"{__name__}_browser", config.get('logging', {}))
         
@@ -496,6 +904,25 @@ class BrowserContextManager:
         self.browser = None
         self.context = None
         self.page = None
+        
+        # 请求拦截策略与本次导航的统计
+        self.block_resource_types = set(self.browser_settings.get("block_resource_types", DEFAULT_BLOCKED_RESOURCE_TYPES))
+        self.block_url_patterns = list(self.browser_settings.get("block_url_patterns", DEFAULT_BLOCKED_URL_PATTERNS))
+        self.navigation_stats = self._new_navigation_stats()
+        
+        # 浏览器进程树的资源统计与内存上限
+        self.resource_monitor: Optional[ProcessTreeMonitor] = None
+        if self.browser_settings.get("resource_monitor", True) and proc_available():
+            self.resource_monitor = ProcessTreeMonitor(
+                rss_limit=int(self.browser_settings.get("max_rss_mb", 0) * MB),
+                cpu_limit=self.browser_settings.get("attempt_cpu_limit", 0),
+                on_limit=self._on_resource_limit,
+                # RLIMIT_CPU 按进程累计，常驻浏览器池的浏览器迟早会被SIGXCPU结束，只用于自己启动的浏览器
+                rlimit_cpu=0 if pool is not None else self.browser_settings.get("rlimit_cpu", 0),
+                cgroup_path=self.browser_settings.get("cgroup_path") or None,
+                cgroup_memory_max=int(self.browser_settings.get("cgroup_memory_max_mb", 0) * MB),
+                logger=self.logger
+            )
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -511,32 +938,64 @@ class BrowserContextManager:
         return False  # 不抑制异常
     
     async def _start_browser(self) -> None:
-        """启动浏览器（内部方法）"""
+        """启动浏览器并打开新的上下文和页面（浏览器已在运行时只新建上下文）"""
         try:
-            from playwright.async_api import async_playwright
-            
-            self.playwright = await async_playwright().start()
             headless = self.browser_settings.get("headless", False)
+            if self.pool is not None:
+                # 从常驻浏览器池租用上下文（浏览器未运行时由池负责启动）
+                self.context, self.page, launched = await self.pool.acquire(self.browser_settings, self.timer)
+                self._leased = True
+                attached = self.pool.attached
+                if self.resource_monitor:
+                    self.resource_monitor.set_roots(self.pool.process_roots)
+                page_setup_start = time.perf_counter()
+            else:
+                launched = self.browser is None
+                if launched:
+                    from playwright.async_api import async_playwright
+                    
+                    children_before = child_pids() if self.resource_monitor else set()
+                    with self.timer.span("playwright_start"):
+                        self.playwright = await async_playwright().start()
+                    
+                    self.browser, self._attached = await self.open_browser(
+                        self.playwright, self.browser_settings, self.timer, self.logger
+                    )
+                    if self.resource_monitor:
+                        # 只统计本次启动的驱动及其浏览器，不包括本进程的其他子进程
+                        self.resource_monitor.set_roots(spawned_children(children_before))
+                attached = self._attached
+                
+                # 创建浏览器上下文 - 优化视口大小减少内存占用
+                page_setup_start = time.perf_counter()
+                self.context = await self.browser.new_context(**self.context_options(self.browser_settings))
+                self.page = await self.context.new_page()
+            # 附加到外部浏览器不算启动，分开计数
+            if launched and attached:
+                self.attaches += 1
+            elif launched:
+                self.launches += 1
             
-            # 统一的浏览器启动参数
-            browser_args = self._get_browser_args()
-            
-            self.browser = await self.playwright.chromium.launch(
-                headless=headless,
-                args=browser_args
-            )
-            
-            # 创建浏览器上下文 - 优化视口大小减少内存占用
-            self.context = await self.browser.new_context(
-                viewport={'width': 1024, 'height': 768},  # 从1920x1080缩小到1024x768
-                user_agent=self.browser_settings.get("user_agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
-                extra_http_headers=self._get_default_headers()
-            )
+            # 低资源模式：拦截渲染登录表单不需要的请求
+            if self.browser_settings.get("low_resource_mode", True):
+                await self.context.route("**/*", self._route_request)
             
-            # 创建页面
-            self.page = await self.context.new_page()
+            self.page.on("requestfinished", self._on_request_finished)
+            self.timer.record("page_setup", time.perf_counter() - page_setup_start)
+            if self.resource_monitor:
+                # 新的统计窗口从本次尝试开始（立即采样一次作为CPU时间基准）
+                self.resource_monitor.reset()
+                self.resource_monitor.sample()
+                self.resource_monitor.start()
 
-            self.logger.info(f"浏览器已启动，无头模式: {headless}")
+            if self._leased and not launched:
+                self.logger.info("浏览器上下文已就绪（常驻浏览器池）")
+            elif launched and attached:
+                self.logger.info(f"已附加到现有浏览器 {self.browser_settings.get('cdp_url')}，已新建独立上下文")
+            elif launched:
+                self.logger.info(f"浏览器已启动，无头模式: {headless}")
+            else:
+                self.logger.info("复用已启动的浏览器，已新建上下文")
             
         except Exception as e:
             self.logger.error(f"启动浏览器失败: {e}")
@@ -544,7 +1003,44 @@ class BrowserContextManager:
             await self._cleanup_browser()
             raise
     
-    def _get_browser_args(self) -> list[str]:
+    @staticmethod
+    async def open_browser(playwright, browser_settings: dict, timer: PhaseTimer, logger: logging.Logger) -> tuple:
+        """
+        获取浏览器：配置了 cdp_url 时附加到已运行的Chromium（DevTools端点），
+        未配置或端点不可用时启动新浏览器
+        
+        参数:
+            playwright: 已启动的playwright实例
+            browser_settings: 浏览器配置
+            timer: 分阶段计时器
+            logger: 日志记录器
+            
+        返回:
+            tuple: (浏览器, 是否为附加的外部浏览器)；外部浏览器只能断开连接，不能关闭
+        """
+        cdp_url = browser_settings.get("cdp_url")
+        if cdp_url:
+            try:
+                with timer.span("cdp_connect"):
+                    browser = await playwright.chromium.connect_over_cdp(
+                        cdp_url, timeout=browser_settings.get("cdp_timeout", 2000)
+                    )
+                LOGIN_COUNTERS.increment("browser_attach")
+                return browser, True
+            except Exception as e:
+                reason = str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__
+                logger.info(f"无法附加到现有浏览器 {cdp_url}（{reason}），改为启动新浏览器")
+        
+        with timer.span("chromium_launch"):
+            browser = await playwright.chromium.launch(
+                headless=browser_settings.get("headless", False),
+                args=BrowserContextManager._get_browser_args()
+            )
+        LOGIN_COUNTERS.increment("browser_launch")
+        return browser, False
+    
+    @staticmethod
+    def _get_browser_args() -> list[str]:
         """获取优化的浏览器启动参数，减少内存和资源占用"""
         return [
             '--no-sandbox',
@@ -552,42 +1048,171 @@ class BrowserContextManager:
             '--disable-dev-shm-usage',  # 解决Docker环境下的内存问题
             '--disable-gpu',  # 禁用GPU加速，减少资源占用
             '--disable-extensions',  # 禁用扩展
-            '--disable-plugins',  # 禁用插件
-            '--disable-images',  # 禁用图片加载，提高性能
+            '--disable-plugins',  # 禁用插件（图片等资源由请求拦截策略处理）
             '--memory-pressure-off',  # 关闭内存压力检测
-            '--max_old_space_size=256'  # 限制内存使用
+            '--js-flags=--max-old-space-size=256'  # 限制V8堆内存（需通过--js-flags传给V8才生效）
         ]
     
-    def _get_default_headers(self) -> dict[str, str]:
+    @staticmethod
+    def _new_navigation_stats() -> Dict[str, Any]:
+        """创建空的导航统计"""
+        return {"requests": 0, "bytes": 0, "blocked": 0, "blocked_by_type": {}, "bytes_saved": 0,
+                "estimated_blocked": 0, "elapsed": None}
+    
+    def _should_block(self, resource_type: str, url: str) -> bool:
+        """按资源类型和URL模式判断是否拦截请求"""
+        return should_block_request(resource_type, url, self.block_resource_types, self.block_url_patterns)
+    
+    async def _route_request(self, route) -> None:
+        """请求拦截回调：拦截不需要的资源，其余请求照常发送"""
+        request = route.request
+        if self._should_block(request.resource_type, request.url):
+            self.navigation_stats["blocked"] += 1
+            by_type = self.navigation_stats["blocked_by_type"]
+            by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            saved, estimated = blocked_request_size(request.resource_type, request.url)
+            self.navigation_stats["bytes_saved"] += saved
+            self.navigation_stats["estimated_blocked"] += estimated
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def _on_request_finished(self, request) -> None:
+        """统计实际传输的请求数和字节数（响应头 + 响应体）"""
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        size = max(0, sizes.get("responseHeadersSize", 0)) + max(0, sizes.get("responseBodySize", 0))
+        self.navigation_stats["requests"] += 1
+        self.navigation_stats["bytes"] += size
+        remember_resource_size(request.url, size)
+    
+    def _log_navigation_stats(self, url: str) -> None:
+        """输出本次导航的传输量、拦截数、节省的字节数和耗时"""
+        stats = self.navigation_stats
+        blocked_detail = ", ".join(f"{kind} {count}" for kind, count in sorted(stats["blocked_by_type"].items()))
+        saved = ""
+        if stats["blocked"]:
+            estimated = stats["estimated_blocked"]
+            saved = (f", 节省{stats['bytes_saved'] / 1024:.1f}KB"
+                     f"{f'（其中{estimated}个按资源类型估算）' if estimated else ''}")
+        self.logger.info(
+            f"📦 导航统计 {url}: 加载{stats['requests']}个请求 {stats['bytes'] / 1024:.1f}KB, "
+            f"拦截{stats['blocked']}个请求{f'（{blocked_detail}）' if blocked_detail else ''}{saved}, "
+            f"耗时{stats['elapsed'] * 1000:.0f}ms"
+        )
+    
+    @staticmethod
+    def _get_default_headers() -> dict[str, str]:
         """获取简单的HTTP头"""
         return {
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
         }
     
+    @staticmethod
+    def context_options(browser_settings: dict) -> dict:
+        """创建浏览器上下文的参数 - 缩小视口减少内存占用"""
+        return {
+            "viewport": {'width': 1024, 'height': 768},  # 从1920x1080缩小到1024x768
+            "user_agent": browser_settings.get("user_agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
+            "extra_http_headers": BrowserContextManager._get_default_headers()
+        }
+    
+    async def begin_attempt(self) -> None:
+        """
+        开始新的一次尝试：复用已启动的浏览器，只新建上下文和页面；
+        浏览器已崩溃或断开时先清理再重新启动（authenticate 的多次重试共用一个浏览器）
+        """
+        if self.context is not None or self.page is not None:
+            await self.end_attempt()
+        if self.browser is not None and not self.browser.is_connected():
+            self.logger.warning("⚠️ 浏览器已崩溃或断开，重新启动")
+            await self._close_resources()
+        await self._start_browser()
+    
+    async def end_attempt(self) -> None:
+        """结束本次尝试：关闭上下文和页面，浏览器保持运行"""
+        self._log_resource_usage()
+        with self.timer.span("context_close"):
+            cleanup_errors = await self._close_context()
+        if cleanup_errors:
+            self.logger.warning(f"关闭浏览器上下文时出现错误: {'; '.join(cleanup_errors)}")
+    
+    async def close(self) -> None:
+        """关闭全部浏览器资源"""
+        await self._cleanup_browser()
+    
     async def _cleanup_browser(self) -> None:
         """清理浏览器资源（内部方法）"""
+        self._log_resource_usage()
+        with self.timer.span("browser_close"):
+            await self._close_resources()
+        if self.resource_monitor:
+            await self.resource_monitor.stop()
+    
+    def _log_resource_usage(self) -> None:
+        """输出本次尝试中浏览器进程树的峰值RSS、CPU时间和进程数，并开始新的统计窗口"""
+        monitor = self.resource_monitor
+        if not monitor or monitor.samples == 0:
+            return
+        monitor.sample()
+        usage = monitor.summary()
+        if usage["peak_processes"]:
+            self.logger.info(
+                f"🧠 浏览器资源: 峰值RSS {usage['peak_rss'] / MB:.0f}MB, CPU {usage['cpu']:.2f}s, "
+                f"峰值进程数 {usage['peak_processes']}"
+            )
+        monitor.reset()
+    
+    async def _on_resource_limit(self, reason: str, browser_pids: list) -> None:
+        """浏览器内存或本次尝试的CPU时间超过上限：先尝试正常关闭自己启动的浏览器，失败或浏览器属于浏览器池时直接杀死"""
+        self.logger.warning(f"⚠️ 浏览器{reason}，回收浏览器")
+        LOGIN_COUNTERS.increment("browser_recycle")
+        if self.browser is not None and not self._attached:
+            try:
+                await asyncio.wait_for(self.browser.close(), timeout=5)
+                return
+            except Exception as e:
+                self.logger.debug(f"关闭浏览器失败，改为结束进程: {e}")
+        kill_processes(browser_pids)
+    
+    async def _close_context(self) -> list[str]:
+        """关闭页面和上下文（租用的上下文同时归还浏览器池），返回清理错误"""
         cleanup_errors = []
+        page, self.page = self.page, None
+        context, self.context = self.context, None
         
-        # 按顺序清理资源
         try:
-            if self.page:
-                await self.page.close()
-                self.page = None
+            if page:
+                await page.close()
         except Exception as e:
             cleanup_errors.append(f"关闭页面失败: {e}")
         
         try:
-            if self.context:
-                await self.context.close()
-                self.context = None
+            if context:
+                await context.close()
         except Exception as e:
             cleanup_errors.append(f"关闭上下文失败: {e}")
         
+        if self._leased:
+            # 只关闭了租用的上下文，浏览器留在池中
+            self._leased = False
+            self.pool.release()
+        return cleanup_errors
+    
+    async def _close_resources(self) -> None:
+        """按顺序关闭页面、上下文、浏览器和playwright"""
+        # 按顺序清理资源
+        cleanup_errors = await self._close_context()
+        
         try:
-            if self.browser:
+            if self.browser and not self._attached:
                 await self.browser.close()
-                self.browser = None
+            # 附加的外部浏览器不关闭，停止playwright时断开连接
+            self.browser = None
+            self._attached = False
         except Exception as e:
             cleanup_errors.append(f"关闭浏览器失败: {e}")
         
@@ -609,6 +1234,8 @@ class BrowserContextManager:
         if not self.page:
             raise RuntimeError("浏览器未启动，请在上下文管理器中使用")
         
+        self.navigation_stats = self._new_navigation_stats()
+        start = time.perf_counter()
         try:
             timeout = timeout or self.browser_settings.get("timeout", 10000)
             await self.page.goto(url, timeout=timeout)
@@ -617,6 +1244,10 @@ class BrowserContextManager:
         except Exception as e:
             self.logger.error(f"导航到 {url} 失败: {e}")
             return False
+        finally:
+            self.navigation_stats["elapsed"] = time.perf_counter() - start
+            self.timer.record("navigate", self.navigation_stats["elapsed"])
+            self._log_navigation_stats(url)
     
     async def take_screenshot(self, path: str = None) -> str:
         """截图功能"""
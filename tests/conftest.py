@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""测试共用的夹具：指向模拟门户的配置"""
+
+import pytest
+
+from utils import ConfigLoader
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """生成指向模拟门户的配置（账号 test/test@cmcc，不写日志文件）"""
+
+    def _make(portal, **login_settings):
+        config = ConfigLoader.load_config_from_env()
+        config.update({"username": "test", "password": "test", "auth_url": portal.url, "isp": "@cmcc"})
+        config["browser_settings"]["headless"] = True
+        config["login"].update({"http_precheck": False,
+                                "selector_cache_file": str(tmp_path / "selector_cache.json"),
+                                **login_settings})
+        config["logging"] = {**config["logging"], "level": "WARNING", "file": None}
+        return config
+
+    return _make
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""常驻浏览器池：租用时启动或复用浏览器、配置变化和崩溃后重启、空闲回收、预热与关闭（使用假浏览器）"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import browser_pool
+from browser_pool import BrowserPool, current_pool, get_browser_pool
+from utils import BrowserContextManager
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+        self.visited = []
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url, **kwargs):
+        self.visited.append(url)
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+
+    async def new_page(self):
+        return self.page
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def unroute(self, pattern, handler):
+        pass
+
+    async def close(self):
+        self.closed = True
+        self.page.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, settings):
+        self.settings = settings
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+        self.handlers = {}
+
+    def is_connected(self):
+        return self.connected
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def new_context(self, **options):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+class Launcher:
+    """替换 async_playwright 和 BrowserContextManager.open_browser，记录启动的浏览器"""
+
+    def __init__(self):
+        self.browsers = []
+        self.playwrights = []
+
+    def async_playwright(self):
+        async def start():
+            playwright = FakePlaywright()
+            self.playwrights.append(playwright)
+            return playwright
+        return SimpleNamespace(start=start)
+
+    async def open_browser(self, playwright, browser_settings, timer, logger):
+        browser = FakeBrowser(browser_settings)
+        self.browsers.append(browser)
+        return browser, False
+
+
+@pytest.fixture
+def launcher(monkeypatch):
+    fake = Launcher()
+    monkeypatch.setitem(sys.modules, "playwright.async_api", SimpleNamespace(async_playwright=fake.async_playwright))
+    monkeypatch.setattr(BrowserContextManager, "open_browser", staticmethod(fake.open_browser))
+    return fake
+
+
+@pytest.fixture
+def make_pool(make_config):
+    pools = []
+
+    def _make(**settings):
+        config = make_config(SimpleNamespace(url="http://portal.test/"))
+        config["browser_settings"].update({"pool_enabled": True, "pool_prewarm": False, **settings})
+        pool = BrowserPool(config)
+        pools.append(pool)
+        return pool, config["browser_settings"]
+
+    yield _make
+    for pool in pools:
+        pool.shutdown()
+
+
+def lease(pool, settings):
+    """租用后立即关闭上下文并归还，返回 (上下文, 页面, 是否启动了浏览器)"""
+
+    async def _lease():
+        context, page, launched = await pool.acquire(settings)
+        await context.close()
+        pool.release()
+        return context, page, launched
+
+    return pool.run(_lease(), timeout=5)
+
+
+def test_first_acquire_launches_then_reuses(launcher, make_pool):
+    pool, settings = make_pool()
+    first, _, launched = lease(pool, settings)
+    second, _, relaunched = lease(pool, settings)
+    assert launched and not relaunched
+    assert len(launcher.browsers) == 1
+    assert first is not second and launcher.browsers[0].contexts == [first, second]
+    assert pool._leases == 0
+
+
+def test_settings_change_relaunches_only_when_idle(launcher, make_pool):
+    pool, settings = make_pool(headless=True)
+    lease(pool, settings)
+    changed = {**settings, "headless": False}
+
+    async def held():
+        context, _, _ = await pool.acquire(settings)
+        try:
+            return (await pool.acquire(changed))[2]
+        finally:
+            pool.release()
+            pool.release()
+            await context.close()
+
+    assert pool.run(held(), timeout=5) is False  # 仍有租用，不能重启
+    assert len(launcher.browsers) == 1
+
+    _, _, launched = lease(pool, changed)
+    assert launched and len(launcher.browsers) == 2
+    assert launcher.browsers[0].closed and launcher.playwrights[0].stopped
+    assert launcher.browsers[1].settings["headless"] is False
+
+
+def test_disconnected_browser_is_relaunched(launcher, make_pool):
+    pool, settings = make_pool()
+    lease(pool, settings)
+    launcher.browsers[0].connected = False
+    _, _, launched = lease(pool, settings)
+    assert launched and len(launcher.browsers) == 2
+    assert launcher.playwrights[0].stopped
+
+
+def test_idle_browser_is_evicted(launcher, make_pool):
+    pool, settings = make_pool(pool_idle_timeout=0.5)
+    lease(pool, settings)
+    deadline = time.monotonic() + 5
+    while pool.browser is not None and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert pool.browser is None and pool.playwright is None
+    assert launcher.browsers[0].closed and launcher.playwrights[0].stopped
+
+    _, _, launched = lease(pool, settings)
+    assert launched and len(launcher.browsers) == 2
+
+
+def test_leased_browser_is_not_evicted(launcher, make_pool):
+    pool, settings = make_pool(pool_idle_timeout=0.5)
+    context, _, _ = pool.run(pool.acquire(settings), timeout=5)
+    time.sleep(1.5)
+    assert pool.browser is launcher.browsers[0] and not launcher.browsers[0].closed
+    pool.run(context.close())
+    pool._loop.call_soon_threadsafe(pool.release)
+
+
+def test_prewarmed_context_is_handed_to_next_lease(launcher, make_pool):
+    pool, settings = make_pool(pool_prewarm=True)
+    lease(pool, settings)
+    deadline = time.monotonic() + 5
+    while pool._warm is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    warm_context, warm_page = pool._warm
+    assert warm_page.visited == ["http://portal.test/"]
+
+    context, page, launched = lease(pool, settings)
+    assert (context, page, launched) == (warm_context, warm_page, False)
+
+
+def test_shutdown_closes_browser_and_stops_loop(launcher, make_pool):
+    pool, settings = make_pool()
+    lease(pool, settings)
+    thread = pool._thread
+    pool.shutdown()
+    assert not thread.is_alive() and pool._loop is None
+    assert launcher.browsers[0].closed and launcher.playwrights[0].stopped
+    pool.shutdown()  # 重复关闭无副作用
+
+
+def test_current_pool_only_inside_pool_loop(monkeypatch, make_pool):
+    pool, _ = make_pool()
+    monkeypatch.setattr(browser_pool, "_POOL", pool)
+
+    async def inside():
+        return current_pool()
+
+    assert pool.run(inside(), timeout=5) is pool
+    assert asyncio.run(inside()) is None
+
+
+def test_pool_disabled_by_default(make_config):
+    config = make_config(SimpleNamespace(url="http://portal.test/"))
+    config["browser_settings"]["pool_enabled"] = False
+    assert get_browser_pool(config) is None
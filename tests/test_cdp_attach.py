@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""附加到已运行的Chromium：附加成功时只断开不关闭，端点不可用时回退为启动新浏览器"""
+
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import time
+import urllib.request
+
+import pytest
+
+from mock_portal import MockPortal
+from utils import LOGIN_COUNTERS, BrowserContextManager, PhaseTimer
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _endpoint_alive(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(f"{url}/json/version", timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+@pytest.fixture(scope="module")
+def chromium_path():
+    pytest.importorskip("playwright")
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        path = playwright.chromium.executable_path
+    if not os.path.exists(path):
+        pytest.skip("未安装Playwright的Chromium（playwright install chromium）")
+    return path
+
+
+@pytest.fixture
+def running_chromium(chromium_path, tmp_path):
+    """以 --remote-debugging-port 启动的外部Chromium，返回其DevTools端点"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [chromium_path, "--headless=new", "--no-sandbox", f"--remote-debugging-port={port}",
+         f"--user-data-dir={tmp_path / 'profile'}", "about:blank"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while not _endpoint_alive(url):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            pytest.skip("外部Chromium未能启动DevTools端点")
+        time.sleep(0.2)
+    yield process, url
+    process.kill()
+    process.wait()
+
+
+def _run_session(make_config, portal, cdp_url):
+    config = make_config(portal)
+    config["browser_settings"].update({"cdp_url": cdp_url, "cdp_timeout": 2000, "resource_monitor": False})
+
+    async def run():
+        async with BrowserContextManager(config) as manager:
+            await manager.page.goto(portal.url)
+            title = await manager.page.title()
+        return manager, title
+
+    return asyncio.run(run())
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def connect_over_cdp(self, url, timeout):
+        raise ConnectionRefusedError(f"connect ECONNREFUSED {url}")
+
+    async def launch(self, **kwargs):
+        self.launched.append(kwargs)
+        return "launched-browser"
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+
+def test_open_browser_falls_back_to_launch_without_chromium():
+    playwright = FakePlaywright()
+    attaches = LOGIN_COUNTERS.get("browser_attach")
+    launches = LOGIN_COUNTERS.get("browser_launch")
+    timer = PhaseTimer()
+
+    browser, attached = asyncio.run(BrowserContextManager.open_browser(
+        playwright, {"cdp_url": f"http://127.0.0.1:{_free_port()}", "headless": True}, timer,
+        logging.getLogger(__name__)))
+
+    assert (browser, attached) == ("launched-browser", False)
+    assert playwright.chromium.launched[0]["headless"] is True
+    assert LOGIN_COUNTERS.get("browser_attach") == attaches
+    assert LOGIN_COUNTERS.get("browser_launch") == launches + 1
+
+
+def test_attach_counts_separately_and_leaves_browser_running(running_chromium, make_config):
+    process, url = running_chromium
+    with MockPortal() as portal:
+        manager, title = _run_session(make_config, portal, url)
+
+    assert title
+    assert (manager.attaches, manager.launches) == (1, 0)
+    assert process.poll() is None
+    assert _endpoint_alive(url)
+
+
+def test_unreachable_endpoint_launches_new_browser(chromium_path, make_config):
+    with MockPortal() as portal:
+        manager, title = _run_session(make_config, portal, f"http://127.0.0.1:{_free_port()}")
+
+    assert title
+    assert (manager.attaches, manager.launches) == (0, 1)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""失败信息分类：决定重试策略（停止 / 快速重试 / 退避 / 固定间隔）"""
+
+import pytest
+
+from login_state import FAILURE_KEYWORDS, LOGIN_FAILED, classify_failure, match_login_state
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("登录失败: 检测到失败标识 '用户名或密码错误'", "wrong_password"),
+    ("登录失败: 检测到失败标识 '密码错误'", "wrong_password"),
+    ("Invalid username or password", "wrong_password"),
+    ("登录失败: 检测到失败标识 '请求过于频繁'", "rate_limited"),
+    ("登录失败: 检测到失败标识 '频率限制'", "rate_limited"),
+    ("HTTP 429 Too Many Requests", "rate_limited"),
+    ("认证过程中发生错误: Timeout 8000ms exceeded.", "network_error"),
+    ("提交认证表单失败: 读取超时", "network_error"),
+    ("提交认证表单失败: timed out", "network_error"),
+    ("无法访问认证页面: [Errno 104] Connection reset by peer", "network_error"),
+    ("无法访问认证页面: [Errno 113] No route to host", "network_error"),
+    ("登录失败: 检测到失败标识 '账户被锁定'", "blacklisted"),
+    ("403 Forbidden", "blacklisted"),
+    ("登录失败: 未检测到明确的成功标识", "unknown"),
+    ("", "unknown"),
+])
+def test_classify_failure(message, expected):
+    assert classify_failure(message) == expected
+
+
+@pytest.mark.parametrize("page_text", ["请求过于频繁，请稍后再试", "操作频率限制", "429 Too Many Requests"])
+def test_rate_limit_page_is_a_failure(page_text):
+    """频率限制页面要判定为失败，失败信息才能进入分类"""
+    verdict = match_login_state(body_text=page_text)
+    assert verdict["state"] == LOGIN_FAILED
+    assert classify_failure(verdict["reason"]) == "rate_limited"
+
+
+def test_failure_keywords_cover_rate_limit():
+    assert "请求过于频繁" in FAILURE_KEYWORDS
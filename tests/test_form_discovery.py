@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""登录表单发现：Playwright 选择器到页面脚本参数的转换，以及按候选顺序选出可用选择器"""
+
+import pytest
+
+from form_discovery import (FORM_ROLES, SUBMIT_SELECTORS, choose_selector, discovery_arguments,
+                            plan_from_discovery, to_script_selector)
+
+USABLE = {"found": 1, "visible": True, "enabled": True, "type": "text"}
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ('input[name="DDDDD"][type="text"]:visible', ('input[name="DDDDD"][type="text"]', None, True)),
+    ('#isp', ('#isp', None, False)),
+    ('button:has-text("登录"):visible', ('button', "登录", True)),
+    ('button:has-text("Sign in")', ('button', "Sign in", False)),
+    ('input[name="DDDDD"]:not([type="hidden"]):visible', ('input[name="DDDDD"]:not([type="hidden"])', None, True)),
+])
+def test_to_script_selector(selector, expected):
+    assert to_script_selector(selector) == expected
+
+
+def test_every_candidate_becomes_plain_css():
+    for selectors in FORM_ROLES.values():
+        for selector in selectors:
+            css, _, _ = to_script_selector(selector)
+            assert ":visible" not in css and ":has-text" not in css
+
+
+def test_discovery_arguments_keep_role_and_candidate_order():
+    arguments = discovery_arguments({"submit": SUBMIT_SELECTORS[-2:], "isp": []})
+    assert arguments == {"submit": [['button[type="submit"]', None, True], ["button", "登录", True]], "isp": []}
+
+
+@pytest.mark.parametrize("state", [
+    {"found": 0},
+    {"found": 0, "error": "SyntaxError"},
+    {"found": 1, "visible": False, "enabled": True, "type": "text"},
+    {"found": 1, "visible": True, "enabled": False, "type": "text"},
+    {"found": 1, "visible": True, "enabled": True, "type": "hidden"},
+])
+def test_choose_selector_skips_unusable_candidates(state):
+    assert choose_selector(["a", "b"], [state, USABLE]) == "b"
+    assert choose_selector(["a"], [state]) is None
+
+
+def test_choose_selector_prefers_earlier_candidate():
+    assert choose_selector(["a", "b", "c"], [{"found": 0}, USABLE, USABLE]) == "b"
+    assert choose_selector([], []) is None
+
+
+def test_plan_from_discovery():
+    roles = {"username": ["u1", "u2"], "password": ["p1"], "isp": ["i1"]}
+    discovery = {"signature": "", "roles": {"username": [{"found": 0}, USABLE],
+                                            "password": [dict(USABLE, type="password")],
+                                            "isp": [{"found": 1, "visible": False, "enabled": True, "type": ""}]}}
+    assert plan_from_discovery(roles, discovery) == {"username": "u2", "password": "p1", "isp": None}
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""HTTP快速登录：脚本改写字段的表单和账号密码错误都交给浏览器登录"""
+
+import asyncio
+
+import pytest
+
+from http_login import LoginFormParseError, find_login_form, http_login, parse_portal_page, script_submission_problem
+import mock_portal
+from mock_portal import _LOGIN_CONTENT, _PAGE_TEMPLATE, MockPortal
+
+FORM = """<form name="f1" method="post" action="/" {onsubmit}>
+<input type="text" name="DDDDD" value="">
+<input type="password" name="upass" value="">
+<input type="hidden" name="R1" value="0">
+<input type="{button_type}" name="0MKKey" value="登录" {onclick}>
+</form>"""
+
+
+def _problem(content: str):
+    page = parse_portal_page(_PAGE_TEMPLATE.format(title="上网登录页", content=content))
+    return script_submission_problem(page, find_login_form(page))
+
+
+def _form(script: str = "", onclick: str = "", onsubmit: str = "", button_type: str = "button") -> str:
+    return script + FORM.format(onclick=onclick, onsubmit=onsubmit, button_type=button_type)
+
+
+def test_isp_suffix_rewrite_can_be_submitted_directly():
+    """Dr.COM把运营商后缀拼到账号后面，HTTP登录会同样处理"""
+    assert _problem(_LOGIN_CONTENT) is None
+
+
+def test_plain_submit_form_with_external_scripts_is_accepted():
+    content = '<script src="/js/jquery.js"></script>' + _form(button_type="submit")
+    assert _problem(content) is None
+
+
+@pytest.mark.parametrize("content", [
+    _form('<script>function ee() { document.f1.upass.value = hex_md5(document.f1.upass.value); '
+          'document.f1.submit(); }</script>', onclick='onclick="ee()"'),
+    _form('<script>function go() { document.getElementById("upass").value = encodeURIComponent(x); }</script>',
+          onsubmit='onsubmit="return go()"'),
+    _form("<script>function calg() { document.getElementsByName('R1')[0].value = calc(); }</script>",
+          onclick='onclick="calg(); f1.submit()"'),
+    _form('<script>var pwd = btoa(document.f1.upass.value);</script>', onclick='onclick="send()"'),
+    _form('<script src="/a41.js"></script>', onclick='onclick="ee(1)"'),
+])
+def test_script_rewritten_forms_fall_back_to_browser(content):
+    assert _problem(content)
+
+
+def test_script_rewritten_form_raises_before_submitting(monkeypatch):
+    hashed = _LOGIN_CONTENT.replace("f.submit();", "f.upass.value = hex_md5(f.upass.value);\n    f.submit();")
+    monkeypatch.setattr(mock_portal, "_LOGIN_CONTENT", hashed)
+    with MockPortal() as portal:
+        with pytest.raises(LoginFormParseError):
+            asyncio.run(http_login(portal.url, "test", "test", "@cmcc"))
+        assert portal.submit_count == 0
+
+
+def test_wrong_password_is_not_final_on_the_fast_path():
+    """HTTP登录得到账号密码错误时不直接返回（会停止重试），交给浏览器登录确认"""
+    with MockPortal(failure_mode="wrong_password") as portal:
+        with pytest.raises(LoginFormParseError):
+            asyncio.run(http_login(portal.url, "test", "test", "@cmcc"))
+        assert portal.submit_count == 1
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""原生HTTP探测：按 Content-Length / chunked / 连接关闭读取响应体，状态码>=400视为失败"""
+
+import asyncio
+import socket
+
+import pytest
+
+from probe_engine import http_request, probe_http
+
+
+def serve(raw_response, stall=False):
+    """启动一个只回复固定原始响应的本地服务器，运行协程并返回其结果"""
+
+    def run(make_coro):
+        async def main():
+            requests = []
+
+            async def handle(reader, writer):
+                requests.append(await reader.readuntil(b"\r\n\r\n"))
+                if stall:
+                    await asyncio.sleep(5)
+                writer.write(raw_response)
+                await writer.drain()
+                writer.close()
+
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                result = await make_coro(f"http://127.0.0.1:{port}/generate_204?x=1")
+            return result, requests
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_content_length_body():
+    run = serve(b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\nX-Test: a\r\n\r\nhello-extra")
+    response, requests = run(lambda url: http_request(url))
+    assert response["status"] == 200 and response["body"] == b"hello"
+    assert response["headers"]["x-test"] == "a"
+    assert response["ttfb"] is not None and not response["error"]
+    assert requests[0].startswith(b"GET /generate_204?x=1 HTTP/1.1\r\n")
+
+
+def test_chunked_body():
+    run = serve(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n2;ext=1\r\nde\r\n0\r\n\r\n")
+    response, _ = run(lambda url: http_request(url))
+    assert response["body"] == b"abcde"
+
+
+def test_close_delimited_body_is_capped():
+    run = serve(b"HTTP/1.0 200 OK\r\n\r\n" + b"x" * 100)
+    response, _ = run(lambda url: http_request(url, max_body=10))
+    assert response["body"] == b"x" * 10
+
+
+def test_head_request_has_no_body():
+    run = serve(b"HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\n")
+    response, requests = run(lambda url: http_request(url, method="HEAD"))
+    assert response["status"] == 200 and response["body"] == b""
+    assert requests[0].startswith(b"HEAD ")
+
+
+@pytest.mark.parametrize("raw, success, error", [
+    (b"HTTP/1.1 204 No Content\r\n\r\n", True, ""),
+    (b"HTTP/1.1 302 Found\r\nLocation: http://portal/\r\nContent-Length: 0\r\n\r\n", True, ""),
+    (b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n", False, "HTTP 404"),
+    (b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n", False, "HTTP 503"),
+])
+def test_probe_http_status_semantics(raw, success, error):
+    result, _ = serve(raw)(lambda url: probe_http(url))
+    assert result["method"] == "http" and result["backend"] == "native"
+    assert result["success"] is success and result["error"] == error
+
+
+def test_invalid_status_line_fails():
+    result, _ = serve(b"SSH-2.0-OpenSSH\r\n\r\n")(lambda url: probe_http(url))
+    assert not result["success"] and result["status"] is None
+    assert "无效的HTTP响应" in result["error"]
+
+
+def test_read_timeout_is_reported():
+    result, _ = serve(b"HTTP/1.1 200 OK\r\n\r\n", stall=True)(lambda url: probe_http(url, timeout=0.2))
+    assert not result["success"] and result["timed_out"]
+    assert result["error"] == "连接超时"  # 尚未收到首字节
+
+
+def test_closed_port_fails_without_status():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    result = asyncio.run(probe_http(f"http://127.0.0.1:{port}/", timeout=1))
+    assert not result["success"] and result["status"] is None
+    assert result["error"] and not result["timed_out"]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""ICMP探测：报文构造与解析，按序列号、来源地址（原始套接字另按identifier）匹配回复"""
+
+import asyncio
+import socket
+
+import pytest
+
+import icmp_probe
+from icmp_probe import (ICMP_ECHO_REPLY, ICMP_ECHO_REQUEST, ICMP_HEADER, _build_icmp_probes, _checksum,
+                        build_echo_request, icmp_ping, parse_echo_reply, probe_icmp)
+
+IP_HEADER = b"\x45" + b"\x00" * 19
+
+
+def echo_reply(identifier, sequence, payload=b"x"):
+    return ICMP_HEADER.pack(ICMP_ECHO_REPLY, 0, 0, identifier, sequence) + payload
+
+
+def test_echo_request_has_valid_checksum():
+    packet = build_echo_request(0x1234, 7, b"odd")
+    icmp_type, code, _, identifier, sequence = ICMP_HEADER.unpack_from(packet)
+    assert (icmp_type, code, identifier, sequence) == (ICMP_ECHO_REQUEST, 0, 0x1234, 7)
+    assert packet.endswith(b"odd")
+    assert _checksum(packet) == 0
+
+
+def test_parse_echo_reply():
+    assert parse_echo_reply(echo_reply(5, 9), raw=False) == (5, 9)
+    assert parse_echo_reply(IP_HEADER + echo_reply(5, 9), raw=True) == (5, 9)
+    assert parse_echo_reply(b"\x46" + b"\x00" * 23 + echo_reply(5, 9), raw=True) == (5, 9)  # 带IP选项
+    assert parse_echo_reply(build_echo_request(5, 9), raw=False) is None
+    assert parse_echo_reply(echo_reply(5, 9)[:4], raw=False) is None
+    assert parse_echo_reply(b"", raw=True) is None
+
+
+class FakeIcmpSocket:
+    """
+    模拟ICMP套接字：sendto时调用responder生成回复，经socketpair投递以触发事件循环的可读回调
+
+    responder(request, address) 返回 [(来源地址, 回复数据), ...]
+    """
+
+    def __init__(self, responder):
+        self._reader, self._writer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._reader.setblocking(False)
+        self.responder = responder
+        self.sent = []
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def sendto(self, packet, address):
+        self.sent.append((packet, address[0]))
+        for source, reply in self.responder(packet, address[0]):
+            self._writer.send(source.encode() + b"|" + reply)
+
+    def recvfrom(self, size):
+        source, _, packet = self._reader.recv(size).partition(b"|")
+        return packet, (source.decode(), 0)
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+
+
+@pytest.fixture
+def fake_icmp(monkeypatch):
+    def _install(responder, raw=False, addresses=None):
+        sock = FakeIcmpSocket(responder)
+        monkeypatch.setattr(icmp_probe, "open_icmp_socket", lambda: (sock, raw))
+
+        async def resolve(target, timeout):
+            address = (addresses or {}).get(target, target)
+            return (address, "") if address else (None, "没有IPv4地址")
+
+        monkeypatch.setattr(icmp_probe, "_resolve_ipv4", resolve)
+        return sock
+
+    return _install
+
+
+def request_ids(packet):
+    _, _, _, identifier, sequence = ICMP_HEADER.unpack_from(packet)
+    return identifier, sequence
+
+
+def test_unprivileged_socket_matches_by_sequence_only(fake_icmp):
+    # 非特权套接字的identifier被内核改写，回复中的identifier与请求不同
+    fake_icmp(lambda packet, address: [(address, echo_reply(0xBEEF, request_ids(packet)[1]))])
+    stats = asyncio.run(icmp_ping(["10.0.0.1"], timeout=1, count=3))["10.0.0.1"]
+    assert stats["sent"] == stats["received"] == 3
+    assert stats["loss"] == 0 and stats["rtt"] is not None and not stats["error"]
+
+
+def test_reply_from_wrong_source_is_ignored(fake_icmp):
+    fake_icmp(lambda packet, address: [("10.9.9.9", echo_reply(0, request_ids(packet)[1]))])
+    stats = asyncio.run(icmp_ping(["10.0.0.1"], timeout=0.2))["10.0.0.1"]
+    assert stats["received"] == 0 and stats["loss"] == 1.0
+    assert stats["error"] == "请求超时"
+
+
+def test_unknown_sequence_is_ignored(fake_icmp):
+    fake_icmp(lambda packet, address: [(address, echo_reply(0, (request_ids(packet)[1] + 100) & 0xFFFF))])
+    stats = asyncio.run(icmp_ping(["10.0.0.1"], timeout=0.2))["10.0.0.1"]
+    assert stats["received"] == 0
+
+
+def test_raw_socket_also_matches_identifier(fake_icmp):
+    def responder(packet, address):
+        identifier, sequence = request_ids(packet)
+        if address == "10.0.0.1":
+            return [(address, IP_HEADER + echo_reply(identifier, sequence))]
+        return [(address, IP_HEADER + echo_reply(identifier ^ 1, sequence))]  # 其他进程的ping
+
+    fake_icmp(responder, raw=True)
+    stats = asyncio.run(icmp_ping(["10.0.0.1", "10.0.0.2"], timeout=0.2))
+    assert stats["10.0.0.1"]["received"] == 1
+    assert stats["10.0.0.2"]["received"] == 0 and stats["10.0.0.2"]["error"] == "请求超时"
+
+
+def test_return_on_first_leaves_others_pending(fake_icmp):
+    fake_icmp(lambda packet, address: [(address, echo_reply(0, request_ids(packet)[1]))]
+              if address == "10.0.0.2" else [])
+    stats = asyncio.run(icmp_ping(["10.0.0.1", "10.0.0.2"], timeout=5, return_on_first=True))
+    assert stats["10.0.0.2"]["received"] == 1
+    assert stats["10.0.0.1"]["pending"] == 1
+    assert stats["10.0.0.1"]["loss"] == 0.0 and stats["10.0.0.1"]["error"] == "未等待回复"
+
+
+def test_unresolved_target_is_not_sent(fake_icmp):
+    sock = fake_icmp(lambda packet, address: [], addresses={"nowhere.example": None})
+    stats = asyncio.run(icmp_ping(["nowhere.example"], timeout=0.2))["nowhere.example"]
+    assert sock.sent == [] and stats["sent"] == 0
+    assert stats["error"] == "没有IPv4地址"
+
+
+def test_socket_permission_error_is_reported(monkeypatch):
+    def denied():
+        raise PermissionError("Operation not permitted")
+
+    async def resolve(target, timeout):
+        return target, ""
+
+    monkeypatch.setattr(icmp_probe, "open_icmp_socket", denied)
+    monkeypatch.setattr(icmp_probe, "_resolve_ipv4", resolve)
+    stats = asyncio.run(icmp_ping(["10.0.0.1"]))["10.0.0.1"]
+    assert "无法创建ICMP套接字" in stats["error"] and "_rtts" not in stats
+
+
+def test_probe_icmp_result(fake_icmp):
+    fake_icmp(lambda packet, address: [(address, echo_reply(0, request_ids(packet)[1]))]
+              if address == "10.0.0.2" else [])
+    result = asyncio.run(probe_icmp(["10.0.0.1", "10.0.0.2"], timeout=1))
+    assert result["method"] == "icmp" and result["success"]
+    assert result["target"] == "10.0.0.1,10.0.0.2"
+    assert result["latency"] == result["per_target"]["10.0.0.2"]["rtt"]
+
+
+def test_probe_icmp_failure_lists_errors(fake_icmp):
+    fake_icmp(lambda packet, address: [])
+    result = asyncio.run(probe_icmp(["10.0.0.1"], timeout=0.1))
+    assert not result["success"] and result["error"] == "10.0.0.1: 请求超时"
+
+
+def test_builder_uses_one_probe_with_largest_timeout():
+    timeouts = {"icmp:10.0.0.1": 0.3, "icmp:10.0.0.2": 0.8}
+    probes = _build_icmp_probes({"ping_targets": ["10.0.0.1", "10.0.0.2"], "timeout_for": timeouts.get})
+    assert len(probes) == 1 and probes[0].args == (["10.0.0.1", "10.0.0.2"], 0.8)
+    assert _build_icmp_probes({"ping_targets": [], "timeout_for": timeouts.get}) == []
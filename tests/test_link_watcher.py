@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""网络变化监听：构造的rtnetlink消息经解析、防抖合并后回调，出错时重新同步或改用轮询"""
+
+import errno
+import itertools
+import socket
+import threading
+import time
+
+import pytest
+
+from local_network import NLMSG_HEADER, LinkChangeWatcher, parse_netlink_messages
+
+RTM_NEWLINK = 16
+RTM_NEWADDR = 20
+RTM_GETLINK = 18  # 非事件消息，应被忽略
+
+
+def nlmsg(msg_type, payload=b"\x00" * 16):
+    """构造一条按4字节对齐的netlink消息"""
+    length = NLMSG_HEADER.size + len(payload)
+    padding = b"\x00" * ((4 - length % 4) % 4)
+    return NLMSG_HEADER.pack(length, msg_type, 0, 0, 0) + payload + padding
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+        self.called = threading.Event()
+
+    def __call__(self, events):
+        self.calls.append(events)
+        self.called.set()
+
+
+class FlakySocket:
+    """包装socketpair的一端，按顺序在recv时抛出给定错误"""
+
+    def __init__(self, sock, errors):
+        self._sock = sock
+        self._errors = list(errors)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def recv(self, size):
+        if self._errors:
+            raise self._errors.pop(0)
+        return self._sock.recv(size)
+
+
+@pytest.fixture
+def pair():
+    reader, writer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    yield reader, writer
+    reader.close()
+    writer.close()
+
+
+@pytest.fixture
+def make_watcher(monkeypatch):
+    watchers = []
+
+    def _make(sock, callback, **kwargs):
+        watcher = LinkChangeWatcher(callback, sock=sock, **kwargs)
+        # 每次快照都不同，使回调不受本机实际网络状态影响
+        counter = itertools.count()
+        monkeypatch.setattr(watcher, "_snapshot", lambda: (next(counter),))
+        watchers.append(watcher)
+        return watcher
+
+    yield _make
+    for watcher in watchers:
+        watcher.stop()
+
+
+def test_parse_netlink_messages_extracts_events():
+    data = nlmsg(RTM_NEWLINK) + nlmsg(RTM_GETLINK) + nlmsg(RTM_NEWADDR, b"\x00" * 13)
+    assert parse_netlink_messages(data) == ["link_up", "address_added"]
+
+
+def test_parse_netlink_messages_stops_at_truncated_header():
+    data = nlmsg(RTM_NEWADDR) + NLMSG_HEADER.pack(2, RTM_NEWLINK, 0, 0, 0)
+    assert parse_netlink_messages(data) == ["address_added"]
+    assert parse_netlink_messages(b"\x01\x02") == []
+
+
+def test_events_are_debounced_into_one_callback(pair, make_watcher):
+    reader, writer = pair
+    recorder = Recorder()
+    watcher = make_watcher(reader, recorder, debounce=0.3).start()
+    assert watcher.mode == "netlink"
+
+    writer.send(nlmsg(RTM_NEWLINK))
+    writer.send(nlmsg(RTM_NEWADDR) + nlmsg(RTM_NEWLINK))
+    writer.send(nlmsg(RTM_NEWADDR))
+
+    assert recorder.called.wait(3)
+    time.sleep(0.5)
+    assert recorder.calls == [["link_up", "address_added"]]
+
+
+def test_continuous_events_still_notify_within_max_wait(pair, make_watcher):
+    reader, writer = pair
+    recorder = Recorder()
+    make_watcher(reader, recorder, debounce=0.3, max_wait=0.6).start()
+    stop = threading.Event()
+
+    def flap():
+        while not stop.is_set():
+            writer.send(nlmsg(RTM_NEWLINK))
+            stop.wait(0.05)
+
+    sender = threading.Thread(target=flap)
+    sender.start()
+    try:
+        start = time.monotonic()
+        assert recorder.called.wait(3)
+        assert time.monotonic() - start < 1.5
+        assert recorder.calls[0] == ["link_up"]
+    finally:
+        stop.set()
+        sender.join()
+
+
+def test_enobufs_resyncs_and_keeps_listening(pair, make_watcher):
+    reader, writer = pair
+    recorder = Recorder()
+    flaky = FlakySocket(reader, [OSError(errno.ENOBUFS, "No buffer space available")])
+    watcher = make_watcher(flaky, recorder, debounce=0.1).start()
+
+    writer.send(nlmsg(RTM_NEWADDR))  # 首次recv溢出，该消息仍留在缓冲区
+    assert recorder.called.wait(3)
+    assert watcher.mode == "netlink"
+    assert watcher._thread.is_alive()
+
+    recorder.called.clear()
+    writer.send(nlmsg(RTM_NEWLINK))
+    assert recorder.called.wait(3)
+    assert ["resync", "address_added"] in recorder.calls
+    assert recorder.calls[-1] == ["link_up"]
+
+
+def test_other_errors_fall_back_to_polling(pair, make_watcher):
+    reader, writer = pair
+    recorder = Recorder()
+    flaky = FlakySocket(reader, [OSError(errno.EBADF, "Bad file descriptor")])
+    watcher = make_watcher(flaky, recorder, debounce=0.1, poll_interval=0.1).start()
+
+    writer.send(nlmsg(RTM_NEWLINK))
+    assert recorder.called.wait(3)
+    assert watcher.mode == "polling"
+    assert watcher._thread.is_alive()
+    assert recorder.calls[0] == ["state_changed"]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""本地网络状态：通过 RTM_GETADDR 读取每个网卡的全部IPv4地址（含次要地址和别名地址）"""
+
+import socket
+import sys
+
+import pytest
+
+from local_network import (IFA_ADDRESS, IFA_LOCAL, IFADDRMSG, NLMSG_DONE, NLMSG_HEADER, RTATTR_HEADER, RTM_NEWADDR,
+                           _read_ipv4_addresses, get_local_network_state, parse_ipv4_address_messages)
+
+IFA_LABEL = 3
+
+
+def rtattr(rta_type, payload):
+    length = RTATTR_HEADER.size + len(payload)
+    return RTATTR_HEADER.pack(length, rta_type) + payload + b"\x00" * ((4 - length % 4) % 4)
+
+
+def newaddr(index, family=socket.AF_INET, **attrs):
+    body = IFADDRMSG.pack(family, 24, 0, 0, index)
+    for rta_type, payload in attrs.get("attrs", []):
+        body += rtattr(rta_type, payload)
+    return NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), RTM_NEWADDR, 2, 1, 0) + body
+
+
+def done():
+    return NLMSG_HEADER.pack(NLMSG_HEADER.size + 4, NLMSG_DONE, 2, 1, 0) + b"\x00" * 4
+
+
+def ip(address):
+    return socket.inet_aton(address)
+
+
+def test_parses_primary_secondary_and_alias_addresses():
+    data = (newaddr(2, attrs=[(IFA_ADDRESS, ip("10.1.2.3")), (IFA_LOCAL, ip("10.1.2.3")), (IFA_LABEL, b"eth0\x00")])
+            + newaddr(2, attrs=[(IFA_ADDRESS, ip("10.1.2.4")), (IFA_LOCAL, ip("10.1.2.4"))])  # 次要地址
+            + newaddr(2, attrs=[(IFA_LOCAL, ip("172.29.5.6")), (IFA_LABEL, b"eth0:1\x00")])  # 别名地址
+            + newaddr(3, attrs=[(IFA_ADDRESS, ip("10.9.9.9"))]))
+    addresses, finished = parse_ipv4_address_messages(data)
+    assert addresses == {2: ["10.1.2.3", "10.1.2.4", "172.29.5.6"], 3: ["10.9.9.9"]}
+    assert not finished
+
+
+def test_point_to_point_prefers_local_address():
+    data = newaddr(5, attrs=[(IFA_ADDRESS, ip("10.64.0.1")), (IFA_LOCAL, ip("10.64.0.2"))])
+    assert parse_ipv4_address_messages(data)[0] == {5: ["10.64.0.2"]}
+
+
+def test_ignores_other_families_and_stops_at_done():
+    data = (newaddr(2, family=socket.AF_INET6, attrs=[(IFA_ADDRESS, b"\x20\x01" + b"\x00" * 14)])
+            + done()
+            + newaddr(2, attrs=[(IFA_LOCAL, ip("10.0.0.1"))]))
+    assert parse_ipv4_address_messages(data) == ({}, True)
+
+
+def test_truncated_data_is_ignored():
+    data = newaddr(2, attrs=[(IFA_LOCAL, ip("10.0.0.1"))])
+    assert parse_ipv4_address_messages(data[:10]) == ({}, False)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="需要 rtnetlink")
+def test_reads_loopback_address_over_netlink():
+    addresses = _read_ipv4_addresses()
+    if addresses is None:
+        pytest.skip("netlink 不可用")
+    assert "127.0.0.1" in addresses.get("lo", [])
+    state = get_local_network_state()
+    assert state["interfaces"]["lo"]["loopback"]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""登录状态判定优先级：PageTips成功提示 > 注销按钮 > 正文成功关键字 > 正文失败关键字"""
+
+from login_state import (LOGGED_IN, LOGIN_FAILED, LOGIN_UNKNOWN, LoginStateMatcher, is_logout_text,
+                         match_login_state)
+
+
+def test_page_tips_wins_over_everything():
+    verdict = match_login_state("您已经成功登录", has_logout=True, body_text="认证失败")
+    assert verdict["state"] == LOGGED_IN and verdict["source"] == "page_tips"
+    assert verdict["keyword"] == "成功登录" and verdict["span"] == (3, 7)
+    assert verdict["reason"] == "检测到'成功登录'"
+
+
+def test_logout_button_wins_over_body_failure():
+    verdict = match_login_state("请输入账号", has_logout=True, body_text="登录失败")
+    assert verdict["state"] == LOGGED_IN and verdict["source"] == "logout"
+    assert verdict["keyword"] == "注销按钮" and verdict["span"] is None
+
+
+def test_body_success_wins_over_earlier_failure():
+    body = "上次登录失败。当前在线"
+    verdict = match_login_state(body_text=body)
+    assert verdict["state"] == LOGGED_IN and verdict["source"] == "body"
+    assert body[slice(*verdict["span"])] == verdict["keyword"] == "当前在线"
+
+
+def test_first_failure_keyword_is_reported():
+    verdict = match_login_state(body_text="错误：用户名或密码错误，认证失败")
+    assert verdict["state"] == LOGIN_FAILED
+    assert verdict["keyword"] == "用户名或密码错误"
+
+
+def test_matching_ignores_case():
+    assert match_login_state("Already Logged In")["source"] == "page_tips"
+    assert match_login_state(body_text="LOGIN FAILED")["state"] == LOGIN_FAILED
+
+
+def test_page_tips_only_accepts_tips_keywords():
+    # 正文关键字出现在PageTips中不算成功，需由正文判定
+    verdict = match_login_state("注销", body_text="请求过于频繁")
+    assert verdict["state"] == LOGIN_FAILED and verdict["keyword"] == "请求过于频繁"
+
+
+def test_unknown_when_nothing_matches():
+    assert match_login_state("请登录", body_text="校园网认证") == {
+        "state": LOGIN_UNKNOWN, "source": "", "keyword": "", "span": None, "reason": ""}
+    assert match_login_state()["state"] == LOGIN_UNKNOWN
+
+
+def test_longer_keyword_wins_at_same_position():
+    matcher = LoginStateMatcher(tips_keywords=[], body_keywords=["在线"], failure_keywords=["在线失败"])
+    verdict = matcher.match(body_text="在线失败")
+    assert verdict["state"] == LOGIN_FAILED and verdict["keyword"] == "在线失败"
+    assert matcher.match("任意提示", body_text="当前在线")["source"] == "body"  # 没有PageTips关键字时不会误判
+
+
+def test_custom_keywords_are_escaped():
+    matcher = LoginStateMatcher(tips_keywords=["ok (1)"], body_keywords=["a.b"], failure_keywords=["x*"])
+    assert matcher.match("ok (1)")["state"] == LOGGED_IN
+    assert matcher.match(body_text="axb")["state"] == LOGIN_UNKNOWN
+    assert matcher.match(body_text="x*")["state"] == LOGIN_FAILED
+
+
+def test_is_logout_text_ignores_whitespace():
+    assert is_logout_text("注  销")
+    assert is_logout_text(" 注\n销 ")
+    assert not is_logout_text("登录")
+    assert not is_logout_text(None)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""登录子进程：结果、计数和分阶段耗时样本合并回父进程"""
+
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from login_worker import run_login_worker
+from mock_portal import MockPortal
+from utils import LOGIN_COUNTERS, LOGIN_LATENCY
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_worker_merges_counters_and_phase_latency(make_config):
+    pytest.importorskip("playwright")
+    before_latency = LOGIN_LATENCY.counts()
+    before_logins = LOGIN_COUNTERS.get("http_login")
+
+    with MockPortal() as portal:
+        config = make_config(portal)
+        results = []
+        for _ in range(2):
+            portal.reset()
+            results.append(asyncio.run(run_login_worker(config, timeout=60)))
+
+    for result in results:
+        assert result["success"], result["message"]
+        # 子进程只返回本次登录新记录的样本
+        assert len(result["latency"]["total"]) == 1
+        assert "http_login" in result["latency"]
+
+    after = LOGIN_LATENCY.counts()
+    assert after["total"] - before_latency.get("total", 0) == 2
+    assert after["http_login"] - before_latency.get("http_login", 0) == 2
+    assert after["worker"] - before_latency.get("worker", 0) == 2
+    assert LOGIN_COUNTERS.get("http_login") - before_logins == 2
+
+
+@pytest.mark.parametrize("module", ["app_cli", "utils", "login_worker", "login_benchmark"])
+def test_monitor_process_does_not_import_playwright(module):
+    """监控进程只导入网络探测代码，Playwright留在登录子进程中"""
+    code = f"import sys, {module}; print(any(name.startswith('playwright') for name in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env={**os.environ, "PYTHONPATH": str(ROOT / "src")},
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "False"
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""模拟门户的各个故障模式：HTTP快速登录的结果及其失败分类和重试策略"""
+
+import asyncio
+
+import pytest
+
+from http_login import LoginFormParseError, http_login
+from login_state import classify_failure
+from mock_portal import MockPortal
+from utils import RETRY_POLICIES
+
+FALLBACK = "fallback"  # 抛出 LoginFormParseError，回退到浏览器登录
+
+
+@pytest.mark.parametrize("mode, outcome, failure_type", [
+    ("ok", True, None),
+    ("wrong_password", FALLBACK, "wrong_password"),  # 不在快速路径上直接停止重试，交给浏览器确认
+    ("rate_limited", False, "rate_limited"),
+    ("server_error", FALLBACK, "unknown"),
+    ("timeout", False, "network_error"),
+    ("blank", FALLBACK, "unknown"),
+])
+def test_http_login_against_mock_portal(mode, outcome, failure_type):
+    with MockPortal(failure_mode=mode) as portal:
+        try:
+            success, message = asyncio.run(http_login(portal.url, "test", "test", "@cmcc", timeout=1))
+        except LoginFormParseError as e:
+            success, message = FALLBACK, str(e)
+        assert portal.submit_count == 1
+        assert portal.online is (mode == "ok")
+
+    assert success == outcome, message
+    if failure_type is not None:
+        assert classify_failure(message) == failure_type
+
+
+@pytest.mark.parametrize("mode, policy", [
+    ("rate_limited", "backoff"),
+    ("timeout", "fast"),
+])
+def test_fast_path_failures_map_to_retry_policy(mode, policy):
+    with MockPortal(failure_mode=mode) as portal:
+        success, message = asyncio.run(http_login(portal.url, "test", "test", "@cmcc", timeout=1))
+    assert not success
+    assert RETRY_POLICIES[classify_failure(message)] == policy
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""门户探测：探测地址不可达时检查认证服务器，区分"认证前屏蔽外网"和"上游断网\""""
+
+import asyncio
+import socket
+
+from mock_portal import MockPortal
+from network_test import PORTAL_NO_ROUTE, detect_captive_portal_async
+
+
+def _closed_port_url() -> str:
+    """本机一个没有监听的端口（连接会被拒绝）"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/generate_204"
+
+
+def test_auth_host_reachable_when_probe_is_blocked():
+    with MockPortal() as portal:
+        result = asyncio.run(detect_captive_portal_async(portal.url, _closed_port_url(), timeout=1,
+                                                         check_auth_host=True))
+    assert result["state"] == PORTAL_NO_ROUTE
+    assert result["auth_reachable"] is True
+
+
+def test_auth_host_unreachable_means_upstream_failure():
+    result = asyncio.run(detect_captive_portal_async(_closed_port_url(), _closed_port_url(), timeout=1,
+                                                     check_auth_host=True))
+    assert result["state"] == PORTAL_NO_ROUTE
+    assert result["auth_reachable"] is False
+
+
+def test_auth_host_not_checked_by_default():
+    with MockPortal() as portal:
+        result = asyncio.run(detect_captive_portal_async(portal.url, _closed_port_url(), timeout=1))
+    assert result["auth_reachable"] is None
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""探测竞速：首个成功（或达到法定分数）即返回并取消其余探测"""
+
+import asyncio
+
+from probe_engine import _make_result, race_probes
+
+
+def fake_probe(method, success, delay, target="", cancelled=None, error=None):
+    async def probe():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.append(target)
+            raise
+        if error is not None:
+            raise error
+        return _make_result(method, target, success, delay, "" if success else "失败")
+    return method, probe
+
+
+def race(probes, **kwargs):
+    return asyncio.run(race_probes(probes, **kwargs))
+
+
+def test_first_success_cancels_the_rest():
+    cancelled = []
+    report = race([fake_probe("socket", True, 0.01, "fast"),
+                   fake_probe("http", True, 5, "slow", cancelled)])
+    assert report["success"]
+    assert [result["target"] for result in report["results"]] == ["fast"]
+    assert report["cancelled"] == 1 and cancelled == ["slow"]
+    assert report["elapsed"] < 1
+
+
+def test_quorum_waits_for_enough_successes():
+    report = race([fake_probe("socket", True, 0.01, "a"), fake_probe("socket", True, 0.05, "b"),
+                   fake_probe("socket", True, 5, "c")], quorum=2)
+    assert report["success"] and report["score"] == 2
+    assert report["cancelled"] == 1
+
+
+def test_weights_count_towards_quorum():
+    report = race([fake_probe("dns", True, 0.01), fake_probe("http", True, 0.05), fake_probe("http", True, 5)],
+                  quorum=1.5, weights={"dns": 0.5})
+    assert report["success"] and report["score"] == 1.5
+
+
+def test_required_methods_must_each_succeed():
+    report = race([fake_probe("socket", True, 0.01), fake_probe("socket", True, 0.02),
+                   fake_probe("http", True, 0.1)], required_methods=["socket", "http"])
+    assert report["success"]
+    assert {result["method"] for result in report["results"]} == {"socket", "http"}
+
+
+def test_stops_early_when_quorum_becomes_impossible():
+    cancelled = []
+    report = race([fake_probe("socket", False, 0.01), fake_probe("http", False, 0.01),
+                   fake_probe("dns", True, 5, "late", cancelled)], quorum=2)
+    assert not report["success"]
+    assert cancelled == ["late"] and report["elapsed"] < 1
+
+
+def test_probe_exception_becomes_failed_result():
+    report = race([fake_probe("socket", False, 0.01, error=RuntimeError("boom")), fake_probe("http", True, 0.05)])
+    assert report["success"]
+    failed = report["results"][0]
+    assert failed["method"] == "socket" and not failed["success"] and "boom" in failed["error"]
+
+
+def test_deadline_bounds_the_wait():
+    report = race([fake_probe("socket", True, 5), fake_probe("http", True, 5)], deadline=0.1)
+    assert not report["success"]
+    assert report["cancelled"] == 2 and report["elapsed"] < 1
+
+
+def test_all_failures_report_every_result():
+    report = race([fake_probe("socket", False, 0.01, "a"), fake_probe("socket", False, 0.02, "b")])
+    assert not report["success"] and report["score"] == 0
+    assert sorted(result["target"] for result in report["results"]) == ["a", "b"]
+    assert report["cancelled"] == 0
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""探测注册表与执行策略：按名称构造探测，parallel 同时竞速，ordered 按方法逐组执行"""
+
+import asyncio
+
+import pytest
+
+import probe_engine
+from probe_engine import (_make_result, build_probes, probe_dns, probe_http, probe_socket, register_probe,
+                          run_strategy, summarize_by_method)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(probe_engine, "PROBE_REGISTRY", dict(probe_engine.PROBE_REGISTRY))
+    return probe_engine.PROBE_REGISTRY
+
+
+def context(**overrides):
+    values = {"test_sites": [("223.5.5.5", 53), ("114.114.114.114", 53)],
+              "test_urls": ["http://connect.rom.miui.com/generate_204"],
+              "dns_hosts": ["www.baidu.com"],
+              "http_backend": "native",
+              "timeout_for": lambda key: 0.5}
+    values.update(overrides)
+    return values
+
+
+def test_build_probes_keeps_order_and_ignores_unknown(registry):
+    probes = build_probes(["dns", "bogus", "socket", "http"], context())
+    assert [method for method, _ in probes] == ["dns", "socket", "socket", "http"]
+    dns, site, _, http = (factory for _, factory in probes)
+    assert dns.func is probe_dns and dns.args == ("www.baidu.com", 0.5)
+    assert site.func is probe_socket and site.args == ("223.5.5.5", 53, 0.5)
+    assert http.func is probe_http and http.args == ("http://connect.rom.miui.com/generate_204", 0.5)
+
+
+def test_timeout_for_receives_per_target_key(registry):
+    keys = []
+    build_probes(["socket", "http"], context(timeout_for=lambda key: keys.append(key) or 1))
+    assert keys == ["socket:223.5.5.5:53", "socket:114.114.114.114:53",
+                    "http:http://connect.rom.miui.com/generate_204"]
+
+
+def test_register_probe_adds_new_method(registry):
+    @register_probe("portal")
+    def _build(ctx):
+        return [lambda: ctx["auth_url"]]
+
+    probes = build_probes(["portal"], context(auth_url="http://172.29.0.2/"))
+    assert registry["portal"] is _build
+    assert [(method, factory()) for method, factory in probes] == [("portal", "http://172.29.0.2/")]
+
+
+class Probes:
+    """记录每个探测是否被启动的假探测集合"""
+
+    def __init__(self):
+        self.started = []
+
+    def make(self, method, target, success, delay=0.01):
+        async def probe():
+            self.started.append(target)
+            await asyncio.sleep(delay)
+            return _make_result(method, target, success, delay, "" if success else "失败")
+        return method, probe
+
+
+def strategy(probes, **kwargs):
+    return asyncio.run(run_strategy(probes, **kwargs))
+
+
+def test_ordered_stops_after_first_group_meets_quorum():
+    fake = Probes()
+    report = strategy([fake.make("socket", "s1", True), fake.make("socket", "s2", False),
+                       fake.make("http", "h1", True)], strategy="ordered")
+    assert report["success"] and report["strategy"] == "ordered"
+    assert "h1" not in fake.started
+    assert set(report["by_method"]) == {"socket"}
+
+
+def test_ordered_falls_through_to_later_groups():
+    fake = Probes()
+    report = strategy([fake.make("socket", "s1", False), fake.make("socket", "s2", False),
+                       fake.make("http", "h1", True)], strategy="ordered")
+    assert report["success"]
+    assert fake.started == ["s1", "s2", "h1"]
+    assert not report["by_method"]["socket"]["success"]
+    assert report["by_method"]["http"]["success"]
+
+
+def test_ordered_accumulates_score_across_groups():
+    fake = Probes()
+    report = strategy([fake.make("dns", "d1", True), fake.make("socket", "s1", True),
+                       fake.make("http", "h1", True)], strategy="ordered", quorum=1.5, weights={"dns": 0.5})
+    assert report["success"] and report["score"] == 1.5
+    assert "h1" not in fake.started
+
+
+def test_ordered_runs_required_method_even_after_quorum():
+    fake = Probes()
+    report = strategy([fake.make("socket", "s1", True), fake.make("http", "h1", True)],
+                      strategy="ordered", required_methods=["http"])
+    assert report["success"] and fake.started == ["s1", "h1"]
+
+
+def test_ordered_reports_failure_when_every_group_fails():
+    fake = Probes()
+    report = strategy([fake.make("socket", "s1", False), fake.make("http", "h1", False)], strategy="ordered")
+    assert not report["success"] and report["score"] == 0
+    assert len(report["results"]) == 2
+
+
+def test_parallel_starts_every_probe():
+    fake = Probes()
+    report = strategy([fake.make("socket", "s1", True), fake.make("http", "h1", True, delay=5)])
+    assert report["success"] and report["strategy"] == "parallel"
+    assert set(fake.started) == {"s1", "h1"}
+    assert report["cancelled"] == 1
+
+
+def test_summarize_by_method():
+    summary = summarize_by_method([
+        _make_result("http", "a", False, 0.3, "HTTP 502"),
+        _make_result("http", "b", True, 0.2),
+        _make_result("http", "c", True, 0.1),
+        _make_result("dns", "d", False, 1.0, "超时"),
+    ])
+    assert summary["http"]["success"] and summary["http"]["latency"] == 0.1
+    assert summary["http"]["latencies"] == {"a": 0.3, "b": 0.2, "c": 0.1}
+    assert summary["http"]["errors"] == {"a": "HTTP 502"}
+    assert summary["dns"] == {"success": False, "latency": None, "latencies": {"d": 1.0}, "errors": {"d": "超时"}}
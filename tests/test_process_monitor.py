@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""浏览器进程树统计：只统计本会话启动的进程树，按尝试计算CPU时间上限"""
+
+import asyncio
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from process_monitor import ProcessTreeMonitor, child_pids, proc_available, spawned_children
+from utils import BrowserContextManager, ConfigLoader
+
+pytestmark = pytest.mark.skipif(not proc_available(), reason="需要 /proc")
+
+BUSY_LOOP = "import time\nend = time.time() + 30\nwhile time.time() < end: pass"
+
+
+@pytest.fixture
+def spawn():
+    processes = []
+
+    def _spawn(*args):
+        process = subprocess.Popen(args)
+        processes.append(process)
+        return process
+
+    yield _spawn
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_monitor_counts_only_its_roots(spawn):
+    driver = spawn(sys.executable, "-c", "import time; time.sleep(30)")
+    spawn(sys.executable, "-c", "import time; time.sleep(30)")  # 本进程的其他子进程（如curl探测）
+
+    monitor = ProcessTreeMonitor(root_pids=[driver.pid])
+    usage = monitor.sample()
+    assert usage["processes"] == 1
+
+    monitor.set_roots([])
+    assert monitor.sample()["processes"] == 0
+
+
+def test_spawned_children_prefers_driver_processes(spawn, tmp_path):
+    node = tmp_path / "node"
+    shutil.copy(shutil.which("sleep"), node)
+    before = child_pids()
+    driver = spawn(str(node), "30")
+    spawn(shutil.which("sleep"), "30")
+
+    assert spawned_children(before) == [driver.pid]
+
+
+def test_attempt_cpu_limit_uses_sampled_delta(spawn):
+    busy = spawn(sys.executable, "-c", BUSY_LOOP)
+    reasons = []
+
+    async def on_limit(reason, browser_pids):
+        reasons.append(reason)
+
+    async def run():
+        monitor = ProcessTreeMonitor(interval=0.05, cpu_limit=0.3, on_limit=on_limit, root_pids=[busy.pid])
+        monitor.reset()
+        monitor.sample()
+        monitor.start()
+        for _ in range(100):
+            if reasons:
+                break
+            await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    assert reasons and "CPU" in reasons[0]
+
+    # 新的统计窗口从零开始计算，累计的CPU时间不会让下一次尝试立即超限
+    monitor.reset()
+    monitor.sample()
+    assert monitor.limit_exceeded(monitor.sample()) is None
+
+
+def test_pooled_browser_gets_no_cumulative_rlimit():
+    config = ConfigLoader.load_config_from_env()
+    config["browser_settings"].update(resource_monitor=True, rlimit_cpu=60)
+
+    assert BrowserContextManager(config).resource_monitor.rlimit_cpu == 60
+    assert BrowserContextManager(config, pool=object()).resource_monitor.rlimit_cpu == 0
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""低资源模式的请求拦截：按资源类型、通配符或子串匹配，并统计每次导航节省的字节数"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import utils
+from utils import (BLOCKED_SIZE_ESTIMATES, DEFAULT_BLOCKED_RESOURCE_TYPES, DEFAULT_BLOCKED_URL_PATTERNS,
+                   BrowserContextManager, ConfigLoader, blocked_request_size, remember_resource_size,
+                   should_block_request)
+
+
+def blocked(resource_type, url):
+    return should_block_request(resource_type, url, set(DEFAULT_BLOCKED_RESOURCE_TYPES),
+                                list(DEFAULT_BLOCKED_URL_PATTERNS))
+
+
+@pytest.mark.parametrize("resource_type, url, expected", [
+    ("image", "http://172.29.0.2/images/logo.gif", True),      # 资源类型
+    ("font", "http://172.29.0.2/fonts/a.woff2", True),
+    ("script", "https://hm.baidu.com/hm.js?abc", True),          # 子串
+    ("script", "https://WWW.GOOGLE-ANALYTICS.COM/ga.js", True),  # 不区分大小写
+    ("other", "http://172.29.0.2/favicon.ico", True),            # 通配符
+    ("document", "http://172.29.0.2/", False),
+    ("script", "http://172.29.0.2/a41.js", False),
+    ("other", "http://172.29.0.2/favicon.ico?v=1", False),       # 通配符需匹配整个URL
+])
+def test_should_block_request(resource_type, url, expected):
+    assert blocked(resource_type, url) is expected
+
+
+def test_substring_and_wildcard_patterns():
+    assert should_block_request("xhr", "http://a/track/collect", set(), ["/track/"])
+    assert should_block_request("xhr", "http://a/x/track.gif", set(), ["*/track.*"])
+    assert not should_block_request("xhr", "http://a/x/track.gif", set(), ["track.*"])
+
+
+@pytest.fixture
+def resource_sizes(monkeypatch):
+    monkeypatch.setattr(utils, "_RESOURCE_SIZES", type(utils._RESOURCE_SIZES)())
+    monkeypatch.setattr(utils, "_RESOURCE_SIZES_LIMIT", 2)
+    return utils._RESOURCE_SIZES
+
+
+def test_blocked_size_uses_known_size_or_estimate(resource_sizes):
+    assert blocked_request_size("image", "http://a/logo.gif") == (BLOCKED_SIZE_ESTIMATES["image"], True)
+    remember_resource_size("http://a/logo.gif", 1234)
+    assert blocked_request_size("image", "http://a/logo.gif") == (1234, False)
+
+    remember_resource_size("http://a/1.png", 1)
+    remember_resource_size("http://a/2.png", 2)
+    assert list(resource_sizes) == ["http://a/1.png", "http://a/2.png"]
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url)
+        self.action = None
+
+    async def abort(self):
+        self.action = "abort"
+
+    async def continue_(self):
+        self.action = "continue"
+
+
+def test_route_request_counts_bytes_saved(resource_sizes):
+    config = ConfigLoader.load_config_from_env()
+    config["browser_settings"]["resource_monitor"] = False
+    config["logging"] = {**config["logging"], "level": "WARNING", "file": None}
+    manager = BrowserContextManager(config)
+    remember_resource_size("http://a/logo.gif", 1000)
+
+    routes = [FakeRoute("image", "http://a/logo.gif"), FakeRoute("font", "http://a/a.woff"),
+              FakeRoute("document", "http://a/")]
+
+    async def run():
+        for route in routes:
+            await manager._route_request(route)
+
+    asyncio.run(run())
+    stats = manager.navigation_stats
+    assert [route.action for route in routes] == ["abort", "abort", "continue"]
+    assert stats["blocked"] == 2
+    assert stats["blocked_by_type"] == {"image": 1, "font": 1}
+    assert stats["bytes_saved"] == 1000 + BLOCKED_SIZE_ESTIMATES["font"]
+    assert stats["estimated_blocked"] == 1
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""DNS解析缓存：只解析IPv4，TTL缓存、负缓存，重新解析期间继续使用旧IP"""
+
+import asyncio
+import socket
+import time
+
+import pytest
+
+from probe_engine import AsyncResolver
+
+
+class FakeGetaddrinfo:
+    """按顺序返回预设的解析结果（地址列表或异常）"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def __call__(self, host, port, family=0, type=0, *args, **kwargs):
+        self.calls.append({"host": host, "family": family})
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, 0)) for address in answer]
+
+
+@pytest.fixture
+def fake_dns(monkeypatch):
+    def _install(*answers):
+        fake = FakeGetaddrinfo(*answers)
+        monkeypatch.setattr(socket, "getaddrinfo", fake)
+        return fake
+    return _install
+
+
+def resolve(resolver, host="example.test", **kwargs):
+    return asyncio.run(resolver.resolve(host, timeout=1, **kwargs))
+
+
+def wait_background(resolver, host="example.test"):
+    """等待后台重新解析结束"""
+    deadline = time.monotonic() + 2
+    while resolver._inflight.get(host) is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_resolves_ipv4_only(fake_dns):
+    fake = fake_dns(["10.0.0.1", "10.0.0.1", "10.0.0.2"])
+    answer = resolve(AsyncResolver())
+    assert answer["source"] == "resolved"
+    assert answer["addresses"] == ["10.0.0.1", "10.0.0.2"]
+    assert fake.calls[0]["family"] == socket.AF_INET
+
+
+def test_literal_addresses_skip_resolution(fake_dns):
+    fake = fake_dns(["10.0.0.1"])
+    assert resolve(AsyncResolver(), "192.168.1.1")["source"] == "literal"
+    assert not fake.calls
+
+
+def test_ttl_cache_then_stale_refresh(fake_dns):
+    fake = fake_dns(["10.0.0.1"], ["10.0.0.9"])
+    resolver = AsyncResolver(ttl=0.1)
+
+    assert resolve(resolver)["source"] == "resolved"
+    assert resolve(resolver)["source"] == "cache"
+    assert len(fake.calls) == 1
+
+    time.sleep(0.15)
+    stale = resolve(resolver)
+    assert (stale["source"], stale["addresses"]) == ("stale", ["10.0.0.1"])
+    wait_background(resolver)
+    fresh = resolve(resolver)
+    assert (fresh["source"], fresh["addresses"]) == ("cache", ["10.0.0.9"])
+
+
+def test_negative_cache_until_it_expires(fake_dns):
+    fake = fake_dns(socket.gaierror("Name or service not known"), ["10.0.0.1"])
+    resolver = AsyncResolver(negative_ttl=0.1)
+
+    assert resolve(resolver)["source"] == "error"
+    negative = resolve(resolver)
+    assert negative["source"] == "negative" and negative["error"]
+    assert len(fake.calls) == 1
+
+    time.sleep(0.15)
+    assert resolve(resolver)["source"] == "resolved"
+    assert resolver.stats()["negative_hits"] == 1
+
+
+def test_stale_addresses_survive_failed_reresolution(fake_dns):
+    fake = fake_dns(["10.0.0.1"], socket.gaierror("Temporary failure in name resolution"))
+    resolver = AsyncResolver(ttl=0.05)
+    resolve(resolver)
+    time.sleep(0.1)
+
+    for _ in range(2):
+        answer = resolve(resolver)
+        assert (answer["source"], answer["addresses"]) == ("stale", ["10.0.0.1"])
+        wait_background(resolver)
+    assert len(fake.calls) == 3
+    assert resolve(resolver, allow_stale=False)["source"] == "error"
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""RTT估计的持久化：估计明显变化或到达保存间隔时才写文件，退出时总是保存"""
+
+import pytest
+
+from app_cli import NetworkMonitorCore
+from probe_engine import RTT_SAVE_INTERVAL, RttEstimator, get_rtt_estimator
+from utils import ConfigLoader
+
+
+@pytest.fixture
+def estimator():
+    shared = get_rtt_estimator()
+    yield shared
+    shared._targets.clear()
+
+
+@pytest.fixture
+def core(tmp_path):
+    config = ConfigLoader.load_config_from_env()
+    config["probe"]["rtt_state_file"] = str(tmp_path / "rtt_state.json")
+    config["logging"] = {**config["logging"], "level": "WARNING", "file": None}
+    return NetworkMonitorCore(config)
+
+
+def test_drift_detects_new_targets_and_large_changes():
+    estimator = RttEstimator()
+    estimator.observe("socket:a", 0.5)
+    saved = estimator.snapshot()
+    assert not estimator.drifted_from(saved)
+
+    estimator.observe("socket:a", 0.52)
+    assert not estimator.drifted_from(saved, threshold=0.2)
+
+    estimator.observe_timeout("socket:a")
+    assert estimator.drifted_from(saved, threshold=0.2)
+    assert estimator.drifted_from({}, threshold=0.2)
+
+
+def test_monitor_saves_only_on_drift_or_exit(core, estimator, tmp_path):
+    state_file = tmp_path / "rtt_state.json"
+    core._load_rtt_state()
+
+    estimator.observe("socket:a", 0.5)
+    core._save_rtt_state()
+    assert state_file.exists()
+
+    state_file.unlink()
+    estimator.observe("socket:a", 0.51)
+    core._save_rtt_state()
+    assert not state_file.exists()
+
+    core._rtt_saved_at -= RTT_SAVE_INTERVAL
+    core._save_rtt_state()
+    assert state_file.exists()
+
+    state_file.unlink()
+    core._save_rtt_state(force=True)
+    assert state_file.exists()
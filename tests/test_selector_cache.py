@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""选择器缓存：命中时只评估缓存的选择器，页面结构变化或选择器失效时删除缓存并评估全部候选"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from form_discovery import FORM_ROLES, cached_plan, cached_roles, plan_from_discovery
+from selector_cache import MAX_PORTALS, SelectorCache, page_digest
+
+PLAN = {"username": 'input[name="DDDDD"][type="text"]:visible',
+        "password": 'input[name="upass"][type="password"]:visible',
+        "isp": None,
+        "submit": 'input[name="0MKKey"][type="button"]:visible'}
+USABLE = {"found": 1, "visible": True, "enabled": True, "type": "text"}
+
+
+def test_cache_persists_and_invalidates(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    cache = SelectorCache(str(path))
+    cache.record("http://portal/", "abc", PLAN)
+
+    reloaded = SelectorCache(str(path))
+    assert reloaded.get("http://portal/") == {"digest": "abc", "selectors": PLAN}
+
+    reloaded.invalidate("http://portal/")
+    assert SelectorCache(str(path)).get("http://portal/") is None
+
+
+def test_unchanged_plan_is_not_rewritten(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    cache = SelectorCache(str(path))
+    cache.record("http://portal/", "abc", PLAN)
+    path.unlink()
+    cache.record("http://portal/", "abc", dict(PLAN))
+    assert not path.exists()
+
+
+def test_corrupt_or_old_format_file_is_ignored(tmp_path):
+    path = tmp_path / "selector_cache.json"
+    path.write_text(json.dumps({"http://portal/#0123": {"selectors": {"username": "x"}}}), encoding="utf-8")
+    assert SelectorCache(str(path)).get("http://portal/#0123") is None
+    path.write_text("{not json", encoding="utf-8")
+    assert SelectorCache(str(path)).get("http://portal/") is None
+
+
+def test_oldest_portals_are_pruned(tmp_path):
+    cache = SelectorCache(str(tmp_path / "selector_cache.json"))
+    for i in range(MAX_PORTALS + 3):
+        cache.record(f"http://portal{i}/", "abc", PLAN)
+    data = json.loads((tmp_path / "selector_cache.json").read_text(encoding="utf-8"))
+    assert len(data) == MAX_PORTALS
+
+
+def test_cached_roles_evaluate_one_candidate_per_role():
+    roles = cached_roles(PLAN)
+    assert sum(map(len, roles.values())) == 3
+    assert sum(map(len, FORM_ROLES.values())) > 3 * 5
+    states = {role: [USABLE] * len(selectors) for role, selectors in roles.items()}
+    assert plan_from_discovery(roles, {"roles": states}) == cached_plan(PLAN)
+
+
+class FakePage:
+    """按选择器返回预设状态的页面，记录每次评估的候选数量"""
+
+    def __init__(self, usable, signature="form|f1"):
+        self.usable = set(usable)
+        self.signature = signature
+        self.evaluated = []
+
+    async def evaluate(self, script, roles):
+        self.evaluated.append(sum(map(len, roles.values())))
+        return {"signature": self.signature,
+                "roles": {role: [USABLE if css in self.usable else {"found": 0} for css, _, _ in candidates]
+                          for role, candidates in roles.items()}}
+
+
+def _css(selector):
+    return selector.replace(":visible", "")
+
+
+@pytest.fixture
+def auth(make_config, tmp_path):
+    pytest.importorskip("playwright")
+    from campus_login import EnhancedCampusNetworkAuth
+
+    return EnhancedCampusNetworkAuth(make_config(SimpleNamespace(url="http://portal.test/"),
+                                                 selector_cache_file=str(tmp_path / "selector_cache.json")))
+
+
+def _discover(auth, page):
+    auth._reset_form_state()
+    return asyncio.run(auth._discover_form(page))
+
+
+def test_discovery_uses_cache_and_invalidates_on_miss(auth):
+    usable = {_css(selector) for selector in PLAN.values() if selector}
+    first = FakePage(usable)
+    plan = _discover(auth, first)
+    assert plan == PLAN
+    assert first.evaluated == [sum(map(len, FORM_ROLES.values()))]
+    auth._save_selectors()
+
+    hit = FakePage(usable)
+    assert _discover(auth, hit) == PLAN
+    assert hit.evaluated == [3]
+
+    changed = FakePage(usable, signature="form|f1;input|extra")
+    assert _discover(auth, changed) == PLAN
+    assert changed.evaluated == [3, sum(map(len, FORM_ROLES.values()))]
+    assert auth.selector_cache.get(auth.auth_url) is None
+
+    auth._save_selectors()
+    assert auth.selector_cache.get(auth.auth_url)["digest"] == page_digest("form|f1;input|extra")
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""请求合并：并发调用共享一次执行，成功结果在新鲜期内复用，失败结果不复用"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import LOGIN_FLIGHT, PROBE_FLIGHT, SingleFlight
+
+
+class Gate:
+    """阻塞领头调用，直到所有跟随者都已加入"""
+
+    def __init__(self, result=True, error=None):
+        self.calls = 0
+        self.release = threading.Event()
+        self.result = result
+        self.error = error
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _run_concurrently(flight, fn, callers=4):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do("key", fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.stats()["shared"] < callers - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    fn.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    gate = Gate(result="ok")
+    results, errors = _run_concurrently(flight, gate)
+
+    assert gate.calls == 1
+    assert results == ["ok"] * 4 and not errors
+    assert flight.stats() == {"executed": 1, "shared": 3, "reused": 0}
+
+
+def test_followers_receive_leaders_exception():
+    flight = SingleFlight(fresh_for=10)
+    gate = Gate(error=RuntimeError("boom"))
+    results, errors = _run_concurrently(flight, gate)
+
+    assert gate.calls == 1
+    assert not results
+    assert [str(e) for e in errors] == ["boom"] * 4
+    assert flight.last_result_age("key") is None
+
+
+def test_fresh_result_is_reused_until_it_expires():
+    flight = SingleFlight(fresh_for=0.2)
+    calls = []
+    fn = lambda: calls.append(1) or len(calls)
+
+    assert flight.do("key", fn) == 1
+    assert flight.do("key", fn) == 1
+    assert flight.stats()["reused"] == 1
+    time.sleep(0.25)
+    assert flight.do("key", fn) == 2
+
+
+def test_failures_are_shared_in_flight_but_not_reused():
+    flight = SingleFlight(fresh_for=10, cache_if=bool)
+    gate = Gate(result=False)
+    results, _ = _run_concurrently(flight, gate)
+    assert results == [False] * 4 and gate.calls == 1
+
+    assert flight.do("key", lambda: True) is True
+    assert flight.do("key", lambda: False) is True  # 成功结果在新鲜期内复用
+
+    flight.forget("key")
+    assert flight.do("key", lambda: False) is False
+    assert flight.last_result_age("key") is None
+
+
+def test_failure_drops_earlier_success():
+    flight = SingleFlight(fresh_for=10, cache_if=bool)
+    flight.do("key", lambda: True)
+    assert flight.do("key", lambda: False, fresh_for=0) is False
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+@pytest.mark.parametrize("flight, failure", [
+    (LOGIN_FLIGHT, False),
+    (PROBE_FLIGHT, {"success": False}),
+])
+def test_shared_instances_do_not_reuse_failures(flight, failure):
+    key = ("test", id(flight))
+    try:
+        flight.do(key, lambda: failure)
+        assert flight.last_result_age(key) is None
+    finally:
+        flight.forget(key)
+
+
+def test_async_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", work) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["done"] * 3
+    assert len(calls) == 1
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""提交完成信号：只有POST或发往表单 action 的请求才算认证请求响应"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from campus_login import _submit_response_matcher  # noqa: E402
+
+
+def response(method, url, resource_type="xhr"):
+    return SimpleNamespace(request=SimpleNamespace(method=method, url=url, resource_type=resource_type))
+
+
+def test_matches_post_and_form_action():
+    matches = _submit_response_matcher("http://172.29.0.2/eportal/login")
+    assert matches(response("POST", "http://172.29.0.2/anything"))
+    assert matches(response("GET", "http://172.29.0.2/eportal/login?DDDDD=test", "document"))
+
+
+def test_ignores_unrelated_script_requests():
+    matches = _submit_response_matcher("http://172.29.0.2/eportal/login")
+    assert not matches(response("GET", "http://172.29.0.2/eportal/heartbeat", "fetch"))
+    assert not matches(response("GET", "http://hm.baidu.com/hm.js", "xhr"))
+
+
+def test_unknown_action_matches_only_post():
+    matches = _submit_response_matcher(None)
+    assert matches(response("POST", "http://172.29.0.2/"))
+    assert not matches(response("GET", "http://172.29.0.2/", "document"))